@@ -8,7 +8,18 @@ from tpch_runner.commands import base_commands
 
 @pytest.mark.parametrize(
     "visible_command",
-    ["db", "generate", "power", "result", "run", "version"],
+    [
+        "answers",
+        "db",
+        "export",
+        "generate",
+        "import",
+        "load",
+        "power",
+        "result",
+        "run",
+        "version",
+    ],
 )
 def test_visible_command(visible_command):
     """Test visible commands in help message"""
@@ -93,3 +104,40 @@ def test_generate(
         assert mock_log in log_messages
 
         assert expected_output in result.output
+
+
+def test_export(mocker, tmp_path):
+    manager = mocker.patch("tpch_runner.commands.base_commands.meta.TestResultManager")
+    manager.return_value.export_history.return_value = {
+        "databases": 1,
+        "powertests": 2,
+        "results": 44,
+        "files": 44,
+    }
+    runner = CliRunner()
+    result = runner.invoke(
+        base_commands.cli, ["export", str(tmp_path), "--since", "2025-01-01"]
+    )
+
+    assert result.exit_code == 0
+    assert "2 Powertests, 44 test results" in result.output
+    _, kwargs = manager.return_value.export_history.call_args
+    assert kwargs["since"].year == 2025
+    assert kwargs["fmt"] == "parquet"
+
+
+def test_import_asks_passwords(mocker, tmp_path):
+    manager = mocker.patch("tpch_runner.commands.base_commands.meta.TestResultManager")
+
+    def import_history(source, get_password):
+        row = {"alias": "pg1", "db_type": "pg", "host": "h", "port": "5432"}
+        assert get_password(row) == "secret"
+        return {"databases": 1, "powertests": 2, "results": 44, "files": 44}
+
+    manager.return_value.import_history.side_effect = import_history
+    runner = CliRunner()
+    result = runner.invoke(base_commands.cli, ["import", str(tmp_path)], input="secret\n")
+
+    assert result.exit_code == 0
+    assert "Enter password of database pg1" in result.output
+    assert "Imported 1 databases" in result.output
@@ -42,6 +42,7 @@ def mock_db_manager():
     "visible_command",
     [
         "add",
+        "build",
         "count",
         "create",
         "delete",
@@ -203,3 +204,218 @@ def test_delete_success_by_alias(mock_db_manager):
     assert result.exit_code == 0
     assert "Database deleted successfully." in result.output
     mock_db_manager.delete_database.assert_called_once_with(db_id=None, alias="test_db")
+
+
+def test_load_from_dbgen(mocker, mock_db_manager, tmp_path):
+    """Test loading all tables from dbgen pipes of a scale factor."""
+    db_manager = MagicMock(streams_dbgen=True, defers_constraints=False)
+    db_manager.load_data.return_value = ([], 1.0)
+    db_manager.verify_rows.return_value = []
+    db_manager.count_rows.return_value = {"nation": 25, "region": 5}
+    mocker.patch.object(db_commands, "get_db")
+    mocker.patch.object(db_commands, "get_db_manager", return_value=db_manager)
+    pipes = mocker.patch.object(db_commands, "dbgen_pipes")
+    pipes.return_value.__enter__.return_value = tmp_path
+    lm = MagicMock()
+
+    runner = CliRunner()
+    result = runner.invoke(
+        db_commands.cli,
+        ["load", "1", "--from-dbgen", "--sf", "10", "--split", "4", "--no-optimize"],
+        obj={"rm": mock_db_manager, "lm": lm},
+    )
+
+    assert result.exit_code == 0
+    pipes.assert_called_once_with("10", tables=None, chunks=4)
+    db_manager.load_data.assert_called_once_with(
+        data_folder=str(tmp_path), delimiter="|", jobs=1, split=4
+    )
+    db_manager.verify_rows.assert_called_once_with(
+        "10", counts={"nation": 25, "region": 5}
+    )
+    _, kwargs = lm.add_loadrun.call_args
+    assert kwargs["success"] is True
+    assert kwargs["scale"] == "10"
+    assert "source=dbgen" in kwargs["settings"]
+    assert kwargs["loads"][0].rows == 30
+
+
+def test_load_fails_on_table_error(mocker, mock_db_manager, tmp_path):
+    """Test a table failing to load fails the load and skips after_load."""
+    from tpch_runner.tpch.databases.base import TableLoad
+
+    db_manager = MagicMock(defers_constraints=False)
+    db_manager.load_data.return_value = (
+        [TableLoad("nation", 0.1), TableLoad("region", 0.1, "no such file")],
+        1.0,
+    )
+    mocker.patch.object(db_commands, "get_db")
+    mocker.patch.object(db_commands, "get_db_manager", return_value=db_manager)
+    lm = MagicMock()
+
+    runner = CliRunner()
+    result = runner.invoke(
+        db_commands.cli,
+        ["load", "1", "-p", str(tmp_path), "--no-verify"],
+        obj={"rm": mock_db_manager, "lm": lm},
+    )
+
+    assert result.exit_code == 1
+    db_manager.after_load.assert_not_called()
+    assert lm.add_loadrun.call_args.kwargs["success"] is False
+
+
+def test_load_from_dbgen_requires_scale(mocker, mock_db_manager):
+    mocker.patch.object(db_commands, "get_db")
+    mocker.patch.object(db_commands, "get_db_manager")
+    runner = CliRunner()
+    result = runner.invoke(
+        db_commands.cli, ["load", "1", "--from-dbgen"], obj={"rm": mock_db_manager}
+    )
+    assert result.exit_code == 1
+    assert "--sf is required" in result.output
+
+
+@pytest.mark.parametrize("supported", [True, False])
+def test_load_bulk(mocker, mock_db_manager, tmp_path, supported):
+    """Test --bulk enables the bulk load mode of databases having one."""
+    db_manager = MagicMock(supports_bulk_load=supported, bulk_load=False)
+    db_manager.load_data.return_value = ([], 1.0)
+    mocker.patch.object(db_commands, "get_db")
+    mocker.patch.object(db_commands, "get_db_manager", return_value=db_manager)
+
+    runner = CliRunner()
+    result = runner.invoke(
+        db_commands.cli,
+        ["load", "1", "-p", str(tmp_path), "--bulk", "--no-verify"],
+        obj={"rm": mock_db_manager, "lm": MagicMock()},
+    )
+
+    assert result.exit_code == (0 if supported else 1)
+    assert db_manager.bulk_load is supported
+    assert db_manager.load_data.called is supported
+
+
+@pytest.fixture
+def build_mocks(mocker, tmp_path):
+    mocker.patch.object(
+        db_commands, "get_db", return_value=MagicMock(id=1, db_type="pg", scale="10")
+    )
+    mocker.patch.object(db_commands, "get_db_manager")
+    build = mocker.patch.object(db_commands, "DatabaseBuild")
+    build.return_value.stages.return_value = []
+    build.return_value.run.return_value = []
+    lm = MagicMock()
+    lm.add_loadrun.return_value = 7
+    return build, lm
+
+
+def test_build(build_mocks, mock_db_manager, tmp_path):
+    """Test a new build is recorded as a load run and runs all stages."""
+    build, lm = build_mocks
+    lm.last_loadrun.return_value = None
+    runner = CliRunner()
+    result = runner.invoke(
+        db_commands.cli,
+        ["build", "1", "--sf", "10", "-p", str(tmp_path), "-j", "4"],
+        obj={"rm": mock_db_manager, "lm": lm},
+    )
+
+    assert result.exit_code == 0, result.output
+    assert lm.add_loadrun.call_args.kwargs["command"] == "build"
+    args, kwargs = build.call_args
+    assert args[1:] == ("10", str(tmp_path))
+    assert kwargs["clean"] is False
+    assert build.return_value.run.call_args.kwargs["done"] == set()
+    load_id, success, _ = lm.finish_loadrun.call_args.args
+    assert (load_id, success) == (7, True)
+
+
+def test_build_resume(build_mocks, mock_db_manager, tmp_path):
+    """Test an unfinished build is continued with --resume only."""
+    build, lm = build_mocks
+    lm.last_loadrun.return_value = MagicMock(
+        id=3,
+        scale="10",
+        success=False,
+        tables=[
+            MagicMock(phase="create", table_name="all", success=True),
+            MagicMock(phase="load", table_name="nation", success=False),
+        ],
+    )
+    runner = CliRunner()
+    args = ["build", "1", "--sf", "10", "-p", str(tmp_path)]
+    obj = {"rm": mock_db_manager, "lm": lm}
+
+    result = runner.invoke(db_commands.cli, args, obj=obj)
+    assert result.exit_code == 1
+    assert "use --resume" in result.output
+    build.assert_not_called()
+
+    result = runner.invoke(db_commands.cli, args + ["--resume"], obj=obj)
+    assert result.exit_code == 0, result.output
+    lm.add_loadrun.assert_not_called()
+    assert build.call_args.kwargs["clean"] is True
+    assert build.return_value.run.call_args.kwargs["done"] == {("create", "all")}
+    assert lm.finish_loadrun.call_args.args[:2] == (3, True)
+
+
+def test_build_is_done(build_mocks, mock_db_manager):
+    """Test a finished build of the same scale is not run again."""
+    build, lm = build_mocks
+    lm.last_loadrun.return_value = MagicMock(id=3, scale="10", success=True)
+    runner = CliRunner()
+    obj = {"rm": mock_db_manager, "lm": lm}
+
+    result = runner.invoke(db_commands.cli, ["build", "1", "--sf", "10"], obj=obj)
+    assert result.exit_code == 0
+    assert "built at scale 10 by load run 3" in result.output
+    build.assert_not_called()
+
+    result = runner.invoke(db_commands.cli, ["build", "1", "--sf", "100"], obj=obj)
+    assert result.exit_code == 1
+    assert "use --force" in result.output
+
+
+def test_reload(mocker, mock_db_manager):
+    mocker.patch.object(db_commands, "get_db")
+    db_manager = MagicMock()
+    db_manager.load_data.return_value = ([], 1.0)
+    mocker.patch.object(db_commands, "get_db_manager", return_value=db_manager)
+    runner = CliRunner()
+    result = runner.invoke(db_commands.cli, ["reload", "1"], obj={"rm": mock_db_manager})
+
+    assert result.exit_code == 0
+    db_manager.truncate_table.assert_called_once_with()
+    db_manager.load_data.assert_called_once_with()
+    db_manager.after_load.assert_called_once_with()
+
+
+def test_reload_without_optimize(mocker, mock_db_manager):
+    """Test tables are analyzed and deferred constraints added without --optimize."""
+    mocker.patch.object(db_commands, "get_db")
+    db_manager = MagicMock()
+    db_manager.load_data.return_value = ([], 1.0)
+    mocker.patch.object(db_commands, "get_db_manager", return_value=db_manager)
+    runner = CliRunner()
+    result = runner.invoke(
+        db_commands.cli, ["reload", "1", "--no-optimize"], obj={"rm": mock_db_manager}
+    )
+
+    assert result.exit_code == 0
+    db_manager.before_load.assert_not_called()
+    db_manager.after_load.assert_called_once_with()
+
+
+def test_reload_fails_on_table_error(mocker, mock_db_manager):
+    from tpch_runner.tpch.databases.base import TableLoad
+
+    mocker.patch.object(db_commands, "get_db")
+    db_manager = MagicMock()
+    db_manager.load_data.return_value = ([TableLoad("region", 0.1, "no such file")], 1.0)
+    mocker.patch.object(db_commands, "get_db_manager", return_value=db_manager)
+    runner = CliRunner()
+    result = runner.invoke(db_commands.cli, ["reload", "1"], obj={"rm": mock_db_manager})
+
+    assert result.exit_code == 1
+    db_manager.after_load.assert_not_called()
@@ -0,0 +1,116 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from click.testing import CliRunner
+
+from tpch_runner import meta
+from tpch_runner.commands import load_commands
+
+
+@pytest.mark.parametrize("visible_command", ["compare", "delete", "draw", "list", "show"])
+def test_visible_command(visible_command):
+    """Test visible commands in help message"""
+    runner = CliRunner()
+    result = runner.invoke(load_commands.cli, ["--help"])
+    assert result.exit_code == 0
+    assert visible_command in result.output
+
+
+def _load_run(load_id: int, lineitem_runtime: float) -> meta.LoadRun:
+    load_run = meta.LoadRun(
+        id=load_id,
+        db_type="pg",
+        scale="1",
+        testtime=datetime(2025, 1, load_id),
+        success=True,
+        runtime=lineitem_runtime + 1,
+        settings="jobs=1",
+    )
+    load_run.tables = [
+        meta.LoadTable(
+            id=1,
+            phase="load",
+            table_name="lineitem",
+            rows=6000,
+            bytes=6 * meta.MB,
+            runtime=lineitem_runtime,
+            success=True,
+        ),
+        meta.LoadTable(
+            id=2, phase="analyze", table_name="all", runtime=1.0, success=True
+        ),
+    ]
+    return load_run
+
+
+def test_list(mocker):
+    lm = mocker.MagicMock()
+    lm.list_loadruns.return_value = [
+        SimpleNamespace(
+            id=1,
+            db_type="pg",
+            command="load",
+            testtime=datetime(2025, 1, 1),
+            success=True,
+            runtime=2.0,
+            scale="1",
+            settings="jobs=1",
+            rows=6000,
+            bytes=6 * meta.MB,
+        )
+    ]
+    runner = CliRunner()
+    result = runner.invoke(load_commands.cli, ["list", "-t", "pg"], obj={"lm": lm})
+
+    assert result.exit_code == 0
+    assert "jobs=1" in result.output
+    # 6 MB in 2 seconds
+    assert " 3 | jobs=1" in result.output
+    lm.list_loadruns.assert_called_once_with(
+        db_type="pg", since=None, limit=None, offset=0
+    )
+
+
+def test_show(mocker):
+    lm = mocker.MagicMock()
+    lm.get_loadruns.return_value = [_load_run(1, 2.0)]
+    runner = CliRunner()
+    result = runner.invoke(load_commands.cli, ["show", "1"], obj={"lm": lm})
+
+    assert result.exit_code == 0
+    assert "lineitem" in result.output
+    assert "3000" in result.output
+    lm.get_loadruns.assert_called_once_with([1])
+
+
+def test_compare(mocker):
+    lm = mocker.MagicMock()
+    lm.get_loadruns.return_value = [_load_run(1, 2.0), _load_run(2, 4.0)]
+    runner = CliRunner()
+    result = runner.invoke(load_commands.cli, ["compare", "1", "2"], obj={"lm": lm})
+
+    assert result.exit_code == 0
+    assert "#2 Rows/s" in result.output
+    assert "1500" in result.output
+
+    result = runner.invoke(load_commands.cli, ["compare", "1"], obj={"lm": lm})
+    assert result.exit_code == 1
+
+
+def test_draw(mocker, tmp_path):
+    lm = mocker.MagicMock()
+    lm.get_loadruns.return_value = [_load_run(1, 2.0), _load_run(2, 4.0)]
+    mocker.patch.object(load_commands.Config, "app_root", str(tmp_path))
+    chart = mocker.patch.object(load_commands, "loadchart")
+    runner = CliRunner()
+    result = runner.invoke(
+        load_commands.cli, ["draw", "-m", "rows", "1", "2"], obj={"lm": lm}
+    )
+
+    assert result.exit_code == 0
+    labels, trends, ylabel, fpath = chart.call_args.args[1:]
+    assert labels == ["load:lineitem", "analyze:all"]
+    assert trends[1]["data"] == [1500, None]
+    assert ylabel == "Rows/s"
+    assert fpath.endswith("load-1-2-rows.png")
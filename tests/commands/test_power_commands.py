@@ -13,6 +13,7 @@ from tpch_runner.commands import power_commands
         "list",
         "multi",
         "show",
+        "trend",
         "validate",
         "update",
     ],
@@ -24,3 +25,62 @@ def test_visible_command(visible_command):
     print(result.output)
     assert result.exit_code == 0
     assert visible_command in result.output
+
+
+def test_validate_all(mocker):
+    """Test bulk validation reports every test and fails on a bad one."""
+    from tpch_runner.tpch.databases.results import ValidationReport
+
+    mock_rm = mocker.MagicMock()
+    mock_rm.validate_powertests.return_value = [
+        ValidationReport(1, "pg_20250101_000000", list(range(1, 23)), [], {}),
+        ValidationReport(2, "pg_20250102_000000", list(range(2, 23)), [1], {}),
+    ]
+    runner = CliRunner()
+    result = runner.invoke(
+        power_commands.cli,
+        ["validate", "--all", "--since", "2025-01-01", "-j", "4"],
+        obj={"rm": mock_rm},
+    )
+
+    assert result.exit_code == 1
+    assert "pg_20250102_000000" in result.output
+    _, kwargs = mock_rm.validate_powertests.call_args
+    assert kwargs["since"].year == 2025
+    assert kwargs["jobs"] == 4
+
+
+def test_trend(mocker):
+    """Test trend reports rows of the SQL trend query and renders a chart."""
+    from datetime import datetime
+    from types import SimpleNamespace
+
+    mocker.patch.object(
+        power_commands, "get_db", return_value=SimpleNamespace(id=3, db_type="pg")
+    )
+    mocker.patch.object(power_commands.meta, "DBManager")
+    chart = mocker.patch.object(power_commands, "trendchart")
+    mock_rm = mocker.MagicMock()
+    mock_rm.query_trend.return_value = [
+        SimpleNamespace(
+            power_id=7,
+            testtime=datetime(2025, 1, 2),
+            runtime=1.5,
+            rolling_median=1.5,
+            pct_change=12.5,
+            zscore=None,
+        )
+    ]
+    runner = CliRunner()
+    result = runner.invoke(
+        power_commands.cli,
+        ["trend", "--db", "pg1", "--query", "18", "--last", "50"],
+        obj={"rm": mock_rm},
+    )
+
+    assert result.exit_code == 0
+    assert "12.5" in result.output
+    mock_rm.query_trend.assert_called_once_with(
+        3, "q18", last=50, window=5, baseline_id=None
+    )
+    assert chart.call_args[0][2].endswith("trend-pg1-q18.png")
@@ -6,7 +6,7 @@ from tpch_runner.commands import run_commands
 
 @pytest.mark.parametrize(
     "visible_command",
-    ["powertest", "query"],
+    ["checksum", "powertest", "query"],
 )
 def test_visible_command(visible_command):
     """Test visible commands in help message"""
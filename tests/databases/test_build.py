@@ -0,0 +1,146 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+from tpch_runner.tpch import SCHEMA_BASE, TABLE_DEPENDENCIES, all_tables
+from tpch_runner.tpch.build import DatabaseBuild, Stage, build_stages, run_stages
+from tpch_runner.tpch.databases import base
+
+
+class FakeConnection(base.Connection):
+    def open(self):
+        if self._cursor is None:
+            self._cursor = MagicMock()
+        return self
+
+
+class FakeRunner(base.TPCH_Runner):
+    """Record calls of build stages, tables other than nation have 4 rows."""
+
+    def __init__(self):
+        self._conn = FakeConnection("localhost", 5432, "tpch", "user", "pass")
+        self.calls: list[tuple[str, str]] = []
+
+    def create_tables(self):
+        self.calls.append(("create", "all"))
+
+    def drop_table(self, table="all"):
+        self.calls.append(("drop", table))
+
+    def truncate_table(self, table="all"):
+        self.calls.append(("truncate", table))
+
+    def load_single_table(self, table, data_folder=None, delimiter=",", split=1):
+        self.calls.append(("load", table))
+
+    def count_rows(self, table_name):
+        return {table_name: 25 if table_name == "nation" else 4}
+
+    def create_indexes(self, table="all"):
+        self.calls.append(("index", table))
+
+    def analyze(self, table="all"):
+        self.calls.append(("analyze", table))
+
+
+def test_build_stages():
+    stages = {stage.key: stage for stage in build_stages(foreign_keys=TABLE_DEPENDENCIES)}
+
+    assert len(stages) == 1 + 3 * len(all_tables)
+    assert stages[("load", "region")].deps == (("create", "all"),)
+    assert set(stages[("load", "lineitem")].deps) == {
+        ("create", "all"),
+        ("load", "orders"),
+        ("load", "partsupp"),
+    }
+    assert stages[("analyze", "orders")].deps == (("index", "orders"),)
+
+    stages = {stage.key: stage for stage in build_stages(["orders"], constraints=True)}
+    assert stages[("constraints", "orders")].deps == (("load", "orders"),)
+    assert stages[("index", "orders")].deps == (("constraints", "orders"),)
+
+    stages = {stage.key: stage for stage in build_stages(["nation"], index=False)}
+    assert list(stages) == [("create", "all"), ("load", "nation"), ("analyze", "nation")]
+    assert stages[("analyze", "nation")].deps == (("load", "nation"),)
+
+
+def test_run_stages_in_dependency_order():
+    events: list[tuple[str, tuple[str, str]]] = []
+    lock = threading.Lock()
+
+    def run(stage: Stage) -> base.TableLoad:
+        with lock:
+            events.append(("start", stage.key))
+        time.sleep(0.01)
+        with lock:
+            events.append(("end", stage.key))
+        return base.TableLoad(stage.table, 0.01, phase=stage.phase)
+
+    stages = build_stages(foreign_keys=TABLE_DEPENDENCIES)
+    results = run_stages(stages, run, jobs=4)
+
+    assert len(results) == len(stages)
+    position = {event: idx for idx, event in enumerate(events)}
+    for stage in stages:
+        for dep in stage.deps:
+            assert position[("end", dep)] < position[("start", stage.key)]
+    # stages of different tables overlap
+    assert any(
+        events[idx][0] == "start" and events[idx + 1][0] == "start"
+        for idx in range(len(events) - 1)
+    )
+
+
+def test_run_stages_skips_done_and_failed_dependencies():
+    finished = []
+
+    def run(stage: Stage) -> base.TableLoad:
+        error = "boom" if stage.key == ("load", "region") else None
+        return base.TableLoad(stage.table, 0.0, error, phase=stage.phase)
+
+    stages = build_stages(foreign_keys=TABLE_DEPENDENCIES)
+    results = run_stages(
+        stages, run, jobs=2, done=[("create", "all")], on_finish=finished.append
+    )
+
+    ran = {(result.phase, result.table) for result in results}
+    assert results == finished
+    assert ("create", "all") not in ran
+    assert ("load", "region") in ran
+    # everything depending on region directly or through foreign keys is skipped
+    for key in [("analyze", "region"), ("load", "nation"), ("load", "lineitem")]:
+        assert key not in ran
+    assert {("load", "part"), ("analyze", "part")} <= ran
+
+
+def test_database_build():
+    runner = FakeRunner()
+    build = DatabaseBuild(runner, "small", "/data", index=False, clean=True)
+    results = {
+        (result.phase, result.table): result
+        for result in build.run(done=[("create", "all")])
+    }
+
+    # unknown row counts of the scale are not checked, but fixed ones are
+    assert results[("load", "part")].rows == 4
+    assert results[("load", "nation")].error is None
+    assert "4 rows are loaded, 5 expected" in results[("load", "region")].error
+    assert ("truncate", "part") in runner.calls
+    assert ("index", "part") not in runner.calls
+    assert ("analyze", "part") in runner.calls
+    assert ("drop", "all") not in runner.calls
+
+
+def test_query_from_file_of_table():
+    conn = FakeConnection("localhost", 5432, "tpch", "user", "pass")
+    conn.query_from_file(str(SCHEMA_BASE.joinpath("pg", "pg_index.sql")), "part")
+    assert not conn._cursor.execute.called
+    conn.query_from_file(str(SCHEMA_BASE.joinpath("pg", "pg_index.sql")), "lineitem")
+    statements = [call.args[0] for call in conn._cursor.execute.call_args_list]
+    assert len(statements) == 3
+    assert all(" ON LINEITEM " in stmt for stmt in statements)
+    conn._cursor.reset_mock()
+
+    conn.query_from_file(str(SCHEMA_BASE.joinpath("mysql", "after-load.sql")), "part")
+    statements = [call.args[0] for call in conn._cursor.execute.call_args_list]
+    assert statements == ["ANALYZE TABLE `part`", "OPTIMIZE TABLE `part`"]
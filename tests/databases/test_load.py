@@ -0,0 +1,645 @@
+import gzip
+import re
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pymysql
+import pytest
+
+from tpch_runner.tpch import (
+    SMALL_DATA_DIR,
+    TABLE_DEPENDENCIES,
+    all_tables,
+    datafiles,
+    injection,
+)
+from tpch_runner.tpch.databases import base
+from tpch_runner.tpch.databases.duckdb import Duckdb_TPCH, DuckLDB
+from tpch_runner.tpch.databases.mysqldb import MySQL_TPCH, MySQLDB, index_definitions
+from tpch_runner.tpch.databases.pgdb import PG_TPCH, PGDB
+from tpch_runner.tpch.databases.rapidsdb import RDP_TPCH, RapidsDB, table_columns
+
+
+class FakeConnection(base.Connection):
+    def open(self):
+        return self
+
+
+class FakeRunner(base.TPCH_Runner):
+    def __init__(self, connection):
+        self._conn = connection
+        self.events: list[tuple[str, str]] = []
+        self.connections: list[base.Connection] = []
+        self.lock = threading.Lock()
+        # loaders are copies of the runner, count in a shared object
+        self.stats = {"active": 0, "max_active": 0}
+
+    def load_single_table(self, table, data_folder=None, delimiter=",", split=1):
+        with self.lock:
+            self.events.append(("start", table))
+            self.connections.append(self._conn)
+            self.stats["active"] += 1
+            self.stats["max_active"] = max(self.stats["max_active"], self.stats["active"])
+        if table == "part":
+            raise RuntimeError("no such file")
+        time.sleep(0.01)
+        with self.lock:
+            self.stats["active"] -= 1
+            self.events.append(("end", table))
+
+
+@pytest.fixture
+def runner():
+    return FakeRunner(FakeConnection("localhost", 5432, "tpch", "user", "pass"))
+
+
+def test_load_tables_concurrently(runner):
+    loads, _ = runner.load_data(data_folder=str(SMALL_DATA_DIR), jobs=4)
+
+    assert sorted(load.table for load in loads) == sorted(all_tables)
+    assert runner.stats["max_active"] > 1
+    # one connection per table, none of them the runner's own connection
+    assert len({id(conn) for conn in runner.connections}) == len(all_tables)
+    assert runner._conn not in runner.connections
+    errors = {load.table: load.error for load in loads if load.error}
+    assert errors == {"part": "no such file"}
+    # largest data file is among the first batch of tables started
+    assert ("start", "lineitem") in runner.events[:4]
+
+
+def test_load_in_foreign_key_order(runner):
+    runner.foreign_keys = TABLE_DEPENDENCIES
+    runner.load_data(data_folder=str(SMALL_DATA_DIR), jobs=8)
+
+    position = {event: idx for idx, event in enumerate(runner.events)}
+    for table, references in TABLE_DEPENDENCIES.items():
+        for referenced in references:
+            end = position.get(("end", referenced), position[("start", referenced)])
+            assert end < position[("start", table)]
+
+
+def test_load_single_table(runner):
+    loads, _ = runner.load_data("nation", data_folder=str(SMALL_DATA_DIR), jobs=4)
+    assert [load.table for load in loads] == ["nation"]
+    with pytest.raises(ValueError):
+        runner.load_data("nations")
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    data_file = tmp_path.joinpath("lineitem.tbl")
+    data_file.write_bytes(
+        b"".join(f"{i}|line {i}|{'x' * (i % 7)}|\n".encode() for i in range(1000))
+    )
+    return data_file
+
+
+@pytest.mark.parametrize("parts", [1, 2, 7, 64])
+def test_split_ranges(data_file, parts):
+    content = data_file.read_bytes()
+    ranges = datafiles.split_ranges(data_file, parts)
+
+    assert len(ranges) == parts
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(content)
+    chunks = []
+    for byte_range in ranges:
+        with datafiles.open_range(data_file, byte_range) as f:
+            chunk = f.read()
+        assert chunk.endswith(b"\n")
+        chunks.append(chunk)
+    assert b"".join(chunks) == content
+
+
+def test_range_fifo(data_file):
+    byte_range = datafiles.split_ranges(data_file, 3)[1]
+    with datafiles.range_fifo(data_file, byte_range) as fifo:
+        with open(fifo, "rb") as f:
+            assert f.read() == data_file.read_bytes()[slice(*byte_range)]
+
+    # a reader that never opens the pipe does not block
+    with datafiles.range_fifo(data_file, byte_range) as fifo:
+        pass
+    assert not fifo.exists()
+
+
+class FakePGDB(PGDB):
+    copied: list[bytes] = []
+
+    def open(self):
+        if self._connection is None:
+            self._connection = MagicMock()
+            self._cursor = MagicMock()
+            self._cursor.copy_expert.side_effect = (
+                lambda sql, f, size=8192: self.copied.append(f.read())
+            )
+        return self._connection
+
+
+def test_pg_load_in_ranges(mocker, data_file):
+    mocker.patch.object(datafiles.Config, "load_split_min_size", 0)
+    conn = FakePGDB("localhost", 5432, "tpch", "user", "pass")
+    runner = PG_TPCH(conn, 1)
+    runner.load_single_table("lineitem", data_folder=str(data_file.parent), split=4)
+
+    assert len(FakePGDB.copied) == 4
+    chunks = sorted(FakePGDB.copied, key=lambda chunk: int(chunk.split(b"|")[0]))
+    assert b"".join(chunks) == data_file.read_bytes()
+
+
+def test_pg_load_error_is_reported(data_file):
+    conn = FakePGDB("localhost", 5432, "tpch", "user", "pass")
+    load = PG_TPCH(conn, 1)._load_table("orders", str(data_file.parent), "|")
+
+    assert load.table == "orders"
+    assert "orders" in load.error
+
+
+def test_load_pieces_bounded_by_split(runner, tmp_path, mocker):
+    mocker.patch("os.cpu_count", return_value=64)
+    pieces = [datafiles.DataPiece(tmp_path.joinpath(f"orders.tbl.{i}")) for i in range(8)]
+    stats = {"active": 0, "max_active": 0}
+
+    def load_piece(conn, piece):
+        with runner.lock:
+            stats["active"] += 1
+            stats["max_active"] = max(stats["max_active"], stats["active"])
+        time.sleep(0.01)
+        with runner.lock:
+            stats["active"] -= 1
+
+    runner._load_pieces("orders", pieces, load_piece, split=2)
+    assert stats["max_active"] == 2
+    stats["max_active"] = 0
+    runner._load_pieces("orders", pieces, load_piece)
+    assert stats["max_active"] == 1
+
+
+def test_table_files(tmp_path):
+    for name in ["lineitem.tbl.10", "lineitem.tbl.2", "lineitem.tbl.1", "orders.tbl"]:
+        tmp_path.joinpath(name).write_text("1|\n")
+
+    shards = datafiles.table_files(tmp_path, "lineitem")
+    assert [f.name for f in shards] == [
+        "lineitem.tbl.1",
+        "lineitem.tbl.2",
+        "lineitem.tbl.10",
+    ]
+    assert [f.name for f in datafiles.table_files(tmp_path, "orders")] == ["orders.tbl"]
+    with pytest.raises(FileNotFoundError):
+        datafiles.table_files(tmp_path, "part")
+
+
+def test_expected_rows():
+    assert datafiles.expected_rows("nation", None) == 25
+    assert datafiles.expected_rows("orders", "sf10") == 15_000_000
+    assert datafiles.expected_rows("supplier", "0.1") == 1_000
+    assert datafiles.expected_rows("lineitem", 1) == 6_001_215
+    assert datafiles.expected_rows("lineitem", "0.1") is None
+    assert datafiles.expected_rows("orders", "small") is None
+    assert datafiles.scale_of_folder("/data/sf100") == "100"
+    assert datafiles.scale_of_folder("/data/small") is None
+
+
+def test_pg_load_shard_set(data_file):
+    content = data_file.read_bytes().splitlines(keepends=True)
+    for idx in range(3):
+        data_file.with_name(f"lineitem.tbl.{idx + 1}").write_bytes(
+            b"".join(content[idx::3])
+        )
+    FakePGDB.copied.clear()
+    conn = FakePGDB("localhost", 5432, "tpch", "user", "pass")
+    PG_TPCH(conn, 1).load_single_table("lineitem", data_folder=str(data_file.parent))
+
+    assert len(FakePGDB.copied) == 3
+    assert sorted(b"".join(FakePGDB.copied).splitlines()) == sorted(
+        data_file.read_bytes().splitlines()
+    )
+
+
+def test_verify_rows(runner, mocker):
+    counts = {"nation": 25, "region": 5, "orders": 1_500_000, "lineitem": 6_000_000}
+    mocker.patch.object(runner, "count_rows", return_value=counts)
+
+    assert runner.verify_rows("1") == [("lineitem", 6_000_000, 6_001_215)]
+    assert runner.verify_rows("small") == []
+
+
+@pytest.fixture
+def fake_dbgen(mocker):
+    """Replace dbgen by a shell command writing two rows of the table."""
+
+    def command(table, sf, chunks=1, step=None):
+        name = f"{table}.tbl" if step is None else f"{table}.tbl.{step}"
+        return [
+            "sh",
+            "-c",
+            f'printf "{step}|{table}|\\n{step}|{sf}|\\n" > "$DSS_PATH/{name}"',
+        ]
+
+    return mocker.patch.object(injection, "dbgen_command", side_effect=command)
+
+
+def test_dbgen_pipes(fake_dbgen):
+    with injection.dbgen_pipes(10, tables=["nation", "lineitem"], chunks=2) as folder:
+        assert [f.name for f in datafiles.table_files(folder, "nation")] == ["nation.tbl"]
+        shards = datafiles.table_files(folder, "lineitem")
+        assert [f.name for f in shards] == ["lineitem.tbl.1", "lineitem.tbl.2"]
+        assert all(f.is_fifo() for f in shards)
+        assert shards[1].read_text() == "2|lineitem|\n2|10|\n"
+        shards[0].read_text()
+        folder.joinpath("nation.tbl").read_text()
+    assert not folder.exists()
+
+
+def test_dbgen_pipes_not_read(mocker, fake_dbgen):
+    mocker.patch.object(injection, "DBGEN_EXIT_TIMEOUT", 0.1)
+    with pytest.raises(RuntimeError, match="nation.tbl: output is not read to the end"):
+        with injection.dbgen_pipes(1, tables=["nation"]):
+            pass
+
+
+def test_dbgen_pipes_failure(fake_dbgen):
+    fake_dbgen.side_effect = lambda *args: [
+        "sh",
+        "-c",
+        "sleep 0.2; echo no dists.dss >&2; exit 1",
+    ]
+    with pytest.raises(RuntimeError, match="region.tbl: no dists.dss"):
+        with injection.dbgen_pipes(1, tables=["region"]) as folder:
+            # a loader waiting for dbgen sees an empty file rather than hanging
+            with open(folder.joinpath("region.tbl")) as f:
+                assert f.read() == ""
+
+
+def test_pg_load_from_dbgen(fake_dbgen):
+    FakePGDB.copied.clear()
+    conn = FakePGDB("localhost", 5432, "tpch", "user", "pass")
+    with injection.dbgen_pipes(1, tables=["orders"], chunks=3) as folder:
+        PG_TPCH(conn, 1).load_single_table("orders", data_folder=str(folder))
+
+    assert sorted(FakePGDB.copied) == [b"%d|orders|\n%d|1|\n" % (i, i) for i in (1, 2, 3)]
+
+
+@pytest.mark.parametrize("block_size", [3, 7, 1024 * 1024])
+def test_strip_trailing_delimiter(mocker, tmp_path, block_size):
+    mocker.patch.object(datafiles, "STREAM_BLOCK_SIZE", block_size)
+    raw = tmp_path.joinpath("region.tbl")
+    raw.write_bytes(b"0|AFRICA|lar deposits||\n1|AMERICA|hs use ironic|\n2|ASIA|x|")
+    assert datafiles.has_trailing_delimiter(raw, "|")
+    with datafiles.open_range(raw, strip_delimiter="|") as f:
+        assert f.read() == b"0|AFRICA|lar deposits|\n1|AMERICA|hs use ironic\n2|ASIA|x"
+
+    # lines without a trailing delimiter are left as they are
+    csv = tmp_path.joinpath("region.csv")
+    csv.write_bytes(b"0,AFRICA,\n1,AMERICA,x,\n")
+    raw.write_bytes(b"0|AFRICA|x\n1|AMERICA||\n")
+    assert not datafiles.has_trailing_delimiter(raw, "|")
+    for data_file, delimiter in [(raw, "|"), (csv, "|")]:
+        with datafiles.open_range(data_file, strip_delimiter=delimiter) as f:
+            assert f.read() == data_file.read_bytes()
+
+
+def test_pg_load_raw_dbgen_file(data_file):
+    raw = data_file.with_name("orders.tbl")
+    raw.write_bytes(data_file.read_bytes().replace(b"\n", b"|\n"))
+    FakePGDB.copied.clear()
+    conn = FakePGDB("localhost", 5432, "tpch", "user", "pass")
+    PG_TPCH(conn, 1).load_single_table("orders", str(raw.parent), delimiter="|")
+
+    assert FakePGDB.copied == [data_file.read_bytes()]
+
+
+class FakeMySQLDB(MySQLDB):
+    loaded: list[tuple[str, bytes]] = []
+
+    def open(self):
+        if self._connection is None:
+            self._connection = MagicMock()
+            self._cursor = MagicMock()
+            self._cursor.execute.side_effect = self.execute
+        return self._connection
+
+    def execute(self, sql):
+        infile = sql.split("'")[1]
+        with open(infile, "rb") as f:
+            self.loaded.append((sql.split("lines terminated by ")[-1].strip(), f.read()))
+
+
+def test_mysql_load_raw_dbgen_file(fake_dbgen, data_file):
+    FakeMySQLDB.loaded.clear()
+    conn = FakeMySQLDB("localhost", 3306, "tpch", "user", "pass")
+    MySQL_TPCH(conn, 1).load_single_table(
+        "lineitem", delimiter="|", data_folder=str(data_file.parent)
+    )
+    # raw data file, the trailing delimiter is part of the line terminator
+    assert FakeMySQLDB.loaded == [("'|\\n'", data_file.read_bytes())]
+
+    FakeMySQLDB.loaded.clear()
+    with injection.dbgen_pipes(1, tables=["nation"]) as folder:
+        MySQL_TPCH(conn, 1).load_single_table(
+            "nation", delimiter="|", data_folder=str(folder)
+        )
+    # dbgen pipe, the trailing delimiter is stripped while relayed
+    assert FakeMySQLDB.loaded[0][1] == b"None|nation\nNone|1\n"
+
+
+@pytest.fixture
+def gz_file(data_file):
+    gz_file = data_file.with_name("orders.tbl.gz")
+    gz_file.write_bytes(gzip.compress(data_file.read_bytes()))
+    return gz_file
+
+
+def test_compressed_files(tmp_path, gz_file, data_file):
+    for name in ["lineitem.tbl.2.zst", "lineitem.tbl.1.zst", "lineitem.tbl.10.zst"]:
+        tmp_path.joinpath(name).write_bytes(b"")
+
+    assert datafiles.table_files(tmp_path, "orders") == [gz_file]
+    shards = [f.name for f in datafiles.table_files(tmp_path, "lineitem")]
+    assert shards == ["lineitem.tbl.1.zst", "lineitem.tbl.2.zst", "lineitem.tbl.10.zst"]
+    assert Duckdb_TPCH._sources(str(tmp_path), "lineitem") == [
+        [tmp_path.joinpath(name) for name in shards]
+    ]
+    # compressed files are never split into byte ranges
+    assert datafiles.plan_pieces([gz_file], 8) == [datafiles.DataPiece(gz_file)]
+
+    with datafiles.open_range(gz_file) as f:
+        assert f.readline() == data_file.read_bytes().splitlines(keepends=True)[0]
+    with datafiles.open_range(gz_file, strip_delimiter="|") as f:
+        assert f.read() == data_file.read_bytes().replace(b"|\n", b"\n")
+
+
+def test_corrupt_compressed_file(tmp_path):
+    corrupt = tmp_path.joinpath("orders.tbl.gz")
+    corrupt.write_bytes(gzip.compress(b"1|2|\n" * 1000)[:-20])
+    with pytest.raises(OSError, match="gzip -dc"):
+        with datafiles.open_range(corrupt) as f:
+            f.read()
+    with pytest.raises(OSError, match="gzip -dc"):
+        with datafiles.range_fifo(corrupt) as fifo:
+            fifo.read_bytes()
+
+
+def test_load_compressed_file(gz_file, data_file):
+    FakePGDB.copied.clear()
+    conn = FakePGDB("localhost", 5432, "tpch", "user", "pass")
+    PG_TPCH(conn, 1).load_single_table("orders", str(gz_file.parent), delimiter="|")
+    assert FakePGDB.copied == [data_file.read_bytes().replace(b"|\n", b"\n")]
+
+    FakeMySQLDB.loaded.clear()
+    conn = FakeMySQLDB("localhost", 3306, "tpch", "user", "pass")
+    MySQL_TPCH(conn, 1).load_single_table(
+        "orders", delimiter="|", data_folder=str(gz_file.parent)
+    )
+    assert FakeMySQLDB.loaded == [("'|\\n'", data_file.read_bytes())]
+
+
+class CursorPGDB(FakePGDB):
+    """Keep one cursor across opens, to inspect statements of closed connections."""
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.cursor = MagicMock()
+
+    def open(self):
+        self._connection = self._connection or MagicMock()
+        self._cursor = self.cursor
+        return self._connection
+
+
+def test_pg_bulk_load(mocker):
+    mocker.patch.object(PG_TPCH, "_primary_key", return_value=None)
+    conn = CursorPGDB("localhost", 5432, "tpch", "user", "pass")
+    runner = PG_TPCH(conn, 1)
+    assert not runner.bulk_load
+    runner.bulk_load = True
+    assert runner.defers_constraints
+
+    runner.create_tables()
+    statements = [call.args[0] for call in conn.cursor.execute.call_args_list]
+    creates = [stmt for stmt in statements if "create" in stmt.lower()]
+    assert len(creates) == len(all_tables)
+    assert all(stmt.startswith("CREATE UNLOGGED TABLE") for stmt in creates)
+    conn.cursor.reset_mock()
+
+    runner.load_single_table("nation", data_folder=str(SMALL_DATA_DIR))
+    statements = [call.args[0] for call in conn.cursor.execute.call_args_list]
+    assert statements == ["truncate nation"]
+    assert "FREEZE true" in conn.cursor.copy_expert.call_args.args[0]
+    conn.cursor.reset_mock()
+
+    runner.add_constraints("nation")
+    statements = [call.args[0] for call in conn.cursor.execute.call_args_list]
+    assert statements[0] == "set maintenance_work_mem = '1GB'"
+    assert "PRIMARY KEY (N_NATIONKEY)" in statements[1]
+    assert statements[-1] == "alter table nation set logged"
+
+
+def test_pg_bulk_load_fails_on_truncate(mocker, data_file):
+    mocker.patch.object(datafiles.Config, "load_split_min_size", 0)
+    conn = CursorPGDB("localhost", 5432, "tpch", "user", "pass")
+    conn.cursor.execute.side_effect = RuntimeError("permission denied")
+    runner = PG_TPCH(conn, 1)
+    runner.bulk_load = True
+
+    with pytest.raises(RuntimeError):
+        runner.load_single_table("lineitem", str(data_file.parent), "|", split=4)
+    conn.cursor.copy_expert.assert_not_called()
+
+
+def test_pg_load_without_bulk_mode():
+    conn = CursorPGDB("localhost", 5432, "tpch", "user", "pass")
+    runner = PG_TPCH(conn, 1)
+    assert not runner.defers_constraints
+
+    runner.load_single_table("nation", data_folder=str(SMALL_DATA_DIR))
+    assert not conn.cursor.execute.called
+    assert "FREEZE" not in conn.cursor.copy_expert.call_args.args[0]
+    runner.add_constraints()
+    assert not conn.cursor.execute.called
+
+
+def test_after_load_phases():
+    runner = FakeRunner(FakeConnection("localhost", 5432, "tpch", "user", "pass"))
+    assert [p.phase for p in runner.after_load(reindex=True)] == ["index", "analyze"]
+
+    runner.defers_constraints = True
+    phases = runner.after_load(table="orders")
+    assert [(p.phase, p.table) for p in phases] == [
+        ("constraints", "orders"),
+        ("analyze", "orders"),
+    ]
+
+
+class SessionMySQLDB(MySQLDB):
+    """Record statements of all connections, setting a session variable fails."""
+
+    statements: list[str] = []
+
+    def open(self):
+        if self._connection is None:
+            self._connection = MagicMock()
+            self._cursor = MagicMock(rowcount=0)
+            self._cursor.execute.side_effect = self.execute
+            self._set_session()
+        return self._connection
+
+    def execute(self, sql):
+        if "sql_log_bin" in sql:
+            raise pymysql.err.OperationalError(1227, "Access denied")
+        self.statements.append(sql)
+        return 0
+
+
+def test_mysql_load_session(mocker):
+    SessionMySQLDB.statements.clear()
+    runner = MySQL_TPCH(SessionMySQLDB("localhost", 3306, "tpch", "user", "pass"), 1)
+    runner.before_load()
+
+    worker = runner.clone()
+    assert worker._conn.session == runner._conn.session
+    with worker._conn as conn:
+        conn.query("select 1")
+    assert SessionMySQLDB.statements == [
+        "set session unique_checks = 0",
+        "set session foreign_key_checks = 0",
+        "select 1",
+    ]
+
+    mocker.patch.object(base.TPCH_Runner, "after_load", return_value=[])
+    runner.after_load()
+    assert runner._conn.session == {}
+
+
+def test_mysql_create_indexes():
+    indexes = index_definitions(str(MySQL_TPCH.schema_dir.joinpath("mysql_index.sql")))
+    assert "part" not in indexes
+    assert indexes["lineitem"] == [
+        ("IDX_LINEITEM_ORDERKEY", "L_ORDERKEY"),
+        ("IDX_LINEITEM_PART_SUPP", "L_PARTKEY,L_SUPPKEY"),
+        ("IDX_LINEITEM_SHIPDATE", "L_SHIPDATE, L_DISCOUNT, L_QUANTITY"),
+    ]
+
+    SessionMySQLDB.statements.clear()
+    runner = MySQL_TPCH(SessionMySQLDB("localhost", 3306, "tpch", "user", "pass"), 1)
+    runner.create_indexes()
+    alters = [stmt for stmt in SessionMySQLDB.statements if stmt.startswith("alter")]
+    assert len(alters) == len(indexes)
+    assert (
+        "alter table lineitem add index IDX_LINEITEM_ORDERKEY (L_ORDERKEY), "
+        "add index IDX_LINEITEM_PART_SUPP (L_PARTKEY,L_SUPPKEY), "
+        "add index IDX_LINEITEM_SHIPDATE (L_SHIPDATE, L_DISCOUNT, L_QUANTITY)"
+    ) in alters
+
+
+@pytest.fixture
+def duck_runner(tmp_path):
+    conn = DuckLDB.__new__(DuckLDB)
+    base.Connection.__init__(conn, None, None, None, None, None)
+    conn.kwargs = {}
+    conn.db_file = tmp_path.joinpath("tpch.duckdb")
+    conn._connection = None
+    runner = Duckdb_TPCH(conn, 1)
+    runner.create_tables()
+    return runner
+
+
+def test_duckdb_load_with_column_types(duck_runner, tmp_path, mocker):
+    mocker.patch.object(datafiles.Config, "duckdb_threads", 2)
+    data = tmp_path.joinpath("data")
+    data.mkdir()
+    # raw dbgen lines end with the delimiter, a shard set is read in one go
+    data.joinpath("region.tbl.1").write_text("0|AFRICA|lar deposits|\n1|AMERICA|hs|\n")
+    data.joinpath("region.tbl.2.gz").write_bytes(gzip.compress(b"2|ASIA|ges|\n"))
+    duck_runner.load_single_table("region", delimiter="|", data_folder=str(data))
+
+    with duck_runner._conn as conn:
+        conn.query("select current_setting('threads')")
+        assert conn.fetch() == [(2,)]
+        conn.query("select r_regionkey, r_name from region order by 1")
+        assert conn.fetch() == [(0, "AFRICA"), (1, "AMERICA"), (2, "ASIA")]
+
+
+def test_duckdb_load_reports_each_table(duck_runner, tmp_path):
+    data = tmp_path.joinpath("data")
+    data.mkdir()
+    data.joinpath("region.tbl").write_text("0|AFRICA|lar deposits|\n")
+    loads, _ = duck_runner.load_data(data_folder=str(data), delimiter="|")
+
+    errors = {load.table: load.error for load in loads}
+    assert errors.pop("region") is None
+    assert sorted(errors) == sorted(set(all_tables) - {"region"})
+    assert all(errors.values())
+    loads, _ = duck_runner.load_data("region", str(data), "|")
+    assert [load.table for load in loads] == ["region"]
+
+
+def test_duckdb_load_parquet(duck_runner, tmp_path):
+    parquet_dir = tmp_path.joinpath("data", "nation")
+    parquet_dir.mkdir(parents=True)
+    with duck_runner._conn as conn:
+        for key in range(2):
+            conn.query(
+                f"copy (select {key} as n_nationkey, 'N{key}' as n_name, 0 as "
+                "n_regionkey, '' as n_comment) "
+                f"to '{parquet_dir.joinpath(f'{key}.parquet')}' (format parquet)"
+            )
+    duck_runner.load_single_table("nation", data_folder=str(tmp_path.joinpath("data")))
+    with duck_runner._conn as conn:
+        conn.query("select n_nationkey, n_name from nation order by 1")
+        assert conn.fetch() == [(0, "N0"), (1, "N1")]
+
+
+class FakeRapidsDB(RapidsDB):
+    statements: list[str] = []
+
+    def open(self):
+        if self._connection is None:
+            self._connection = MagicMock()
+            self._cursor = MagicMock(rowcount=0)
+            self._cursor.execute.side_effect = self.statements.append
+        return self._connection
+
+
+def test_rapidsdb_table_columns():
+    columns = table_columns(str(RDP_TPCH.schema_dir.joinpath("table_schema.sql")))
+    assert sorted(columns) == sorted(all_tables)
+    assert len(columns["lineitem"]) == 16
+    assert columns["partsupp"][3] == ("ps_supplycost", "decimal(15,2)")
+    assert columns["part"][4] == ("p_type", "varchar(25)")
+
+
+def test_rapidsdb_load_shards_across_nodes(mocker, tmp_path):
+    mocker.patch.object(RapidsDB, "_ensure_impex_connector")
+    mocker.patch.object(datafiles.Config, "rapidsdb_nodes", ["node1", "node2"])
+    for idx in range(1, 4):
+        tmp_path.joinpath(f"orders.tbl.{idx}").write_text("")
+    tmp_path.joinpath("region.tbl").write_text("")
+    tmp_path.joinpath("nation.tbl").write_text("")
+    FakeRapidsDB.statements.clear()
+    runner = RDP_TPCH(FakeRapidsDB("localhost", 4333, "moxe", "user", "pass"), 1)
+
+    runner.load_single_table("orders", data_folder=str(tmp_path), delimiter="|")
+    assert sorted(
+        re.search(r"node://\w+/[\w.]+", stmt).group(0)  # type: ignore
+        for stmt in FakeRapidsDB.statements
+    ) == [
+        "node://node1/orders.tbl.1",
+        "node://node1/orders.tbl.3",
+        "node://node2/orders.tbl.2",
+    ]
+    assert all("moxe.orders" in stmt for stmt in FakeRapidsDB.statements)
+
+    FakeRapidsDB.statements.clear()
+    runner.load_single_table("region", data_folder=str(tmp_path), delimiter="|")
+    assert FakeRapidsDB.statements == [
+        "insert into moxe.region select r_regionkey, r_name, r_comment "
+        "from (csv::'node://node1/region.tbl') "
+        "as s(r_regionkey integer, r_name varchar(25), r_comment varchar(152))"
+    ]
+
+    # single file tables are spread over the nodes by table
+    FakeRapidsDB.statements.clear()
+    runner.load_single_table("nation", data_folder=str(tmp_path), delimiter="|")
+    assert "node://node2/nation.tbl" in FakeRapidsDB.statements[0]
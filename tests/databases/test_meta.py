@@ -1,8 +1,10 @@
+from datetime import datetime
 from itertools import cycle
 from unittest.mock import MagicMock, create_autospec, patch
 
+import duckdb
 import pytest
-from sqlalchemy import inspect
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.orm import Session
 
 from tpch_runner import meta
@@ -18,6 +20,30 @@ def test_tables_exist(session):
     assert "powertests" in tables
 
 
+def test_migrate_existing_database(tmp_path):
+    """Databases created before schema versioning are migrated to the latest."""
+    engine = create_engine(f"sqlite:///{tmp_path}/results.db")
+    meta.Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ALTER TABLE results DROP COLUMN valid")
+
+    assert meta.migrate(engine) == len(meta.MIGRATIONS)
+    columns = [column["name"] for column in inspect(engine).get_columns("results")]
+    assert "valid" in columns
+    # migrations are applied once
+    assert meta.migrate(engine) == len(meta.MIGRATIONS)
+    with engine.connect() as conn:
+        versions = conn.execute(meta.select(meta.schema_version.c.version)).all()
+    assert len(versions) == len(meta.MIGRATIONS)
+
+
+def test_engine_is_created_once(tmp_path):
+    db_url = f"sqlite:///{tmp_path}/results.db"
+    engine = meta.get_engine(db_url)
+    assert meta.get_engine(db_url) is engine
+    assert "powertests" in inspect(engine).get_table_names()
+
+
 def test_cascade_delete(session):
     db = meta.Database(
         db_type="mysql",
@@ -117,7 +143,7 @@ class Test_TestResultManager:
         pt_class.Session = MagicMock(return_value=mock_session)
 
         with pytest.raises(ValueError, match="PowerTest 123 not found."):
-            pt_class.compare_powertest(123)
+            pt_class.compare_powertest(123, jobs=1)
 
     def test_compare_powertest_success(self, mocker, session):
         """Test sucessful comparison."""
@@ -140,11 +166,11 @@ class Test_TestResultManager:
         pt_class = meta.TestResultManager(session.bind)
         pt_class.Session = MagicMock(return_value=mock_session)
 
-        all_pass, pt_folder = pt_class.compare_powertest(1)
+        all_pass, pt_folder = pt_class.compare_powertest(1, jobs=1)
 
         assert all_pass is True
         assert pt_folder == "test_folder"
-        mock_compare.assert_called_with("21.csv")
+        mock_compare.assert_called_with("22.csv")
 
     def test_compare_powertest_failure(self, mocker, session):
         """Test compare_powertest() returns False when some unmatched results found."""
@@ -165,11 +191,11 @@ class Test_TestResultManager:
         pt_class = meta.TestResultManager(session.bind)
         pt_class.Session = MagicMock(return_value=mock_session)
 
-        all_pass, pt_folder = pt_class.compare_powertest(1)
+        all_pass, pt_folder = pt_class.compare_powertest(1, jobs=1)
 
         assert all_pass is False
         assert pt_folder == "test_folder"
-        mock_compare.assert_any_call("21.csv")
+        mock_compare.assert_any_call("22.csv")
 
     def test_compare_powertest_comparison_calls(self, mocker, session):
         """Test correct number of results are compared."""
@@ -189,9 +215,10 @@ class Test_TestResultManager:
         pt_class = meta.TestResultManager(session.bind)
         pt_class.Session = MagicMock(return_value=mock_session)
 
-        pt_class.compare_powertest(1)
+        pt_class.compare_powertest(1, jobs=1)
 
-        for i in range(1, 22):
+        assert mock_compare.call_count == 22
+        for i in range(1, 23):
             mock_compare.assert_any_call(f"{i}.csv")
 
     def test_compare_powertest_logging_on_failure(self, mocker, session, caplog):
@@ -211,7 +238,7 @@ class Test_TestResultManager:
 
         pt_class = meta.TestResultManager(session.bind)
         pt_class.Session = MagicMock(return_value=mock_session)
-        pt_class.compare_powertest(1)
+        pt_class.compare_powertest(1, jobs=1)
 
         err = "Query 1 result is not matched against answer. Test failed."
         assert err in caplog.text
@@ -237,7 +264,7 @@ class Test_TestResultManager:
         with patch("tpch_runner.meta.Result.compare_against_answer") as mock_compare:
             mock_compare.side_effect = FileNotFoundError("Answer folder not exists:")
             with pytest.raises(FileNotFoundError, match="Answer folder not exists:"):
-                pt_class.compare_powertest(1)
+                pt_class.compare_powertest(1, jobs=1)
 
     def test_compare_powertest_nonexisting_record(self, mocker, session):
         """Test non-existing powertest record."""
@@ -250,4 +277,466 @@ class Test_TestResultManager:
         pt_class.Session = MagicMock(return_value=mock_session)
 
         with pytest.raises(ValueError, match="PowerTest 1 not found"):
-            pt_class.compare_powertest(1)
+            pt_class.compare_powertest(1, jobs=1)
+
+
+class Test_ResultStore:
+    @pytest.fixture
+    def store(self, mocker, tmp_path):
+        store = meta.result_store
+        mocker.patch.object(store, "root", tmp_path)
+        mocker.patch("tpch_runner.meta.RESULT_DIR", tmp_path)
+        return store
+
+    @pytest.fixture
+    def manager(self, session):
+        session.add(
+            meta.Database(
+                id=1,
+                db_type="pg",
+                host="localhost",
+                port="5432",
+                user="user",
+                password="pass",
+                dbname="tpch",
+            )
+        )
+        for folder in ("pg_1", "pg_2"):
+            session.add(
+                meta.PowerTest(
+                    db_type="pg", scale="small", result_folder=folder, database_id=1
+                )
+            )
+        session.commit()
+        return meta.TestResultManager(session.bind)
+
+    def add_result(self, manager, key, folder):
+        manager.add_test_result(
+            db_type="pg",
+            success=True,
+            rowcount=1,
+            result_csv=key,
+            query_name="q1",
+            runtime=0.1,
+            result_folder=folder,
+            db_id=1,
+        )
+
+    def test_identical_results_are_stored_once(self, store, manager, session):
+        key1 = store.put(b"a,b\n1,2\n")
+        key2 = store.put(b"a,b\n1,2\n")
+        assert key1 == key2
+        assert key1.startswith("objects/")
+        assert len(list(store.root.glob("objects/*/*.csv"))) == 1
+
+        self.add_result(manager, key1, "pg_1")
+        self.add_result(manager, key2, "pg_2")
+        assert session.get(meta.ResultObject, key1).refcount == 2
+
+    def test_delete_powertest_keeps_referenced_objects(self, store, manager, session):
+        key = store.put(b"a,b\n1,2\n")
+        self.add_result(manager, key, "pg_1")
+        self.add_result(manager, key, "pg_2")
+
+        manager.delete_powertest(result_folder="pg_1")
+        assert store.path(key).is_file()
+        session.expire_all()
+        assert session.get(meta.ResultObject, key).refcount == 1
+
+        manager.delete_powertest(result_folder="pg_2")
+        assert not store.path(key).exists()
+        session.expire_all()
+        assert session.get(meta.ResultObject, key) is None
+
+    def test_delete_powertest_is_atomic(self, store, manager, session, mocker):
+        key = store.put(b"a,b\n1,2\n")
+        self.add_result(manager, key, "pg_1")
+        mocker.patch.object(
+            meta.TestResultManager, "_unref_objects", side_effect=RuntimeError
+        )
+
+        with pytest.raises(RuntimeError):
+            manager.delete_powertest(result_folder="pg_1")
+        session.expire_all()
+        assert session.query(meta.TestResult).count() == 1
+        assert session.query(meta.PowerTest).count() == 2
+
+    def test_result_object_race_is_retried(self, store, manager, session, mocker):
+        key = store.put(b"a,b\n1,2\n")
+        error = meta.IntegrityError("insert", {}, Exception("UNIQUE constraint"))
+        mocker.patch.object(
+            meta.TestResultManager, "_ref_object", side_effect=[error, None]
+        )
+        mocker.patch("tpch_runner.meta.time.sleep")
+
+        self.add_result(manager, key, "pg_1")
+        assert meta.TestResultManager._ref_object.call_count == 2
+        assert session.query(meta.TestResult).count() == 1
+
+    def test_missing_result_object_is_not_recorded(self, store, manager, session):
+        key = store.put(b"a,b\n1,2\n")
+        # deleted by another host between put and recording the result
+        store.remove(key)
+
+        with pytest.raises(FileNotFoundError):
+            self.add_result(manager, key, "pg_1")
+        assert session.get(meta.ResultObject, key) is None
+
+    def test_removed_result_object_is_stored_again(self, store, manager, session):
+        data = b"a,b\n1,2\n"
+        key = store.put(data)
+        store.remove(key)
+
+        manager.add_test_result("pg", True, 1, key, "q1", 0.1, "pg_1", 1, data)
+        assert store.path(key).read_bytes() == data
+        obj = session.get(meta.ResultObject, key)
+        assert (obj.refcount, obj.size) == (1, len(data))
+
+    def test_result_store_must_be_shared(self, store, manager, mocker, tmp_path):
+        self.add_result(manager, store.put(b"a,b\n1,2\n"), "pg_1")
+
+        # another runner host with its own result_dir
+        mocker.patch.object(store, "root", tmp_path / "other")
+        with pytest.raises(RuntimeError, match="share result_dir"):
+            self.add_result(manager, store.put(b"a,b\n1,2\n"), "pg_2")
+
+
+class Test_ListQueries:
+    @pytest.fixture
+    def manager(self, session):
+        session.add(
+            meta.Database(
+                id=1,
+                db_type="pg",
+                host="localhost",
+                port="5432",
+                user="user",
+                password="pass",
+                dbname="tpch",
+            )
+        )
+        for day in range(1, 6):
+            folder = f"pg_2025010{day}"
+            testtime = datetime(2025, 1, day)
+            session.add(
+                meta.PowerTest(
+                    db_type="pg",
+                    scale="small",
+                    result_folder=folder,
+                    testtime=testtime,
+                    database_id=1,
+                )
+            )
+            for query in ("q1", "q2"):
+                session.add(
+                    meta.TestResult(
+                        db_type="pg",
+                        success=True,
+                        rowcount=1,
+                        result_csv="x.csv",
+                        query_name=query,
+                        testtime=testtime,
+                        result_folder=folder,
+                        database_id=1,
+                    )
+                )
+        session.add(
+            meta.TestResult(
+                db_type="pg",
+                success=True,
+                rowcount=1,
+                result_csv="single.csv",
+                query_name="q3",
+                database_id=1,
+            )
+        )
+        session.commit()
+        return meta.TestResultManager(session.bind)
+
+    def test_indexes(self, session):
+        indexes = {ix["name"] for ix in inspect(session.bind).get_indexes("results")}
+        assert {
+            "ix_results_result_folder",
+            "ix_results_type_query_time",
+            "ix_results_database_id",
+        } <= indexes
+
+    def test_list_powertests(self, manager):
+        rows = manager.list_powertests(since=datetime(2025, 1, 2), limit=2, offset=1)
+        assert [row.testtime.day for row in rows] == [3, 4]
+        assert len(manager.list_powertests(db_type="mysql")) == 0
+
+    def test_list_test_results(self, manager):
+        rows = manager.list_test_results(since=datetime(2025, 1, 5))
+        assert [(row.power_id, row.query_name) for row in rows] == [(5, "q1"), (5, "q2")]
+        assert len(manager.list_test_results(limit=3, offset=8)) == 2
+
+        rows = manager.list_test_results(single=True)
+        assert [row.query_name for row in rows] == ["q3"]
+
+
+def test_run_ids_are_unique():
+    testtime = datetime(2025, 1, 1)
+    folders = {
+        meta.TestResultManager._generate_result_folder("pg", testtime) for _ in range(10)
+    }
+    assert len(folders) == 10
+    assert all(folder.startswith("pg_20250101_000000_") for folder in folders)
+
+
+def test_with_retries(mocker):
+    mocker.patch("tpch_runner.meta.time.sleep")
+    error = meta.OperationalError("insert", {}, Exception("database is locked"))
+    func = MagicMock(side_effect=[error, error, "done"])
+    assert meta.with_retries(func, attempts=3) == "done"
+    assert func.call_count == 3
+
+    func = MagicMock(side_effect=error)
+    with pytest.raises(meta.OperationalError):
+        meta.with_retries(func, attempts=2)
+    assert func.call_count == 2
+
+
+def test_duckdb_metadata_backend(tmp_path, mocker):
+    pytest.importorskip("duckdb_engine")
+    mocker.patch.object(meta.result_store, "root", tmp_path)
+    mocker.patch("tpch_runner.meta.RESULT_DIR", tmp_path)
+    engine = meta.get_engine(f"duckdb:///{tmp_path}/meta.duckdb")
+
+    meta.DBManager(engine).add_database(
+        db_type="duckdb", host="", port="", user="", password="", dbname="tpch"
+    )
+    manager = meta.TestResultManager(engine)
+    _, folder = manager.add_powertest(1, "duckdb")
+    key = meta.result_store.put(b"a\n1\n")
+    manager.add_test_result("duckdb", True, 1, key, "q1", 0.1, folder, 1)
+    manager.update_powertest(True, 0.1, result_folder=folder)
+
+    rows = manager.list_test_results()
+    assert [(row.power_id, row.query_name) for row in rows] == [(1, "q1")]
+    manager.delete_powertest(result_folder=folder)
+    assert len(manager.list_powertests()) == 0
+    assert len(manager.list_test_results()) == 0
+    assert not meta.result_store.path(key).exists()
+
+
+class Test_QueryTrend:
+    runtimes = [10.0, 12.0, 11.0, 30.0, 13.0, 12.0]
+
+    @pytest.fixture
+    def manager(self, session):
+        session.add(
+            meta.Database(
+                id=1,
+                db_type="pg",
+                host="localhost",
+                port="5432",
+                user="user",
+                password="pass",
+                dbname="tpch",
+            )
+        )
+        for day, runtime in enumerate(self.runtimes, start=1):
+            folder = f"pg_2025010{day}"
+            session.add(
+                meta.PowerTest(
+                    id=day,
+                    db_type="pg",
+                    scale="small",
+                    result_folder=folder,
+                    testtime=datetime(2025, 1, day),
+                    success=True,
+                    runtime=runtime * 2,
+                    database_id=1,
+                )
+            )
+            session.add(
+                meta.TestResult(
+                    db_type="pg",
+                    success=True,
+                    rowcount=1,
+                    result_csv="x.csv",
+                    query_name="q18",
+                    runtime=runtime,
+                    result_folder=folder,
+                    database_id=1,
+                )
+            )
+        session.commit()
+        return meta.TestResultManager(session.bind)
+
+    def test_query_trend(self, manager):
+        rows = manager.query_trend(1, "q18", last=4, window=3)
+        assert [row.power_id for row in rows] == [3, 4, 5, 6]
+        assert rows[0].testtime == datetime(2025, 1, 3)
+        assert [row.rolling_median for row in rows] == [11.0, 12.0, 13.0, 13.0]
+        assert rows[0].pct_change == 0
+        assert rows[1].pct_change == pytest.approx(100 * 19 / 11)
+        # 30 against 12, 11 and 10 before it
+        assert rows[1].zscore == pytest.approx(19 / (2 / 3) ** 0.5)
+
+    def test_zscore_of_oldest_run(self, manager):
+        rows = manager.query_trend(1, "q18", last=3, window=2)
+        assert [row.power_id for row in rows] == [4, 5, 6]
+        # 30 against the full window of 11 and 12 before it
+        assert rows[0].zscore == pytest.approx(37.0)
+
+    def test_total_runtime_trend(self, manager):
+        rows = manager.query_trend(1, last=10, window=2, baseline_id=2)
+        assert len(rows) == 6
+        assert rows[0].zscore is None
+        assert rows[1].rolling_median == 22.0
+        assert rows[3].pct_change == pytest.approx(150.0)
+
+    def test_unknown_baseline(self, manager):
+        with pytest.raises(ValueError):
+            manager.query_trend(1, "q18", baseline_id=99)
+
+
+class Test_History:
+    @pytest.fixture
+    def store(self, mocker, tmp_path):
+        store = meta.result_store
+        mocker.patch.object(store, "root", tmp_path.joinpath("results"))
+        return store
+
+    @pytest.fixture
+    def manager(self, session, store):
+        session.add(
+            meta.Database(
+                id=1,
+                db_type="pg",
+                alias="pg1",
+                host="localhost",
+                port="5432",
+                user="user",
+                password="pass",
+                dbname="tpch",
+            )
+        )
+        session.commit()
+        manager = meta.TestResultManager(session.bind)
+        for day in (1, 2):
+            folder = f"pg_2025010{day}"
+            session.add(
+                meta.PowerTest(
+                    db_type="pg",
+                    scale="small",
+                    result_folder=folder,
+                    testtime=datetime(2025, 1, day),
+                    success=True,
+                    runtime=2.0,
+                    database_id=1,
+                )
+            )
+            session.commit()
+            key = store.put(f"a\n{day}\n".encode())
+            manager.add_test_result("pg", True, 1, key, "q1", 0.5, folder, 1)
+        return manager
+
+    @pytest.mark.parametrize("fmt", ["parquet", "csv"])
+    def test_export_import(self, manager, store, tmp_path, fmt):
+        target = tmp_path.joinpath("export")
+        counts = manager.export_history(target, since=datetime(2025, 1, 2), fmt=fmt)
+        assert counts == {"databases": 1, "powertests": 1, "results": 1, "files": 1}
+        assert list(target.joinpath("powertests", "db_type=pg").glob(f"*.{fmt}"))
+        with duckdb.connect() as con:
+            (data,) = target.joinpath("databases").glob(f"*.{fmt}")
+            columns = con.execute(f"DESCRIBE SELECT * FROM '{data}'").df()
+        assert "password" not in set(columns["column_name"])
+
+        # merge into an empty metadata database on another host
+        store.root = tmp_path.joinpath("other_results")
+        other = meta.TestResultManager(create_engine(f"sqlite:///{tmp_path}/other.db"))
+        meta.migrate(other.engine)
+        with pytest.raises(ValueError, match="password"):
+            other.import_history(target)
+        counts = other.import_history(target, get_password=lambda row: "secret")
+        assert counts == {"databases": 1, "powertests": 1, "results": 1, "files": 1}
+        rows = other.list_test_results()
+        assert [(row.power_id, row.query_name) for row in rows] == [(1, "q1")]
+        with other.Session() as session:
+            test = session.query(meta.PowerTest).one()
+            assert test.testtime == datetime(2025, 1, 2)
+            assert test.database.alias == "pg1"
+            assert test.database.password == "secret"
+            obj = session.query(meta.ResultObject).one()
+            assert obj.refcount == 1
+            assert store.path(obj.key).read_text() == "a\n2\n"
+
+        # importing twice adds nothing
+        counts = other.import_history(target)
+        assert counts == {"databases": 0, "powertests": 0, "results": 0, "files": 0}
+
+
+class TestLoadManager:
+    @pytest.fixture
+    def manager(self, session):
+        from tpch_runner.tpch.databases.base import TableLoad
+
+        session.add(
+            meta.Database(
+                db_type="pg", host="h", port="5432", user="u", password="p", dbname="tpch"
+            )
+        )
+        session.commit()
+        manager = meta.LoadManager(session.bind)
+        loads = [
+            TableLoad("all", 0.5, phase="create"),
+            TableLoad("nation", 0.25, rows=25, bytes=2 * meta.MB),
+            TableLoad("lineitem", 2.0, rows=6000, bytes=8 * meta.MB),
+            TableLoad("all", 1.0, phase="analyze"),
+        ]
+        manager.add_loadrun(1, "pg", loads, 4.0, True, scale="1", settings="jobs=2")
+        manager.add_loadrun(
+            1,
+            "pg",
+            [TableLoad("nation", 0.1, error="boom")],
+            0.2,
+            False,
+            testtime=datetime(2025, 1, 1),
+        )
+        return manager
+
+    def test_list_loadruns(self, manager):
+        rows = manager.list_loadruns()
+        assert [(row.id, row.success) for row in rows] == [(1, True), (2, False)]
+        # only tables of the load phase are summed
+        assert (rows[0].rows, rows[0].bytes) == (6025, 10 * meta.MB)
+        assert rows[1].rows is None
+        assert len(manager.list_loadruns(since=datetime(2025, 6, 1))) == 1
+        assert len(manager.list_loadruns(db_type="mysql")) == 0
+
+    def test_get_loadruns(self, manager):
+        second, first = manager.get_loadruns([2, 1])
+        assert second.tables[0].error == "boom"
+        phases = {(t.phase, t.table_name): t for t in first.tables}
+        assert len(phases) == 4
+        assert phases[("load", "lineitem")].rows_per_sec == 3000
+        assert phases[("load", "nation")].mb_per_sec == 8
+        assert phases[("create", "all")].rows_per_sec is None
+        with pytest.raises(ValueError, match="3 not found"):
+            manager.get_loadruns([1, 3])
+
+    def test_delete_loadrun(self, manager, session):
+        assert manager.delete_loadrun(1) == 1
+        assert manager.delete_loadrun(1) == 0
+        assert [row.id for row in manager.list_loadruns()] == [2]
+        assert session.query(meta.LoadTable).count() == 1
+
+    def test_build_journal(self, manager):
+        from tpch_runner.tpch.databases.base import TableLoad
+
+        load_id = manager.add_loadrun(1, "pg", [], 0, None, scale="1", command="build")
+        manager.add_loadtables(load_id, [TableLoad("all", 0.5, phase="create")])
+        manager.finish_loadrun(load_id, False, 2.0)
+        manager.add_loadtables(load_id, [TableLoad("nation", 0.5)])
+        manager.finish_loadrun(load_id, True, 1.0)
+
+        last = manager.last_loadrun(1, "build")
+        assert (last.id, last.success, last.runtime) == (load_id, True, 3.0)
+        assert {(t.phase, t.table_name) for t in last.tables} == {
+            ("create", "all"),
+            ("load", "nation"),
+        }
+        assert manager.last_loadrun(1, "create") is None
@@ -0,0 +1,332 @@
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+from tpch_runner.tpch import ANSWER_DIR
+from tpch_runner.tpch.databases import results
+from tpch_runner.tpch.databases.results import compare_frames
+
+
+@pytest.fixture
+def q1_answer():
+    return pd.read_csv(ANSWER_DIR.joinpath("small").joinpath("1.csv"))
+
+
+@pytest.mark.parametrize("query", range(1, 23))
+def test_answer_matches_itself(query):
+    answer = pd.read_csv(ANSWER_DIR.joinpath("small").joinpath(f"{query}.csv"))
+    assert compare_frames(answer.copy(), answer).ok
+
+
+def test_column_rules(q1_answer):
+    rules = {
+        name: results.column_rule(name, q1_answer[name]) for name in q1_answer.columns
+    }
+    assert rules["l_returnflag"] == results.STRING
+    assert rules["sum_base_price"] == results.MONEY
+    assert rules["avg_disc"] == results.RATIO
+    assert rules["count_order"] == results.EXACT
+    # Q22 country codes are read as integers but are text in the database
+    assert results.column_rule("cntrycode", pd.Series([13, 31])) == results.STRING
+
+
+def test_money_within_one_penny(q1_answer):
+    result = q1_answer.copy()
+    result["sum_base_price"] += 0.004
+    assert compare_frames(result, q1_answer).ok
+
+    result["sum_base_price"] += 0.02
+    diff = compare_frames(result, q1_answer)
+    assert not diff.ok
+    assert diff.reason == "values"
+    assert [col.column for col in diff.columns] == ["sum_base_price"]
+    assert diff.columns[0].mismatches == len(q1_answer)
+
+
+def test_ratio_relative_tolerance(q1_answer):
+    result = q1_answer.copy()
+    result["avg_price"] *= 1.005
+    assert compare_frames(result, q1_answer).ok
+
+    result["avg_price"] *= 1.02
+    assert not compare_frames(result, q1_answer).ok
+
+
+def test_integer_counts_exact(q1_answer):
+    result = q1_answer.copy()
+    result.loc[0, "count_order"] += 1
+    diff = compare_frames(result, q1_answer)
+    assert not diff.ok
+    assert diff.columns[0].examples[0][0] == 0
+
+
+def test_strings_trimmed_and_driver_types(q1_answer):
+    result = q1_answer.copy()
+    result["l_returnflag"] = result["l_returnflag"] + "  "
+    result["sum_qty"] = [Decimal(str(v)) for v in result["sum_qty"]]
+    assert compare_frames(result, q1_answer).ok
+
+
+def test_structural_differences(q1_answer):
+    diff = compare_frames(q1_answer.iloc[1:], q1_answer)
+    assert diff.reason == "rowcount"
+    assert "rowcount" in diff.summary()
+
+    diff = compare_frames(q1_answer.iloc[:, 1:], q1_answer)
+    assert diff.reason == "columns"
+
+
+def test_compare_files_in_chunks(tmp_path):
+    answer_file = ANSWER_DIR.joinpath("small").joinpath("10.csv")
+    answer = pd.read_csv(answer_file)
+    result_file = tmp_path.joinpath("10.csv")
+
+    answer.to_csv(result_file, index=False)
+    assert results.compare_files(result_file, answer_file, chunk_rows=3).ok
+
+    result = answer.copy()
+    result.loc[[1, 7, 8], "revenue"] += 1
+    result.to_csv(result_file, index=False)
+    diff = results.compare_files(result_file, answer_file, chunk_rows=3, sample_size=2)
+    assert diff.reason == "values"
+    assert diff.result_rows == len(answer)
+    assert [col.column for col in diff.columns] == ["revenue"]
+    assert diff.columns[0].mismatches == 3
+    assert [example[0] for example in diff.columns[0].examples] == [1, 7]
+
+    answer.iloc[:-1].to_csv(result_file, index=False)
+    diff = results.compare_files(result_file, answer_file, chunk_rows=3)
+    assert diff.reason == "rowcount"
+    assert (diff.result_rows, diff.answer_rows) == (len(answer) - 1, len(answer))
+
+
+def test_large_files_compared_in_chunks(mocker, tmp_path):
+    from tpch_runner.tpch.databases import answers
+
+    mocker.patch.object(answers, "ANSWER_CACHE_DIR", tmp_path.joinpath("cache"))
+    mocker.patch.object(results.Config, "compare_memory_limit", 0)
+    answers.clear_answers()
+    compare_files = mocker.spy(results, "compare_files")
+    result = make_results(tmp_path)
+    assert result.compare_against_answer("18.csv")
+    assert compare_files.call_count == 1
+    answers.clear_answers()
+
+
+def make_results(tmp_path, broken=()):
+    result_files = {}
+    for query in results.ALL_QUERIES:
+        answer = pd.read_csv(ANSWER_DIR.joinpath("small").joinpath(f"{query}.csv"))
+        if query in broken:
+            answer = answer.iloc[1:]
+        result_file = tmp_path.joinpath(f"q{query}.csv")
+        answer.to_csv(result_file, index=False)
+        result_files[f"{query}.csv"] = result_file
+    return results.Result(scale="small", result_files=result_files)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_run_validations(tmp_path, jobs):
+    good_dir, bad_dir = tmp_path.joinpath("good"), tmp_path.joinpath("bad")
+    good_dir.mkdir()
+    bad_dir.mkdir()
+    good = make_results(good_dir)
+    bad = make_results(bad_dir, broken=(1, 22))
+
+    reports = results.run_validations([(1, "pg_1", good), (2, "pg_2", bad)], jobs=jobs)
+
+    assert [report.test_id for report in reports] == [1, 2]
+    assert reports[0].ok
+    assert len(reports[0].passed) == 22
+    assert not reports[1].ok
+    assert reports[1].failed == [1, 22]
+
+
+def test_answer_cache(mocker, tmp_path):
+    from tpch_runner.tpch.databases import answers
+
+    mocker.patch.object(answers, "ANSWER_CACHE_DIR", tmp_path.joinpath("cache"))
+    answer_dir = tmp_path.joinpath("1")
+    answer_dir.mkdir()
+    answer_dir.joinpath("6.csv").write_text("revenue\n3351.1700\n")
+    answers.clear_answers()
+
+    loaded = answers.load_answers(answer_dir)
+    assert loaded["6.csv"]["revenue"].dtype == float
+    assert answers.load_answers(answer_dir) is loaded
+    assert len(list(tmp_path.joinpath("cache").glob("*.pkl"))) == 1
+
+    # a new process reads the compiled cache instead of the CSV files
+    answers.clear_answers()
+    read_csv = mocker.spy(answers.pd, "read_csv")
+    assert answers.load_answers(answer_dir)["6.csv"].equals(loaded["6.csv"])
+    assert read_csv.call_count == 0
+
+    # changed answer files invalidate the cache
+    answers.clear_answers()
+    answer_dir.joinpath("6.csv").write_text("revenue\n1.00\n2.00\n")
+    assert len(answers.load_answers(answer_dir)["6.csv"]) == 2
+    answers.clear_answers()
+
+
+@pytest.fixture
+def tbl_dir(tmp_path):
+    """Small data as dbgen .tbl files."""
+    from tpch_runner.tpch import SMALL_DATA_DIR, all_tables
+
+    data_dir = tmp_path.joinpath("sfsmall")
+    data_dir.mkdir()
+    for table in all_tables:
+        df = pd.read_csv(
+            SMALL_DATA_DIR.joinpath(f"{table}.csv"), header=None, escapechar="\\"
+        )
+        df[len(df.columns)] = None  # dbgen ends each row with a separator
+        df.to_csv(data_dir.joinpath(f"{table}.tbl"), sep="|", header=False, index=False)
+    return data_dir
+
+
+def test_build_answers(mocker, tmp_path, tbl_dir):
+    from tpch_runner.tpch.databases import answers
+
+    mocker.patch.object(answers, "GENERATED_ANSWER_DIR", tmp_path.joinpath("answers"))
+    data_dir = tbl_dir
+    query_dir = tmp_path.joinpath("queries")
+    query_dir.mkdir()
+    for query in range(1, 23):
+        query_dir.joinpath(f"q{query}.sql").write_text(
+            f"select count(*) + {query} as cnt from lineitem;\n"
+        )
+    mocker.patch.object(answers, "_query_file", lambda q: query_dir.joinpath(f"q{q}.sql"))
+
+    answer_dir = answers.build_answers("small", data_dir, jobs=4)
+    assert answer_dir.parent.name == "sfsmall"
+    assert sorted(p.name for p in answer_dir.glob("*.csv")) == sorted(
+        f"{q}.csv" for q in range(1, 23)
+    )
+    rows = pd.read_csv(answer_dir.joinpath("6.csv"))["cnt"].iloc[0]
+    assert rows == 3077 + 6
+
+    # unchanged data reuses the answers, generated answers are found by scale
+    run_query = mocker.spy(answers, "_run_answer_query")
+    assert answers.build_answers("small", data_dir) == answer_dir
+    assert run_query.call_count == 0
+    mocker.patch.object(answers, "ANSWER_DIR", tmp_path.joinpath("bundled"))
+    assert answers.answer_dir_for("small") == answer_dir
+
+
+def test_build_answer_of_view_query(mocker, tmp_path, tbl_dir):
+    from tpch_runner.tpch.databases import answers
+
+    mocker.patch.object(answers, "GENERATED_ANSWER_DIR", tmp_path.joinpath("answers"))
+    query_dir = tmp_path.joinpath("queries")
+    query_dir.mkdir()
+    for query in range(1, 23):
+        query_dir.joinpath(f"q{query}.sql").write_text("select 1 as one;\n")
+    # Q15 creates a view, selects from it and drops it
+    query_dir.joinpath("q15.sql").write_text(
+        "create view revenue0 (supplier_no, total_revenue) as\n"
+        "  select l_suppkey, sum(l_extendedprice * (1 - l_discount))\n"
+        "  from lineitem group by l_suppkey;\n"
+        "select s_suppkey, total_revenue from supplier, revenue0\n"
+        "where s_suppkey = supplier_no\n"
+        "  and total_revenue = (select max(total_revenue) from revenue0)\n"
+        "order by s_suppkey;\n"
+        "drop view revenue0;\n"
+    )
+    mocker.patch.object(answers, "_query_file", lambda q: query_dir.joinpath(f"q{q}.sql"))
+
+    answer_dir = answers.build_answers("small", tbl_dir, jobs=1)
+    answer = pd.read_csv(answer_dir.joinpath("15.csv"))
+    assert list(answer.columns) == ["s_suppkey", "total_revenue"]
+    assert len(answer) >= 1
+
+
+def answer_rset(query):
+    answer = pd.read_csv(ANSWER_DIR.joinpath("small").joinpath(f"{query}.csv"))
+    return list(answer.itertuples(index=False, name=None)), list(answer.columns)
+
+
+def test_background_validator():
+    validator = results.BackgroundValidator("small")
+    validator.submit(1, *answer_rset(1))
+    rset, columns = answer_rset(6)
+    validator.submit(6, [(rset[0][0] + 1,)], columns)
+    outcomes = dict(validator.close())
+
+    assert outcomes[1].ok
+    assert outcomes[6].reason == "values"
+    assert validator.failed.is_set()
+
+
+@pytest.mark.parametrize("fail_fast, queries_run", [(False, 22), (True, 3)])
+def test_power_test_validation(mocker, fail_fast, queries_run):
+    from tpch_runner.tpch import Result as QueryResult
+    from tpch_runner.tpch.databases.base import TPCH_Runner
+
+    def run_query(query, result_dir, no_report):
+        rset, columns = answer_rset(query)
+        if query == 9:  # third query of the power test
+            rset = rset[1:]
+        return QueryResult(True, len(rset), rset, columns, None), 0.1, None
+
+    runner = TPCH_Runner.__new__(TPCH_Runner)
+    runner.scale, runner.db_id, runner.meta = "small", 1, mocker.MagicMock()
+    runner.meta.add_powertest.return_value = (pd.Timestamp.now(), "pg_1")
+    runner.run_query = mocker.MagicMock(side_effect=run_query)
+    # validate each result before the next query is run
+    mocker.patch.object(
+        results.BackgroundValidator, "submit", results.BackgroundValidator._check
+    )
+
+    runner.power_test(validate=True, fail_fast=fail_fast)
+
+    assert runner.run_query.call_count == queries_run
+    runner.meta.set_result_validity.assert_any_call("pg_1", "q9", False)
+    runner.meta.set_result_validity.assert_any_call("pg_1", "q14", True)
+    assert runner.meta.update_powertest.call_args.kwargs["success"] is False
+
+
+@pytest.mark.parametrize("query", [1, 2, 3, 10, 13, 22])
+def test_duckdb_checksum_matches_answer(tmp_path, query):
+    import duckdb
+
+    from tpch_runner.tpch.databases.duckdb import DuckLDB
+
+    answer = pd.read_csv(ANSWER_DIR.joinpath("small").joinpath(f"{query}.csv"))
+    conn = DuckLDB.__new__(DuckLDB)
+    conn._cursor = None
+    conn._connection = duckdb.connect(str(tmp_path.joinpath("t.duckdb")))
+    conn._connection.register("answer", answer)
+    # date columns come back as dates from the database, Q22 cntrycode and
+    # phone numbers are text even if they look like numbers
+    types = {"date": "date", "cntrycode": "varchar", "phone": "varchar"}
+    columns = ", ".join(
+        next(
+            (
+                f'cast("{name}" as {type_}) as "{name}"'
+                for key, type_ in types.items()
+                if key in name
+            ),
+            f'"{name}"',
+        )
+        for name in answer.columns
+    )
+    conn._connection.execute(f"create table t as select {columns} from answer")
+    query_file = tmp_path.joinpath("q.sql")
+    query_file.write_text("-- result of the query\nselect * from t order by 1;\n")
+
+    checksum = results.frame_checksum(answer)
+    row = conn.checksum_from_file(str(query_file), checksum.rules)
+    assert (
+        results.checksum_diff(results.Checksum.from_row(row, checksum.rules), checksum)
+        is None
+    )
+
+    conn._connection.execute(f'update t set "{answer.columns[0]}" = null')
+    row = conn.checksum_from_file(str(query_file), checksum.rules)
+    reason = results.checksum_diff(
+        results.Checksum.from_row(row, checksum.rules), checksum
+    )
+    assert reason.startswith("column 1")
+    conn.close()
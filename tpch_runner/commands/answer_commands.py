@@ -0,0 +1,77 @@
+import sys
+from typing import Optional
+
+import click
+from rich_click import RichGroup
+from tabulate import tabulate
+
+from ..tpch import ANSWER_DIR, DATA_DIR
+from ..tpch.databases.answers import GENERATED_ANSWER_DIR, build_answers, scale_key
+from . import CONTEXT_SETTINGS
+
+
+@click.group(
+    name="answers",
+    cls=RichGroup,
+    invoke_without_command=False,
+    context_settings=CONTEXT_SETTINGS,
+)
+def cli():
+    """Manage reference answers."""
+    pass
+
+
+@cli.command("build")
+@click.option("--sf", "scale", required=True, help="Scale factor of the data.")
+@click.option(
+    "--data",
+    "data_folder",
+    type=click.Path(exists=True, file_okay=False),
+    default=None,
+    help="Data folder, default to <data_dir>/sf<N>.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of queries to run concurrently.",
+)
+@click.option("--force", is_flag=True, help="Rebuild answers even if they exist.")
+def build(scale: str, data_folder: Optional[str], jobs: Optional[int], force: bool):
+    """Build reference answers of a scale factor with DuckDB."""
+    data_folder = data_folder or str(DATA_DIR.joinpath(scale_key(scale)))
+    try:
+        answer_dir = build_answers(scale, data_folder, jobs=jobs, force=force)
+    except Exception as e:
+        print(f"Fail to build answers for scale {scale}: {e}", file=sys.stderr)
+        sys.exit(1)
+    click.echo(f"Answers of {scale_key(scale)} are saved in {answer_dir}.")
+
+
+@cli.command("list")
+def ls():
+    """List available reference answers."""
+    report = []
+    for answer_dir in sorted(p for p in ANSWER_DIR.iterdir() if p.is_dir()):
+        report.append((answer_dir.name, "bundled", len(list(answer_dir.glob("*.csv")))))
+    if GENERATED_ANSWER_DIR.is_dir():
+        for scale_dir in sorted(GENERATED_ANSWER_DIR.iterdir()):
+            latest = scale_dir.joinpath("latest")
+            latest_name = latest.read_text().strip() if latest.is_file() else None
+            answer_dirs = [
+                p
+                for p in scale_dir.iterdir()
+                if p.is_dir() and not p.name.startswith(".")
+            ]
+            for answer_dir in sorted(answer_dirs):
+                report.append(
+                    (
+                        scale_dir.name + (" *" if answer_dir.name == latest_name else ""),
+                        answer_dir.name,
+                        len(list(answer_dir.glob("*.csv"))),
+                    )
+                )
+    print(
+        tabulate(report, tablefmt="psql", headers=["Scale", "Data Checksum", "Answers"])
+    )
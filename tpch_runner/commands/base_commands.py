@@ -1,13 +1,18 @@
 import logging
 import sys
+from datetime import datetime
+from typing import Optional
 
 import click
 from rich_click import RichGroup
 
+from .. import meta
 from ..tpch import all_tables
 from ..tpch.injection import data_gen_batch
 from . import CONTEXT_SETTINGS
+from .answer_commands import cli as answercli
 from .db_commands import cli as dbcli
+from .load_commands import cli as loadcli
 from .power_commands import cli as powercli
 from .result_commands import cli as resultcli
 from .run_commands import cli as runcli
@@ -72,10 +77,71 @@ def generate(scale, table) -> None:
         sys.exit(1)
 
 
+@cli.command("export")
+@click.argument("target", type=click.Path(file_okay=False))
+@click.option(
+    "--since",
+    type=click.DateTime(formats=["%Y-%m-%d", "%Y-%m-%d %H:%M:%S"]),
+    default=None,
+    help="Export tests run since this date.",
+)
+@click.option(
+    "-f",
+    "--format",
+    "fmt",
+    type=click.Choice(meta.HISTORY_FORMATS),
+    default="parquet",
+    show_default=True,
+    help="File format of exported tables.",
+)
+def export(target: str, since: Optional[datetime], fmt: str) -> None:
+    """Export test history and result files.
+
+    TARGET: directory to export to.
+    """
+    try:
+        counts = meta.TestResultManager().export_history(target, since=since, fmt=fmt)
+    except Exception as e:
+        print(f"Fails to export test history: {e}", file=sys.stderr)
+        sys.exit(1)
+    click.echo(
+        "Exported {databases} databases, {powertests} Powertests, {results} test "
+        "results and {files} result files to {target}.".format(target=target, **counts)
+    )
+
+
+def _prompt_password(row: dict) -> str:
+    """Ask the password of an imported database, it is not exported."""
+    name = row["alias"] or f"{row['db_type']} {row['host']}:{row['port']}/{row['dbname']}"
+    return click.prompt(f"Enter password of database {name}", hide_input=True)
+
+
+@cli.command("import")
+@click.argument("source", type=click.Path(exists=True, file_okay=False))
+def import_(source: str) -> None:
+    """Merge exported test history and result files.
+
+    SOURCE: directory of an export.
+    """
+    try:
+        counts = meta.TestResultManager().import_history(
+            source, get_password=_prompt_password
+        )
+    except Exception as e:
+        print(f"Fails to import test history: {e}", file=sys.stderr)
+        sys.exit(1)
+    click.echo(
+        "Imported {databases} databases, {powertests} Powertests, {results} test "
+        "results and {files} result files from {source}.".format(source=source, **counts)
+    )
+
+
 cli.add_command(dbcli)
 cli.add_command(resultcli)
 cli.add_command(powercli)
 cli.add_command(runcli)
+cli.add_command(answercli)
+cli.add_command(loadcli)
 
 
 def main():
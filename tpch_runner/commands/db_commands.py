@@ -1,5 +1,9 @@
 import sys
+import time
+from contextlib import nullcontext
+from datetime import datetime
 from pathlib import Path
+from typing import ContextManager, Optional, Union
 
 import click
 from rich_click import RichGroup
@@ -7,7 +11,11 @@ from tabulate import tabulate
 
 from .. import logger, meta
 from ..tpch import DATA_DIR, all_tables, supported_databases
+from ..tpch.build import DatabaseBuild
 from ..tpch.databases import base
+from ..tpch.databases.answers import scale_key
+from ..tpch.datafiles import data_size, scale_of_folder
+from ..tpch.injection import dbgen_pipes
 from . import CONTEXT_SETTINGS
 from .utils import get_db, get_db_manager
 
@@ -21,12 +29,10 @@ from .utils import get_db, get_db_manager
 @click.pass_context
 def cli(ctx: click.Context):
     """Manage database server connections."""
-    _engine = meta.setup_database()
     if ctx.obj is None:
         ctx.obj = {}
     if "rm" not in ctx.obj:
-        _engine = meta.setup_database()
-        ctx.obj["rm"] = meta.DBManager(_engine)
+        ctx.obj["rm"] = meta.DBManager()
 
 
 @cli.command("list")
@@ -185,12 +191,70 @@ def create(ctx, db_id, alias) -> None:
     """
     rm: meta.DBManager = ctx["rm"]
     db = get_db(rm, id=db_id, alias_=alias)
+    testtime = datetime.now()
+    start = time.perf_counter()
+    error: Optional[str] = None
     try:
         db_manager: base.TPCH_Runner = get_db_manager(db)
         db_manager.create_tables()
     except Exception as e:
-        logger.error(f"Error: {str(e)}")
+        error = str(e)
+        logger.error(f"Error: {error}")
+    runtime = round(time.perf_counter() - start, 4)
+    record_load(
+        ctx,
+        db,
+        [base.TableLoad("all", runtime, error, phase="create")],
+        testtime,
+        command="create",
+    )
+    if error:
+        sys.exit(1)
+
+
+def use_bulk_load(db_manager: base.TPCH_Runner, bulk: bool) -> None:
+    """Enable the bulk load mode of a database, exit if it has none."""
+    if not bulk:
+        return
+    if not db_manager.supports_bulk_load:
+        print(f"{db_manager.db_type} has no bulk load mode.", file=sys.stderr)
         sys.exit(1)
+    db_manager.bulk_load = True  # type: ignore[attr-defined]
+
+
+def print_load_report(loads: list[base.TableLoad], runtime: float) -> None:
+    report = [(load.table, f"{load.runtime:.4f}", load.error or "ok") for load in loads]
+    report.append(("total (wall)", f"{runtime:.4f}", ""))
+    print(tabulate(report, tablefmt="psql", headers=["Table", "Runtime (s)", "Status"]))
+
+
+def record_load(
+    ctx,
+    db: meta.Database,
+    phases: list[base.TableLoad],
+    testtime: datetime,
+    scale: Optional[str] = None,
+    settings: Optional[str] = None,
+    command: str = "load",
+) -> None:
+    """Record phases of a load run in the metadata database, a failure to
+    record does not fail the load.
+    """
+    try:
+        lm: meta.LoadManager = ctx.get("lm") or meta.LoadManager()
+        lm.add_loadrun(
+            db_id=db.id,  # type: ignore
+            db_type=db.db_type,  # type: ignore
+            loads=phases,
+            runtime=round((datetime.now() - testtime).total_seconds(), 4),
+            success=not any(phase.error for phase in phases),
+            scale=scale or db.scale,  # type: ignore
+            settings=settings,
+            testtime=testtime,
+            command=command,
+        )
+    except Exception as e:
+        logger.error(f"Fails to record load run: {e}")
 
 
 @cli.command("load")
@@ -212,36 +276,345 @@ def create(ctx, db_id, alias) -> None:
     help="Optimize MySQL for batch data loading.",
 )
 @click.option("-r", "--reindex", is_flag=True, default=False, help="Recreate index")
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of tables to load concurrently.",
+)
+@click.option(
+    "--split",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of byte ranges or shards of a table to load concurrently.",
+)
+@click.option(
+    "--verify/--no-verify",
+    default=True,
+    help="Check row counts against the scale factor after loading all tables.",
+)
+@click.option(
+    "--from-dbgen",
+    is_flag=True,
+    default=False,
+    help="Stream data from dbgen into the database instead of reading data files.",
+)
+@click.option("--sf", "scale", default=None, help="Scale factor to run dbgen with.")
+@click.option(
+    "--bulk",
+    is_flag=True,
+    default=False,
+    help="Use the PostgreSQL bulk load mode, add primary keys after loading.",
+)
 @click.pass_obj
 def load(
-    ctx, db_id, alias, table, data_folder, delimiter, optimize: bool, reindex: bool
+    ctx,
+    db_id,
+    alias,
+    table,
+    data_folder,
+    delimiter,
+    optimize: bool,
+    reindex: bool,
+    jobs: int,
+    split: int,
+    verify: bool,
+    from_dbgen: bool,
+    scale: Optional[str],
+    bulk: bool,
 ) -> None:
     """Load specified table or all tables.
 
+    With --from-dbgen, dbgen of scale factor --sf writes into named pipes read
+    by the loaders and no data file is staged, --split sets the number of dbgen
+    processes per table.
+
     DB_ID: database ID
     """
     rm: meta.DBManager = ctx["rm"]
     db = get_db(rm, id=db_id, alias_=alias)
     db_manager: base.TPCH_Runner = get_db_manager(db)
+    use_bulk_load(db_manager, bulk)
+
+    source: ContextManager[Union[str, Path]] = nullcontext(data_folder)
+    if from_dbgen:
+        if not scale:
+            print("Option --sf is required with --from-dbgen.", file=sys.stderr)
+            sys.exit(1)
+        if not db_manager.streams_dbgen:
+            print(f"{db.db_type} does not load from dbgen pipes.", file=sys.stderr)
+            sys.exit(1)
+        source = dbgen_pipes(scale, tables=[table] if table else None, chunks=split)
+        delimiter = "|"
 
+    testtime = datetime.now()
+    phases: list[base.TableLoad] = []
+    error: Optional[str] = None
     try:
         if optimize:
             logger.info("Running before load optimization.")
-            db_manager.before_load(reindex=reindex)
-        if table:
-            db_manager.load_single_table(
-                table, data_folder=data_folder, delimiter=delimiter
-            )
-        else:
-            db_manager.load_data(data_folder=data_folder, delimiter=delimiter)
+            db_manager.before_load(reindex=reindex, table=table or "all")
+        with source as folder:
+            if table:
+                size = data_size(folder, table)
+                start = time.perf_counter()
+                db_manager.load_single_table(
+                    table, data_folder=str(folder), delimiter=delimiter, split=split
+                )
+                runtime = round(time.perf_counter() - start, 4)
+                phases.append(base.TableLoad(table, runtime, bytes=size))
+            else:
+                loads, runtime = db_manager.load_data(
+                    data_folder=str(folder), delimiter=delimiter, jobs=jobs, split=split
+                )
+                if loads:
+                    print_load_report(loads, runtime)
+                phases.extend(loads or [base.TableLoad("all", runtime)])
+        failed = [phase.table for phase in phases if phase.error]
+        if failed:
+            raise RuntimeError(f"Tables fail to load: {', '.join(failed)}")
 
         if optimize:
             logger.info("Running after load optimization.")
-            db_manager.after_load(reindex=reindex)
+            phases.extend(
+                db_manager.after_load(reindex=reindex, table=table or "all") or []
+            )
+        elif db_manager.defers_constraints:
+            phases.append(
+                db_manager.run_phase(
+                    "constraints", db_manager.add_constraints, table or "all"
+                )
+            )
     except Exception as e:
-        logger.error(f"Error during load: {str(e)}")
+        error = str(e)
+        logger.error(f"Error during load: {error}")
+
+    counts: dict[str, int] = {}
+    if error is None:
+        try:
+            counts = db_manager.count_rows(table or "all")
+        except Exception as e:
+            logger.error(f"Fails to count rows: {e}")
+    phases = [
+        (
+            phase._replace(
+                rows=(
+                    sum(counts.values())
+                    if phase.table == "all"
+                    else counts.get(phase.table)
+                )
+            )
+            if phase.phase == "load" and counts
+            else phase
+        )
+        for phase in phases
+    ]
+    if error is not None:
+        phases.append(base.TableLoad(table or "all", 0, error))
+
+    scale = scale or scale_of_folder(data_folder) or db.scale
+    settings = "jobs={} split={} optimize={} reindex={} bulk={} source={}".format(
+        jobs, split, optimize, reindex, bulk, "dbgen" if from_dbgen else data_folder
+    )
+    record_load(ctx, db, phases, testtime, scale=scale, settings=settings)
+    if error is not None:
         sys.exit(1)
 
+    if verify and not table:
+        mismatches = db_manager.verify_rows(scale, counts=counts or None)
+        for tbl, rows, expected in mismatches:
+            print(
+                f"Table {tbl} has {rows} rows, {expected} expected at scale {scale}.",
+                file=sys.stderr,
+            )
+        if mismatches:
+            sys.exit(1)
+
+
+@cli.command("build")
+@click.argument("db_id", required=False, type=int)
+@click.option("-a", "--alias", "alias", help="Database alias")
+@click.option("--sf", "scale", required=True, help="Scale factor of the data.")
+@click.option(
+    "-p",
+    "--path",
+    "data_folder",
+    default=None,
+    help="Data folder, default to <data_dir>/sf<N>.",
+)
+@click.option(
+    "-d", "--delimiter", default="|", show_default=True, help="Column delimiter"
+)
+@click.option(
+    "--from-dbgen",
+    is_flag=True,
+    default=False,
+    help="Stream data from dbgen into the database instead of reading data files.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of stages to run concurrently.",
+)
+@click.option(
+    "--split",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of byte ranges or shards of a table to load concurrently.",
+)
+@click.option("--index/--no-index", default=True, help="Create indexes of tables.")
+@click.option("--resume", is_flag=True, help="Continue the last unfinished build.")
+@click.option("--force", is_flag=True, help="Drop tables and build from scratch.")
+@click.option(
+    "--bulk",
+    is_flag=True,
+    default=False,
+    help="Use the PostgreSQL bulk load mode, add primary keys after loading.",
+)
+@click.pass_obj
+def build(
+    ctx,
+    db_id,
+    alias,
+    scale: str,
+    data_folder: Optional[str],
+    delimiter: str,
+    from_dbgen: bool,
+    jobs: int,
+    split: int,
+    index: bool,
+    resume: bool,
+    force: bool,
+    bulk: bool,
+) -> None:
+    """Create, load, index and analyze all tables of a scale factor.
+
+    Stages of a build are recorded as a load run. A stage runs once its inputs
+    are ready, stages of different tables run concurrently. Stages finished by
+    an earlier build are skipped with --resume.
+
+    DB_ID: database ID
+    """
+    if resume and force:
+        print("Options --resume and --force are exclusive.", file=sys.stderr)
+        sys.exit(1)
+    rm: meta.DBManager = ctx["rm"]
+    db = get_db(rm, id=db_id, alias_=alias)
+    db_manager: base.TPCH_Runner = get_db_manager(db)
+    use_bulk_load(db_manager, bulk)
+    lm: meta.LoadManager = ctx.get("lm") or meta.LoadManager()
+
+    last = None if force else lm.last_loadrun(db.id, "build")  # type: ignore
+    done: set[tuple[str, str]] = set()
+    if last is not None and last.scale != scale:
+        print(
+            f"{db.db_type} is built at scale {last.scale} by load run {last.id}, "
+            "use --force to rebuild.",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    elif last is not None and last.success:
+        print(f"{db.db_type} is built at scale {scale} by load run {last.id}.")
+        return
+    elif last is not None and not resume:
+        print(
+            f"Build of load run {last.id} is unfinished, "
+            "use --resume to continue it or --force to rebuild.",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    elif last is not None:
+        done = {(t.phase, t.table_name) for t in last.tables if t.success}  # type: ignore
+    elif resume:
+        print(f"No build of {db.db_type} to resume.", file=sys.stderr)
+        sys.exit(1)
+
+    data_folder = data_folder or str(DATA_DIR.joinpath(scale_key(scale)))
+    source: ContextManager[Union[str, Path]] = nullcontext(data_folder)
+    if from_dbgen:
+        if not db_manager.streams_dbgen:
+            print(f"{db.db_type} does not load from dbgen pipes.", file=sys.stderr)
+            sys.exit(1)
+        tables = [tbl for tbl in all_tables if ("load", tbl) not in done]
+        if tables:
+            source = dbgen_pipes(scale, tables=tables, chunks=split)
+        delimiter = "|"
+
+    testtime = datetime.now()
+    if last is not None:
+        load_id: int = last.id  # type: ignore
+        logger.info(f"Resume build of load run {load_id}, {len(done)} stages done.")
+    else:
+        settings = "jobs={} split={} index={} bulk={} source={}".format(
+            jobs, split, index, bulk, "dbgen" if from_dbgen else data_folder
+        )
+        load_id = lm.add_loadrun(
+            db.id,  # type: ignore
+            db.db_type,  # type: ignore
+            [],
+            0,
+            None,
+            scale=scale,
+            settings=settings,
+            testtime=testtime,
+            command="build",
+        )
+
+    stages: list[base.TableLoad] = []
+    missing: list[tuple[str, str]] = []
+    error: Optional[str] = None
+    try:
+        with source as folder:
+            stage_build = DatabaseBuild(
+                db_manager,
+                scale,
+                folder,
+                delimiter=delimiter,
+                split=split,
+                index=index,
+                clean=force or last is not None,
+            )
+            stages = stage_build.run(
+                jobs=jobs,
+                done=done,
+                on_finish=lambda stage: lm.add_loadtables(load_id, [stage]),
+            )
+            all_done = done | {(s.phase, s.table) for s in stages if s.error is None}
+            missing = [s.key for s in stage_build.stages() if s.key not in all_done]
+    except Exception as e:
+        error = str(e)
+        logger.error(f"Error during build: {error}")
+
+    runtime = round((datetime.now() - testtime).total_seconds(), 4)
+    success = error is None and not missing
+    lm.finish_loadrun(load_id, success, runtime)  # type: ignore
+    if stages:
+        report = [
+            (s.phase, s.table, s.rows, s.runtime, "ok" if s.error is None else s.error)
+            for s in stages
+        ]
+        print(
+            tabulate(
+                report,
+                tablefmt="psql",
+                headers=["Phase", "Table", "Rows", "Runtime (s)", "Status"],
+            )
+        )
+    if not success:
+        print(
+            f"Build of load run {load_id} is unfinished, rerun with --resume.",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    print(f"{db.db_type} is built at scale {scale} in {runtime}s, load run {load_id}.")
+
 
 @cli.command("reload")
 @click.argument("db_id", required=False, type=int)
@@ -251,8 +624,14 @@ def load(
     default=True,
     help="Optimize MySQL for batch data loading.",
 )
+@click.option(
+    "--bulk",
+    is_flag=True,
+    default=False,
+    help="Use the PostgreSQL bulk load mode, add primary keys after loading.",
+)
 @click.pass_obj
-def reload(ctx, db_id, alias, optimize: bool) -> None:
+def reload(ctx, db_id, alias, optimize: bool, bulk: bool) -> None:
     """Reload all tables, truncate before reload.
 
     DB_ID: database ID
@@ -261,8 +640,16 @@ def reload(ctx, db_id, alias, optimize: bool) -> None:
     db = get_db(rm, id=db_id, alias_=alias)
     try:
         db_manager: base.TPCH_Runner = get_db_manager(db)
+        use_bulk_load(db_manager, bulk)
         db_manager.truncate_table()
-        db_manager.load_data(optimize=optimize)
+        if optimize:
+            db_manager.before_load()
+        loads, runtime = db_manager.load_data()
+        if loads:
+            print_load_report(loads, runtime)
+        if any(load.error for load in loads):
+            sys.exit(1)
+        # analyze, and add the constraints deferred by bulk loading, either way
         db_manager.after_load()
     except Exception as e:
         logger.error(f"Error: {str(e)}")
@@ -0,0 +1,301 @@
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+import click
+from rich_click import RichGroup
+from tabulate import tabulate
+
+from tpch_runner.config import Config
+
+from .. import logger, meta
+from ..tpch import supported_databases
+from . import CONTEXT_SETTINGS
+from .utils import format_datetime, loadchart, wrap_column
+
+LOAD_METRICS = {
+    "runtime": ("Runtime (s)", lambda t: t.runtime),
+    "rows": ("Rows/s", lambda t: t.rows_per_sec),
+    "mb": ("MB/s", lambda t: t.mb_per_sec),
+}
+
+
+def _round(value: Optional[float], digits: int = 2) -> Optional[float]:
+    return None if value is None else round(value, digits)
+
+
+def _phase_key(load_table: meta.LoadTable) -> tuple[str, str]:
+    return (load_table.phase, load_table.table_name)  # type: ignore
+
+
+def _phase_keys(load_runs: list[meta.LoadRun]) -> list[tuple[str, str]]:
+    """Return (phase, table) pairs of all load runs in first seen order."""
+    keys: dict[tuple[str, str], None] = {}
+    for load_run in load_runs:
+        for load_table in sorted(load_run.tables, key=lambda t: t.id):
+            keys.setdefault(_phase_key(load_table), None)
+    return list(keys)
+
+
+@click.group(
+    name="load",
+    cls=RichGroup,
+    invoke_without_command=False,
+    context_settings=CONTEXT_SETTINGS,
+)
+@click.pass_context
+def cli(ctx: click.Context):
+    """Manage load run records."""
+    if ctx.obj is None:
+        ctx.obj = {}
+    if "lm" not in ctx.obj:
+        ctx.obj["lm"] = meta.LoadManager()
+
+
+@cli.command("list")
+@click.option(
+    "-t",
+    "--type",
+    "type_",
+    type=click.Choice(supported_databases),
+    default=None,
+    help="DB type",
+)
+@click.option(
+    "--since",
+    type=click.DateTime(),
+    default=None,
+    help="List load runs since this date.",
+)
+@click.option(
+    "--limit",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of load runs to list.",
+)
+@click.option(
+    "--offset", type=click.IntRange(min=0), default=0, help="Number of runs to skip."
+)
+@click.pass_obj
+def ls(ctx, type_: str, since: Optional[datetime], limit: Optional[int], offset: int):
+    """List load runs."""
+    try:
+        lm: meta.LoadManager = ctx["lm"]
+
+        results = lm.list_loadruns(db_type=type_, since=since, limit=limit, offset=offset)
+        report = []
+        for record in results:
+            mb_per_sec = None
+            if record.bytes and record.runtime:
+                mb_per_sec = record.bytes / meta.MB / record.runtime
+            report.append(
+                (
+                    record.id,
+                    record.db_type,
+                    record.command,
+                    format_datetime(record.testtime),
+                    record.success,
+                    _round(record.runtime, 4),
+                    record.scale,
+                    record.rows,
+                    _round(mb_per_sec),
+                    record.settings,
+                )
+            )
+
+        print(
+            tabulate(
+                report,
+                tablefmt="psql",
+                headers=[
+                    "ID",
+                    "DB",
+                    "Command",
+                    "Date",
+                    "Success",
+                    "Runtime (s)",
+                    "Scale",
+                    "Rows",
+                    "MB/s",
+                    "Settings",
+                ],
+            )
+        )
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        sys.exit(1)
+
+
+@cli.command("show")
+@click.argument("load_id", type=int)
+@click.pass_obj
+def show(ctx, load_id: int):
+    """Show load run details.
+
+    LOAD_ID: ID of the load run to show.
+    """
+    lm: meta.LoadManager = ctx["lm"]
+
+    try:
+        load_run = lm.get_loadruns([load_id])[0]
+        run_detail: dict[str, Any] = {}
+        run_detail["ID"] = load_run.id
+        run_detail["Database"] = load_run.db_type
+        run_detail["Command"] = load_run.command
+        run_detail["Scale"] = load_run.scale
+        run_detail["Test Time"] = format_datetime(load_run.testtime)  # type: ignore
+        run_detail["Success"] = load_run.success
+        run_detail["Runtime (s)"] = load_run.runtime
+        run_detail["Settings"] = load_run.settings
+        run_detail["Comment"] = wrap_column(load_run.comment or "")
+
+        phase_reports = []
+        for load_table in sorted(load_run.tables, key=lambda t: t.id):
+            phase_reports.append(
+                (
+                    load_table.phase,
+                    load_table.table_name,
+                    load_table.rows,
+                    _round(load_table.bytes / meta.MB if load_table.bytes else None),
+                    _round(load_table.runtime, 4),  # type: ignore
+                    _round(load_table.rows_per_sec, 1),
+                    _round(load_table.mb_per_sec),
+                    "ok" if load_table.success else wrap_column(load_table.error or ""),
+                )
+            )
+
+        print("\nLoad Run Details:")
+        print(
+            tabulate(run_detail.items(), headers=["Attribute", "Value"], tablefmt="psql")
+        )
+        print("\nLoad Phases:")
+        print(
+            tabulate(
+                phase_reports,
+                headers=[
+                    "Phase",
+                    "Table",
+                    "Rows",
+                    "Size MB",
+                    "Runtime (s)",
+                    "Rows/s",
+                    "MB/s",
+                    "Status",
+                ],
+                tablefmt="psql",
+            )
+        )
+    except Exception as e:
+        click.echo(f"Fails to show details of load run {load_id}.\nException: {e}")
+        sys.exit(1)
+
+
+@cli.command("compare")
+@click.argument("load_ids", nargs=-1, required=True, type=int)
+@click.pass_obj
+def compare(ctx, load_ids: tuple[int, ...]):
+    """Compare runtime and throughput of load runs per phase and table.
+
+    LOAD_IDS: IDs of two or more load runs.
+    """
+    if len(load_ids) < 2:
+        click.echo("At least two load runs are required to compare.")
+        sys.exit(1)
+    lm: meta.LoadManager = ctx["lm"]
+
+    try:
+        load_runs = lm.get_loadruns(list(load_ids))
+    except Exception as e:
+        click.echo(f"Fails to compare load runs.\nException: {e}")
+        sys.exit(1)
+
+    by_key = [{_phase_key(t): t for t in load_run.tables} for load_run in load_runs]
+    report = []
+    for key in _phase_keys(load_runs):
+        row: list[Any] = list(key)
+        for tables in by_key:
+            load_table = tables.get(key)
+            if load_table is None:
+                row.extend([None, None])
+            else:
+                row.append(_round(load_table.runtime, 4))  # type: ignore
+                row.append(_round(load_table.rows_per_sec, 1))
+        report.append(row)
+    report.append(
+        ["total", ""]
+        + [v for load_run in load_runs for v in (_round(load_run.runtime, 4), None)]
+    )
+
+    headers = ["Phase", "Table"]
+    for load_run in load_runs:
+        headers.extend([f"#{load_run.id} Runtime (s)", f"#{load_run.id} Rows/s"])
+    print(tabulate(report, headers=headers, tablefmt="psql"))
+
+
+@cli.command("draw")
+@click.option(
+    "-m",
+    "--metric",
+    type=click.Choice(list(LOAD_METRICS)),
+    default="runtime",
+    show_default=True,
+    help="Metric to draw.",
+)
+@click.argument("load_ids", nargs=-1, required=True, type=int)
+@click.pass_obj
+def draw(ctx, metric: str, load_ids: tuple[int, ...]):
+    """Draw a barchart of load runs per phase and table.
+
+    LOAD_IDS: IDs of load runs to draw.
+    """
+    lm: meta.LoadManager = ctx["lm"]
+
+    try:
+        load_runs = lm.get_loadruns(list(load_ids))
+        ylabel, value_of = LOAD_METRICS[metric]
+        keys = _phase_keys(load_runs)
+        trends = []
+        for load_run in load_runs:
+            tables = {_phase_key(t): t for t in load_run.tables}
+            trends.append(
+                {
+                    "name": f"#{load_run.id} {load_run.db_type}",
+                    "data": [
+                        value_of(tables[key]) if key in tables else None for key in keys
+                    ],
+                }
+            )
+
+        fname = "load-" + "-".join(str(load_id) for load_id in load_ids) + f"-{metric}"
+        chart_file_path = Path(Config.app_root).joinpath(f"{fname}.png").expanduser()
+        loadchart(
+            "Comparison of Load Runs",
+            [f"{phase}:{table}" for phase, table in keys],
+            trends,
+            ylabel,
+            str(chart_file_path),
+        )
+        print(f"Chart saved to {chart_file_path}")
+    except Exception as e:
+        click.echo(f"Fails to draw load runs.\nException: {e}")
+        sys.exit(1)
+
+
+@cli.command("delete")
+@click.argument("load_id", type=int)
+@click.pass_obj
+def delete(ctx, load_id: int):
+    """Delete a load run record.
+
+    LOAD_ID: ID of the load run to delete.
+    """
+    lm: meta.LoadManager = ctx["lm"]
+
+    try:
+        if not lm.delete_loadrun(load_id):
+            click.echo(f"Load run {load_id} not found.")
+            sys.exit(1)
+    except Exception as e:
+        click.echo(f"Fails to delete load run {load_id}.\nException: {e}")
+        sys.exit(1)
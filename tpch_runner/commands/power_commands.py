@@ -1,4 +1,5 @@
 import sys
+from datetime import datetime
 from pathlib import Path
 from typing import Any, Optional
 
@@ -16,9 +17,11 @@ from .utils import (
     barchart2,
     barchart_multi,
     format_datetime,
+    get_db,
     linechart,
     linechart2,
     linechart_multi,
+    trendchart,
     wrap_column,
 )
 
@@ -32,8 +35,10 @@ from .utils import (
 @click.pass_context
 def cli(ctx: click.Context):
     """Manage Powertest results."""
-    _engine = meta.setup_database()
-    ctx.obj["rm"] = meta.TestResultManager(_engine)
+    if ctx.obj is None:
+        ctx.obj = {}
+    if "rm" not in ctx.obj:
+        ctx.obj["rm"] = meta.TestResultManager()
 
 
 @cli.command("list")
@@ -45,15 +50,28 @@ def cli(ctx: click.Context):
     default=None,
     help="DB type",
 )
+@click.option(
+    "--since",
+    type=click.DateTime(),
+    default=None,
+    help="List tests run since this date.",
+)
+@click.option(
+    "--limit", type=click.IntRange(min=1), default=None, help="Number of tests to list."
+)
+@click.option(
+    "--offset", type=click.IntRange(min=0), default=0, help="Number of tests to skip."
+)
 @click.pass_obj
-def ls(ctx, type_: str):
+def ls(ctx, type_: str, since: Optional[datetime], limit: Optional[int], offset: int):
     """List finished tests."""
     try:
         rm: meta.TestResultManager = ctx["rm"]
 
-        results = rm.get_powertests(db_type=type_)
+        results = rm.list_powertests(
+            db_type=type_, since=since, limit=limit, offset=offset
+        )
         report = []
-        record: meta.PowerTest
         for record in results:
             report.append(
                 (
@@ -119,16 +137,67 @@ def update(ctx, test_id: int, comment: Optional[str] = None, scale: Optional[str
 
 
 @cli.command("validate")
-@click.argument("test_id")
+@click.argument("test_id", required=False)
+@click.option("--all", "all_", is_flag=True, help="Validate all Powertests.")
+@click.option(
+    "--since",
+    type=click.DateTime(formats=["%Y-%m-%d", "%Y-%m-%d %H:%M:%S"]),
+    default=None,
+    help="With --all, validate Powertests run since this date.",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Number of validation processes (default: number of CPUs).",
+)
 @click.pass_obj
-def validate(ctx, test_id: int) -> None:
-    """Validate a Powertest record.
+def validate(
+    ctx,
+    test_id: Optional[int],
+    all_: bool,
+    since: Optional[datetime],
+    jobs: Optional[int],
+) -> None:
+    """Validate a Powertest record or all Powertest records.
 
     TEST_ID: ID of the test to validate.
     """
     rm: meta.TestResultManager = ctx["rm"]
+    if all_:
+        try:
+            reports = rm.validate_powertests(since=since, jobs=jobs)
+        except Exception as e:
+            click.echo(f"Validation failed for Powertest results.\nException: {e}")
+            sys.exit(1)
+
+        report = [
+            (
+                record.test_id,
+                record.result_folder,
+                len(record.passed),
+                ", ".join(str(q) for q in record.failed),
+                ", ".join(str(q) for q in record.errors),
+            )
+            for record in reports
+        ]
+        print(
+            tabulate(
+                report,
+                tablefmt="psql",
+                headers=["ID", "Test", "Passed", "Failed Queries", "Error Queries"],
+            )
+        )
+        if not all(record.ok for record in reports):
+            sys.exit(1)
+        return
+
+    if test_id is None:
+        click.echo("Either TEST_ID or --all is required.")
+        sys.exit(1)
     try:
-        ok, result_folder = rm.compare_powertest(test_id)
+        ok, result_folder = rm.compare_powertest(test_id, jobs=jobs)
         if not ok:
             sys.exit(1)
         print(f"\nPowertest {result_folder} (ID: {test_id}) result is good.")
@@ -386,5 +455,93 @@ def multi(ctx, results: tuple) -> None:
         sys.exit(1)
 
 
+@cli.command("trend")
+@click.option("-a", "--alias", "--db", "alias_", required=True, help="Database alias")
+@click.option(
+    "-q",
+    "--query",
+    default=None,
+    help="Query like q18, default the Powertest total runtime.",
+)
+@click.option(
+    "--last",
+    type=click.IntRange(min=1),
+    default=100,
+    show_default=True,
+    help="Number of latest Powertests.",
+)
+@click.option(
+    "-w",
+    "--window",
+    type=click.IntRange(min=1),
+    default=5,
+    show_default=True,
+    help="Number of runs of the rolling median and z-score.",
+)
+@click.option(
+    "-b",
+    "--baseline",
+    type=int,
+    default=None,
+    help="Baseline Powertest ID, default the oldest Powertest listed.",
+)
+@click.pass_obj
+def trend(
+    ctx,
+    alias_: str,
+    query: Optional[str],
+    last: int,
+    window: int,
+    baseline: Optional[int],
+) -> None:
+    """Show runtime trend of a query over the latest Powertests of a database."""
+    rm: meta.TestResultManager = ctx["rm"]
+    db = get_db(meta.DBManager(), alias_=alias_)
+    query_name = None
+    if query:
+        query_name = query.lower() if query.lower().startswith("q") else f"q{query}"
+
+    try:
+        rows = rm.query_trend(
+            db.id,  # type: ignore
+            query_name,
+            last=last,
+            window=window,
+            baseline_id=baseline,
+        )
+    except Exception as e:
+        click.echo(f"Fails to compute runtime trend of {alias_}.\nException: {e}")
+        sys.exit(1)
+    if not rows:
+        click.echo(f"No successful Powertest of {alias_} found.")
+        return
+
+    report = [
+        (
+            row.power_id,
+            format_datetime(row.testtime),
+            round(row.runtime, 4),
+            round(row.rolling_median, 4),
+            None if row.pct_change is None else round(row.pct_change, 1),
+            None if row.zscore is None else round(row.zscore, 2),
+        )
+        for row in rows
+    ]
+    print(
+        tabulate(
+            report,
+            tablefmt="psql",
+            headers=["ID", "Date", "Runtime (s)", "Rolling Median", "Change %", "Z"],
+        )
+    )
+
+    name = query_name or "total"
+    chart_file_path = (
+        Path(Config.app_root).joinpath(f"trend-{alias_}-{name}.png").expanduser()
+    )
+    trendchart(f"{alias_} {name} Runtime Trend", rows, str(chart_file_path))
+    print(f"Chart saved to {chart_file_path}")
+
+
 if __name__ == "__main__":
     cli()
@@ -1,5 +1,6 @@
 import sys
-from typing import Any
+from datetime import datetime
+from typing import Any, Optional
 
 import click
 from rich_click import RichGroup
@@ -20,8 +21,7 @@ from .utils import format_datetime
 @click.pass_context
 def cli(ctx: click.Context):
     """Manage test results."""
-    _engine = meta.setup_database()
-    ctx.obj["rm"] = meta.TestResultManager(_engine)
+    ctx.obj["rm"] = meta.TestResultManager()
 
 
 @cli.command("list")
@@ -34,8 +34,27 @@ def cli(ctx: click.Context):
     help="DB type",
 )
 @click.option("--single", is_flag=True, help="List single run query results.")
+@click.option(
+    "--since",
+    type=click.DateTime(),
+    default=None,
+    help="List results of queries run since this date.",
+)
+@click.option(
+    "--limit", type=click.IntRange(min=1), default=None, help="Number of results to list."
+)
+@click.option(
+    "--offset", type=click.IntRange(min=0), default=0, help="Number of results to skip."
+)
 @click.pass_obj
-def ls(ctx, type_: str, single: bool):
+def ls(
+    ctx,
+    type_: str,
+    single: bool,
+    since: Optional[datetime],
+    limit: Optional[int],
+    offset: int,
+):
     """List finished tests."""
     try:
         rm: meta.TestResultManager = ctx["rm"]
@@ -49,12 +68,11 @@ def ls(ctx, type_: str, single: bool):
             "Runtime (s)",
         ]
 
-        if single:
-            results = rm.get_test_results(db_type=type_)
-        else:
-            results = rm.get_test_results_from_powertest(db_type=type_)
+        results = rm.list_test_results(
+            single=single, db_type=type_, since=since, limit=limit, offset=offset
+        )
+        if not single:
             headers = ["Power ID"] + headers
-        record: meta.TestResult
         report = []
         for record in results:
             arow = (
@@ -67,7 +85,7 @@ def ls(ctx, type_: str, single: bool):
                 record.runtime,
             )
             if not single:
-                arow = (record.power_test.id,) + arow  # type: ignore
+                arow = (record.power_id,) + arow
             report.append(arow)
 
         print(tabulate(report, tablefmt="psql", headers=headers))
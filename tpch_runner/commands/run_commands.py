@@ -19,8 +19,7 @@ from .utils import get_db, get_db_manager
 @click.pass_context
 def cli(ctx: click.Context):
     """Manage test results."""
-    _engine = meta.setup_database()
-    ctx.obj["dbm"] = meta.DBManager(_engine)
+    ctx.obj["dbm"] = meta.DBManager()
 
 
 @cli.command("query")
@@ -61,6 +60,47 @@ def run_query(ctx, query: int, alias_: str, db_id: int, report: bool) -> None:
         sys.exit(1)
 
 
+@cli.command("checksum")
+@click.option("-d", "--db", "db_id")
+@click.option("-a", "--alias", "alias", help="Database alias")
+@click.option("-s", "--scale", default="small", help="Data scale")
+@click.option(
+    "-q",
+    "--query",
+    "queries",
+    type=click.IntRange(1, 22),
+    multiple=True,
+    help="Query to validate, can be repeated (default: all queries).",
+)
+@click.pass_obj
+def run_checksum(ctx, alias: str, db_id: int, scale: str, queries: tuple[int]) -> None:
+    """Validate query results by checksums computed in the database.
+
+    Only one checksum row per query is transferred from the database.
+    """
+    dbm: meta.DBManager = ctx["dbm"]
+    db = get_db(dbm, id=db_id, alias_=alias)
+    db_manager: base.TPCH_Runner = get_db_manager(db, scale=scale)
+
+    try:
+        results = db_manager.checksum_test(list(queries) or None)
+    except Exception as e:
+        logger.error(f"Error: {str(e)}")
+        sys.exit(1)
+
+    report = [
+        (f"Q{r.query}", "Good" if r.ok else "Failed", r.runtime, r.reason or "")
+        for r in results
+    ]
+    print(
+        tabulate(
+            report, tablefmt="psql", headers=["Query", "Result", "Runtime (s)", "Reason"]
+        )
+    )
+    if not all(r.ok for r in results):
+        sys.exit(1)
+
+
 @cli.command("powertest")
 @click.option("-d", "--db", "db_id")
 @click.option("-a", "--alias", "alias", help="Database alias")
@@ -70,15 +110,35 @@ def run_query(ctx, query: int, alias_: str, db_id: int, report: bool) -> None:
     help="Save query test result (default: yes).",
 )
 @click.option("-s", "--scale", default="small", help="Data scale")
+@click.option(
+    "--validate",
+    is_flag=True,
+    help="Validate query results against answers while the test runs.",
+)
+@click.option(
+    "--fail-fast",
+    is_flag=True,
+    help="Abort the test on the first wrong query result, implies --validate.",
+)
 @click.pass_obj
-def run_powertest(ctx, alias: str, db_id: int, report: bool, scale: str) -> None:
+def run_powertest(
+    ctx,
+    alias: str,
+    db_id: int,
+    report: bool,
+    scale: str,
+    validate: bool,
+    fail_fast: bool,
+) -> None:
     """Run a TPC-H power test."""
     dbm: meta.DBManager = ctx["dbm"]
     db = get_db(dbm, id=db_id, alias_=alias)
     db_manager: base.TPCH_Runner = get_db_manager(db, scale=scale)
 
     try:
-        db_manager.power_test(no_report=not report)  # type: ignore
+        db_manager.power_test(  # type: ignore
+            no_report=not report, validate=validate, fail_fast=fail_fast
+        )
     except Exception as e:
         logger.error(f"Error: {str(e)}")
         sys.exit(1)
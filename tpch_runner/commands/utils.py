@@ -5,7 +5,6 @@ import warnings
 from datetime import datetime
 from typing import Optional, Type
 
-import matplotlib.pyplot as plt
 import numpy as np
 
 from .. import meta
@@ -103,6 +102,8 @@ def get_db_manager(db: meta.Database, scale: str = "small") -> base.TPCH_Runner:
 
 
 def barchart(title, data, fpath):
+    import matplotlib.pyplot as plt
+
     labels = [f"Q{i}" for i in range(1, 23)]
     if not data or len(data) != 22:
         raise ValueError("data can't be empty and must have 22 elements.")
@@ -126,6 +127,8 @@ def barchart2(
     data2: list[float],
     fpath: str,
 ):
+    import matplotlib.pyplot as plt
+
     labels = [f"Q{i}" for i in range(1, 23)]
 
     if not data1 or len(data1) != 22:
@@ -153,6 +156,8 @@ def barchart2(
 
 
 def linechart(title, data, fpath):
+    import matplotlib.pyplot as plt
+
     labels = [f"Q{i}" for i in range(1, 23)]
 
     plt.figure(figsize=(12, 6))
@@ -177,6 +182,8 @@ def linechart_multi(trends: list[dict], fpath: str) -> None:
         - 'data': A list of y-axis values corresponding to labels.
     - fpath (str): The file path to save the generated chart.
     """
+    import matplotlib.pyplot as plt
+
     labels = [f"Q{i}" for i in range(1, 23)]
 
     plt.figure(figsize=(12, 6))
@@ -204,6 +211,8 @@ def barchart_multi(trends: list[dict], fpath: str) -> None:
         - 'data': A list of y-axis values corresponding to labels.
     - fpath (str): The file path to save the generated chart.
     """
+    import matplotlib.pyplot as plt
+
     labels = ["total runtime"]
 
     # num_trends = len(trends)
@@ -235,6 +244,8 @@ def linechart2(
     data2: list[float],
     fpath: str,
 ):
+    import matplotlib.pyplot as plt
+
     labels = [f"Q{i}" for i in range(1, 23)]
 
     fig, ax = plt.subplots(figsize=(10, 6))
@@ -250,6 +261,85 @@ def linechart2(
     plt.savefig(f"{fpath}.png", dpi=300)
 
 
+def trendchart(title: str, trend: list, fpath: str, zscore_limit: float = 3.0) -> None:
+    """
+    Generate a line chart of runtimes and their rolling median over test runs.
+
+    Parameters:
+    - title (str): chart title.
+    - trend (list): rows returned by ``TestResultManager.query_trend``.
+    - fpath (str): The file path to save the generated chart.
+    - zscore_limit (float): runs with absolute z-score above it are marked.
+    """
+    import matplotlib.pyplot as plt
+
+    times = [row.testtime for row in trend]
+    outliers = [
+        row for row in trend if row.zscore is not None and abs(row.zscore) >= zscore_limit
+    ]
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(times, [row.runtime for row in trend], marker="o", label="runtime")
+    plt.plot(
+        times,
+        [row.rolling_median for row in trend],
+        linestyle="--",
+        label="rolling median",
+    )
+    if outliers:
+        plt.scatter(
+            [row.testtime for row in outliers],
+            [row.runtime for row in outliers],
+            color="red",
+            zorder=3,
+            label=f"|z| >= {zscore_limit:g}",
+        )
+
+    plt.title(title, fontsize=16)
+    plt.xlabel("Test Time", fontsize=14)
+    plt.ylabel("Runtime (seconds)", fontsize=14)
+    plt.xticks(rotation=45)
+    plt.grid(True)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(fpath, dpi=300)
+
+
+def loadchart(
+    title: str, labels: list[str], trends: list[dict], ylabel: str, fpath: str
+) -> None:
+    """
+    Generate a grouped barchart of load phases of multiple load runs.
+
+    Parameters:
+    - title (str): chart title.
+    - labels (list[str]): phase and table labels, like "load:lineitem".
+    - trends (list[dict]): A list of dictionaries, each containing:
+        - 'name': A string representing the load run.
+        - 'data': A list of values corresponding to labels, None if missing.
+    - ylabel (str): label of the y-axis.
+    - fpath (str): The file path to save the generated chart.
+    """
+    import matplotlib.pyplot as plt
+
+    indices = np.arange(len(labels))
+    bar_width = 0.8 / max(len(trends), 1)
+    fig, ax = plt.subplots(figsize=(12, 6))
+
+    for i, trend in enumerate(trends):
+        data = [np.nan if v is None else v for v in trend.get("data", [])]
+        ax.bar(indices + i * bar_width, data, width=bar_width, label=trend.get("name"))
+
+    ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.set_xticks(indices + (bar_width * (len(trends) - 1)) / 2)
+    ax.set_xticklabels(labels, rotation=45, ha="right")
+    ax.legend()
+
+    plt.tight_layout()
+    plt.savefig(fpath, dpi=300)
+
+
 def wrap_column(column_text) -> str:
     """Dynamically set column width and return column text that is adjusted to width."""
     termina_width = shutil.get_terminal_size((80, 20)).columns
@@ -1,34 +1,58 @@
 import logging
 import shutil
+import threading
 import time
+from collections import Counter
 from datetime import datetime
 from importlib import import_module
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional, TypeVar
+from uuid import uuid4
 
 import pandas as pd
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Column,
+    Connection,
     DateTime,
     Engine,
     Float,
     ForeignKey,
+    Index,
     Integer,
+    MetaData,
+    Sequence,
     String,
+    Table,
+    and_,
     create_engine,
     event,
+    func,
+    insert,
+    or_,
+    select,
+    text,
 )
-from sqlalchemy.exc import DatabaseError
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import DatabaseError, IntegrityError, OperationalError
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import DeclarativeBase, Mapped, joinedload, relationship, sessionmaker
+from sqlalchemy.schema import CreateIndex, CreateTable
 
 from tpch_runner.config import Config
 
 from .tpch import RESULT_DIR
-from .tpch.databases.results import Result
+from .tpch.databases.results import Result, ValidationReport, run_validations
+from .tpch.objstore import result_store
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+HISTORY_FORMATS = ("parquet", "csv")
+MB = 1024 * 1024
+
 
 class Base(DeclarativeBase):
     pass
@@ -46,7 +70,9 @@ class Database(Base):  # type: ignore
     __tablename__ = "databases"
     __table_args__ = {"sqlite_autoincrement": True}
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
+    id = Column(
+        Integer, Sequence("databases_id_seq"), primary_key=True, autoincrement=True
+    )
     db_type = Column(String, nullable=False)
     alias = Column(String, nullable=True, unique=True)
     host = Column(String, nullable=False)
@@ -62,9 +88,14 @@ class Database(Base):  # type: ignore
 
 class TestResult(Base):  # type: ignore
     __tablename__ = "results"
-    __table_args__ = {"sqlite_autoincrement": True}
+    __table_args__ = (
+        Index("ix_results_result_folder", "result_folder"),
+        Index("ix_results_type_query_time", "db_type", "query_name", "testtime"),
+        Index("ix_results_database_id", "database_id"),
+        {"sqlite_autoincrement": True},
+    )
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
+    id = Column(Integer, Sequence("results_id_seq"), primary_key=True, autoincrement=True)
     testtime = Column(DateTime, default=datetime.utcnow, nullable=False)
     db_type = Column(String, nullable=False)
     success = Column(Boolean, nullable=False)
@@ -73,6 +104,8 @@ class TestResult(Base):  # type: ignore
     result_csv = Column(String, nullable=False)
     query_name = Column(String, nullable=False)
     runtime = Column(Float, nullable=False, default=0)
+    # None until the result is validated against answers
+    valid = Column(Boolean, nullable=True)
     result_folder = Column(
         String, ForeignKey("powertests.result_folder", ondelete="CASCADE")
     )
@@ -80,12 +113,42 @@ class TestResult(Base):  # type: ignore
     database = relationship("Database", backref="results")
     power_test: Mapped["PowerTest"] = relationship(back_populates="results")
 
+    @property
+    def result_path(self) -> Path:
+        """Absolute path of the result file."""
+        return result_store.resolve(self.result_csv, self.result_folder)  # type: ignore
+
+
+class ResultObject(Base):  # type: ignore
+    """A deduplicated result file in the result store, shared by test results."""
+
+    __tablename__ = "objects"
+
+    key = Column(String, primary_key=True)
+    size = Column(Integer, nullable=False, default=0)
+    refcount = Column(Integer, nullable=False, default=0)
+    created = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class Setting(Base):  # type: ignore
+    """A setting of the metadata database shared by runner hosts."""
+
+    __tablename__ = "settings"
+
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=False)
+
+
+RESULT_STORE_ID = "result_store_id"
+
 
 class PowerTest(Base):  # type: ignore
     __tablename__ = "powertests"
     __table_args__ = {"sqlite_autoincrement": True}
 
-    id = Column(Integer, primary_key=True, autoincrement=True)
+    id = Column(
+        Integer, Sequence("powertests_id_seq"), primary_key=True, autoincrement=True
+    )
     db_type = Column(String, nullable=False)
     scale = Column(String, nullable=False)
     result_folder = Column(String, unique=True, nullable=False)
@@ -100,10 +163,142 @@ class PowerTest(Base):  # type: ignore
     )
 
 
-def setup_database(
-    db_url=f"sqlite:///{Path(Config.app_root).expanduser()}/results.db",
-):
-    engine = create_engine(db_url)
+class LoadRun(Base):  # type: ignore
+    """A run of building or loading a test database, timed per phase and table."""
+
+    __tablename__ = "loadruns"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(
+        Integer, Sequence("loadruns_id_seq"), primary_key=True, autoincrement=True
+    )
+    db_type = Column(String, nullable=False)
+    # command of the run, "create", "load" or "build"
+    command = Column(String, nullable=True)
+    scale = Column(String, nullable=True)
+    testtime = Column(DateTime, default=datetime.utcnow, nullable=False)
+    success = Column(Boolean, nullable=True)
+    runtime = Column(Float, default=0, nullable=True)
+    # loader settings, like "jobs=4 split=8 source=dbgen"
+    settings = Column(String, nullable=True)
+    comment = Column(String, nullable=True)
+    database_id = Column(Integer, ForeignKey("databases.id"), nullable=False)
+    database = relationship("Database", backref="loadruns")
+    tables: Mapped[list["LoadTable"]] = relationship(
+        back_populates="load_run", passive_deletes=True
+    )
+
+
+class LoadTable(Base):  # type: ignore
+    """Time of a phase of a load run, for one table or "all" tables."""
+
+    __tablename__ = "loadtables"
+    __table_args__ = (
+        Index("ix_loadtables_load_id", "load_id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(
+        Integer, Sequence("loadtables_id_seq"), primary_key=True, autoincrement=True
+    )
+    load_id = Column(
+        Integer, ForeignKey("loadruns.id", ondelete="CASCADE"), nullable=False
+    )
+    phase = Column(String, nullable=False)
+    table_name = Column(String, nullable=False)
+    rows = Column(BigInteger, nullable=True)
+    bytes = Column(BigInteger, nullable=True)
+    runtime = Column(Float, nullable=False, default=0)
+    success = Column(Boolean, nullable=False, default=True)
+    error = Column(String, nullable=True)
+    load_run: Mapped["LoadRun"] = relationship(back_populates="tables")
+
+    @property
+    def rows_per_sec(self) -> Optional[float]:
+        if not self.rows or not self.runtime:
+            return None
+        return self.rows / self.runtime  # type: ignore
+
+    @property
+    def mb_per_sec(self) -> Optional[float]:
+        if not self.bytes or not self.runtime:
+            return None
+        return self.bytes / MB / self.runtime  # type: ignore
+
+
+DEFAULT_DB_URL = f"sqlite:///{Path(Config.app_root).expanduser()}/results.db"
+
+
+@compiles(CreateTable, "duckdb")
+def _create_duckdb_table(create, compiler, **kw):
+    """DuckDB does not cascade deletes and checks foreign keys against the state
+    before the transaction, so a record could not be deleted together with its
+    dependent rows. Tables are created without foreign keys, dependent rows are
+    deleted explicitly in the same transaction instead.
+    """
+    create.include_foreign_key_constraints = []
+    return compiler.visit_create_table(create, **kw)
+
+
+schema_version = Table(
+    "schema_version",
+    MetaData(),
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("applied", DateTime, default=datetime.utcnow, nullable=False),
+)
+
+
+def _add_column(conn: Connection, table: str, column: str, col_type: str):
+    # read columns from an empty result, reflection is not supported by all backends
+    columns = conn.execute(text(f"SELECT * FROM {table} WHERE 1 = 0")).keys()
+    if column not in columns:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}"))
+
+
+def _create_indexes(conn: Connection, model):
+    for index in model.__table__.indexes:
+        conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+# Schema migrations in order, a migration must also work on databases whose
+# tables were created from the current models.
+MIGRATIONS: list[tuple[str, Callable[[Connection], None]]] = [
+    ("create tables", lambda conn: Base.metadata.create_all(conn)),
+    ("add results.valid", lambda conn: _add_column(conn, "results", "valid", "BOOLEAN")),
+    ("add results indexes", lambda conn: _create_indexes(conn, TestResult)),
+    ("add load runs", lambda conn: Base.metadata.create_all(conn)),
+    (
+        "add loadruns.command",
+        lambda conn: _add_column(conn, "loadruns", "command", "VARCHAR"),
+    ),
+    ("add settings", lambda conn: Base.metadata.create_all(conn)),
+]
+
+
+def migrate(engine: Engine) -> int:
+    """Apply pending schema migrations and return the schema version."""
+    with engine.begin() as conn:
+        schema_version.create(conn, checkfirst=True)
+        version = conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+        for number, (name, migration) in enumerate(
+            MIGRATIONS[version:], start=version + 1
+        ):
+            migration(conn)
+            conn.execute(schema_version.insert().values(version=number))
+            logger.debug(f"Metadata schema migrated to version {number}: {name}.")
+    return max(version, len(MIGRATIONS))
+
+
+_engines: dict[str, Engine] = {}
+_engine_lock = threading.Lock()
+
+
+def _create_engine(db_url: str) -> Engine:
+    if not db_url.startswith("sqlite"):
+        return create_engine(db_url, pool_pre_ping=True)
+
+    # wait for writers of other runner processes instead of failing at once
+    engine = create_engine(db_url, connect_args={"timeout": 30})
 
     @event.listens_for(engine, "connect")
     def enable_foreign_keys(dbapi_connection, connection_record):
@@ -111,13 +306,51 @@ def setup_database(
         cursor.execute("PRAGMA foreign_keys=ON")
         cursor.close()
 
-    Base.metadata.create_all(engine)
     return engine
 
 
+def get_engine(db_url: Optional[str] = None) -> Engine:
+    """Return the process-wide engine of a metadata database.
+
+    The database defaults to ``Config.meta_url`` or the local SQLite database.
+    The engine is created and the schema migrated on first use only.
+    """
+    db_url = db_url or Config.meta_url or DEFAULT_DB_URL
+    with _engine_lock:
+        if db_url not in _engines:
+            engine = _create_engine(db_url)
+            with_retries(lambda: migrate(engine))
+            _engines[db_url] = engine
+        return _engines[db_url]
+
+
+def setup_database(db_url: Optional[str] = None) -> Engine:
+    return get_engine(db_url)
+
+
+def with_retries(
+    func: Callable[[], T],
+    retry_on: tuple[type[Exception], ...] = (OperationalError,),
+    attempts: Optional[int] = None,
+) -> T:
+    """Run a metadata database operation, retry it on errors caused by other
+    runner hosts writing at the same time, like locks or serialization failures.
+    """
+    attempts = attempts or Config.meta_retries
+    for attempt in range(1, attempts + 1):
+        try:
+            return func()
+        except retry_on as e:
+            if attempt >= attempts:
+                raise
+            logger.debug(f"Metadata operation fails, retry {attempt}: {e}")
+            time.sleep(0.2 * attempt)
+    raise RuntimeError("unreachable")
+
+
 class DBManager:
-    def __init__(self, engine):
-        self.Session = sessionmaker(bind=engine)
+    def __init__(self, engine: Optional[Engine] = None):
+        self.Session = sessionmaker(bind=engine or get_engine())
 
     def get_databases(
         self, id: Optional[int] = None, alias: Optional[str] = None
@@ -269,49 +502,105 @@ class DBManager:
 
 
 class TestResultManager:
-    def __init__(self, engine: Engine):
-        self.Session = sessionmaker(bind=engine)
-        self._conn = engine.connect()
+    def __init__(self, engine: Optional[Engine] = None):
+        self.engine = engine or get_engine()
+        self.Session = sessionmaker(bind=self.engine)
 
     @staticmethod
     def _generate_result_folder(db_type: str, time_value: datetime) -> str:
+        """Return a unique run ID, runs may start within the same second on
+        different runner hosts.
+        """
         current_time = time_value.strftime("%Y%m%d_%H%M%S")
-        return f"{db_type}_{current_time}"
+        return f"{db_type}_{current_time}_{uuid4().hex[:8]}"
+
+    @staticmethod
+    def _check_result_store(session):
+        """Fail unless the result store is the one of the metadata database.
+
+        References to result objects are counted in the metadata database, so
+        runner hosts sharing it must share the result store, ``result_dir``, too.
+        The first store used with the metadata database is recorded.
+        """
+        store_id = result_store.store_id()
+        setting = session.get(Setting, RESULT_STORE_ID)
+        if setting is None:
+            session.add(Setting(key=RESULT_STORE_ID, value=store_id))
+        elif setting.value != store_id:
+            raise RuntimeError(
+                f"Result store {result_store.root} is not the result store of the "
+                "metadata database, runner hosts sharing a metadata database must "
+                "share result_dir too."
+            )
+
+    @staticmethod
+    def _ref_object(session, key: str):
+        """Add one reference to a result object, register it if it is new.
+
+        Raises:
+            FileNotFoundError: a new object has no file in the result store, e.g.
+                it was removed by a delete on another host after it was stored.
+        """
+        TestResultManager._check_result_store(session)
+        obj = session.get(ResultObject, key)
+        if obj is None:
+            obj_path = result_store.path(key)
+            if not obj_path.is_file():
+                raise FileNotFoundError(f"Result object {key} not found in store.")
+            obj = ResultObject(key=key, size=obj_path.stat().st_size, refcount=0)
+            session.add(obj)
+            obj.refcount = 1
+        else:
+            # increment in SQL, other runner hosts may share the object
+            obj.refcount = ResultObject.refcount + 1
+
+    @staticmethod
+    def _unref_objects(session, keys: list[str]) -> list[str]:
+        """Drop references to result objects and return keys of the objects
+        that are no longer referenced by any test result.
+        """
+        if keys:
+            TestResultManager._check_result_store(session)
+        orphans = []
+        for key, count in Counter(keys).items():
+            session.query(ResultObject).filter(ResultObject.key == key).update(
+                {ResultObject.refcount: ResultObject.refcount - count},
+                synchronize_session=False,
+            )
+            obj = session.get(ResultObject, key, populate_existing=True)
+            if obj is not None and obj.refcount <= 0:
+                session.delete(obj)
+                orphans.append(key)
+        return orphans
 
     def add_powertest(
         self, db_id: int, db_type: str, scale: str = "small", no_report: bool = False
     ) -> tuple[datetime, str]:
-        attempt = 0
-        max_attempts = 1
-        while attempt < max_attempts:
-            try:
-                test_time = datetime.now()
-                result_folder = self._generate_result_folder(db_type, test_time)
-
-                if no_report:
-                    logger.debug("generate test_time and result_folder.")
-                    return test_time, result_folder
-                with self.Session() as session:
-                    session.add(
-                        PowerTest(
-                            testtime=test_time,
-                            result_folder=result_folder,
-                            db_type=db_type,
-                            scale=scale,
-                            database_id=db_id,
-                        )
+        def add() -> tuple[datetime, str]:
+            test_time = datetime.now()
+            result_folder = self._generate_result_folder(db_type, test_time)
+            if no_report:
+                logger.debug("generate test_time and result_folder.")
+                return test_time, result_folder
+
+            with self.Session() as session:
+                session.add(
+                    PowerTest(
+                        testtime=test_time,
+                        result_folder=result_folder,
+                        db_type=db_type,
+                        scale=scale,
+                        database_id=db_id,
                     )
-                    session.commit()
-                logger.info(f"PowerTest added: {result_folder}")
-            except Exception as e:
-                self._conn.rollback()
+                )
+                session.commit()
+            logger.info(f"PowerTest added: {result_folder}")
+            return test_time, result_folder
 
-                if attempt >= max_attempts:
-                    print("Max attempts reached. Could not insert the record.")
-                    raise DatabaseError(None, None, e)
-                time.sleep(1)
-            attempt += 1
-        return test_time, result_folder
+        try:
+            return with_retries(add, retry_on=(OperationalError, IntegrityError))
+        except Exception as e:
+            raise DatabaseError(None, None, e)
 
     def update_powertest(
         self,
@@ -328,9 +617,11 @@ class TestResultManager:
         success (bool): If powertest succeed in all or not.
         runtime (float): The total runtime of the test.
         """
-        try:
+
+        def update():
             with self.Session() as session:
                 query = session.query(PowerTest)
+                power_test = None
                 if test_id is not None:
                     power_test = query.filter_by(id=test_id).first()
                 elif result_folder:
@@ -344,6 +635,9 @@ class TestResultManager:
 
                 session.commit()
 
+        try:
+            with_retries(update)
+
             logger.info(
                 "Test {} result updated: success={}, runtime={}s".format(
                     result_folder, success, runtime
@@ -386,6 +680,36 @@ class TestResultManager:
                 query = query.filter(PowerTest.db_type == db_type)
             return query.all()
 
+    def list_powertests(
+        self,
+        db_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> list[Row]:
+        """Return summary rows of Powertests ordered by ID, without query results.
+
+        Args:
+            db_type: list Powertests of this database type only.
+            since: list Powertests run at or after this time only.
+            limit: maximum number of rows, default all.
+            offset: number of rows to skip.
+        """
+        with self.Session() as session:
+            query = session.query(
+                PowerTest.id,
+                PowerTest.db_type,
+                PowerTest.testtime,
+                PowerTest.success,
+                PowerTest.runtime,
+                PowerTest.scale,
+            )
+            if db_type:
+                query = query.filter(PowerTest.db_type == db_type)
+            if since is not None:
+                query = query.filter(PowerTest.testtime >= since)
+            return query.order_by(PowerTest.id).offset(offset).limit(limit).all()
+
     def delete_powertest(
         self, id: Optional[int] = None, result_folder: Optional[str] = None
     ):
@@ -401,40 +725,102 @@ class TestResultManager:
                     raise RuntimeError("Result folder can't be None")
 
                 query = query.filter(PowerTest.result_folder == result_folder)
-                shutil.rmtree(RESULT_DIR.joinpath(result_folder))
+                object_keys = [
+                    row.result_csv
+                    for row in session.query(TestResult.result_csv).filter(
+                        TestResult.result_folder == result_folder
+                    )
+                    if result_store.is_object(row.result_csv)
+                ]
+                orphans = self._unref_objects(session, object_keys)
+                # not every backend cascades deletes
+                session.query(TestResult).filter(
+                    TestResult.result_folder == result_folder
+                ).delete(synchronize_session=False)
                 deleted_count = query.delete()
                 session.commit()
 
+            for key in orphans:
+                result_store.remove(key)
+            legacy_folder = RESULT_DIR.joinpath(result_folder)
+            if legacy_folder.is_dir():
+                shutil.rmtree(legacy_folder)
+
             record = id if id else result_folder
             logger.info(f"Powertest record {record} deleted.")
             return deleted_count
         except Exception as e:
             raise e
 
-    def compare_powertest(self, testid: int) -> tuple[bool, str]:
-        all_pass: bool = True
+    @staticmethod
+    def _powertest_result(pt_record: PowerTest) -> Result:
+        return Result(
+            db_type=pt_record.db_type,  # type: ignore
+            result_dir=pt_record.result_folder,  # type: ignore
+            scale=pt_record.scale,  # type: ignore
+            result_files={
+                f"{record.query_name[1:]}.csv": record.result_path
+                for record in pt_record.results
+            },
+        )
+
+    def compare_powertest(
+        self, testid: int, jobs: Optional[int] = None
+    ) -> tuple[bool, str]:
+        """Validate all query results of a Powertest against answers.
+
+        Args:
+            testid: Powertest ID.
+            jobs: number of validation worker processes, default is number of CPUs.
+        """
         with self.Session() as session:
             pt_record = session.query(PowerTest).filter_by(id=testid).first()
             if pt_record is None:
                 raise ValueError(f"PowerTest {testid} not found.")
             pt_folder: str = pt_record.result_folder  # type: ignore
+            result = self._powertest_result(pt_record)
 
-            result = Result(
-                db_type=pt_record.db_type,  # type: ignore
-                result_dir=pt_folder,
-                scale=pt_record.scale,  # type: ignore
-            )
-            for i in range(1, 22):
-                result_file = f"{i}.csv"
-                ok = result.compare_against_answer(result_file)
-                if not ok:
-                    all_pass = False
-                    logger.error(
-                        f"Query {i} result is not matched against answer. Test failed."
-                    )
-                else:
-                    logger.info(f"Compare {result_file}: Good.")
-            return all_pass, pt_folder
+        report = run_validations([(testid, pt_folder, result)], jobs, raise_errors=True)
+        self._record_validity(report)
+        return report[0].ok, pt_folder
+
+    def validate_powertests(
+        self, since: Optional[datetime] = None, jobs: Optional[int] = None
+    ) -> list[ValidationReport]:
+        """Validate all Powertests run since a given time in one worker pool.
+
+        Args:
+            since: validate Powertests run at or after this time, default all.
+            jobs: number of validation worker processes, default is number of CPUs.
+        """
+        with self.Session() as session:
+            query = session.query(PowerTest).options(joinedload(PowerTest.results))
+            if since is not None:
+                query = query.filter(PowerTest.testtime >= since)
+            tests = [
+                (
+                    pt_record.id,
+                    pt_record.result_folder,
+                    self._powertest_result(pt_record),
+                )
+                for pt_record in query.order_by(PowerTest.id).all()
+            ]
+        reports = run_validations(tests, jobs)  # type: ignore
+        self._record_validity(reports)
+        return reports
+
+    def _record_validity(self, reports: list[ValidationReport]):
+        """Flag query results of validated Powertests as valid or invalid."""
+        with self.Session() as session:
+            for report in reports:
+                for queries, valid in ((report.passed, True), (report.failed, False)):
+                    if not queries:
+                        continue
+                    session.query(TestResult).filter(
+                        TestResult.result_folder == report.result_folder,
+                        TestResult.query_name.in_([f"q{q}" for q in queries]),
+                    ).update({TestResult.valid: valid}, synchronize_session=False)
+            session.commit()
 
     def get_powertest_runtime(self, test_id: int) -> tuple[str, str, float, list[float]]:
         query_runtime: list[Column[float]] = []
@@ -452,6 +838,120 @@ class TestResultManager:
                 query_runtime.append(record.runtime)
         return db_type, test_name, total_runtime, query_runtime  # type: ignore
 
+    def query_trend(
+        self,
+        database_id: int,
+        query_name: Optional[str] = None,
+        last: int = 100,
+        window: int = 5,
+        baseline_id: Optional[int] = None,
+    ) -> list[Row]:
+        """Return the runtime trend of a query over the latest successful Powertests
+        of a database, oldest first.
+
+        Each row carries ``power_id``, ``result_folder``, ``testtime``,
+        ``runtime``, ``rolling_median`` of the last ``window`` runs,
+        ``pct_change`` against the baseline run and ``zscore`` against the
+        ``window`` runs before it. Statistics are computed with window functions
+        in the metadata database.
+
+        Args:
+            database_id: ID of the database the Powertests ran on.
+            query_name: query like ``q18``, default the Powertest total runtime.
+            last: number of latest runs to return.
+            window: number of runs of the rolling statistics.
+            baseline_id: Powertest ID of the baseline, default the oldest run
+                returned.
+        """
+        if last < 1 or window < 1:
+            raise ValueError("last and window must be positive.")
+        params: dict = {"db_id": database_id, "last": last, "baseline_id": baseline_id}
+        if query_name:
+            params["query_name"] = query_name
+            runs = """
+                SELECT p.id AS power_id, p.result_folder, p.testtime, r.runtime
+                FROM powertests p
+                JOIN results r ON r.result_folder = p.result_folder
+                WHERE p.database_id = :db_id AND r.query_name = :query_name
+                    AND r.success"""
+        else:
+            runs = """
+                SELECT p.id AS power_id, p.result_folder, p.testtime, p.runtime
+                FROM powertests p
+                WHERE p.database_id = :db_id AND p.success"""
+        if baseline_id is None:
+            baseline = "SELECT runtime AS base FROM recent WHERE age = "
+            baseline += "(SELECT max(age) FROM recent WHERE age <= :last)"
+        else:
+            baseline = "SELECT runtime AS base FROM runs WHERE power_id = :baseline_id"
+
+        # the rolling median is the middle one or two runtimes of each window,
+        # 2 * k between n and n + 2 picks them for odd and even window sizes
+        stmt = text(f"""
+            WITH runs AS ({runs}
+            ),
+            recent AS (
+                SELECT * FROM (
+                    SELECT runs.*, row_number() OVER (
+                        ORDER BY testtime DESC, power_id DESC
+                    ) AS age
+                    FROM runs
+                ) ranked
+                WHERE age <= :last + {window}
+            ),
+            members AS (
+                SELECT a.age, b.runtime,
+                    row_number() OVER (PARTITION BY a.age ORDER BY b.runtime) AS k,
+                    count(*) OVER (PARTITION BY a.age) AS n
+                FROM recent a
+                JOIN recent b ON b.age BETWEEN a.age AND a.age + {window - 1}
+            ),
+            medians AS (
+                SELECT age, avg(runtime) AS rolling_median
+                FROM members
+                WHERE 2 * k BETWEEN n AND n + 2
+                GROUP BY age
+            ),
+            stats AS (
+                SELECT recent.*, medians.rolling_median,
+                    avg(runtime) OVER w AS prev_mean,
+                    avg(runtime * runtime) OVER w AS prev_square,
+                    count(*) OVER w AS prev_count
+                FROM recent
+                JOIN medians ON medians.age = recent.age
+                WINDOW w AS (
+                    ORDER BY recent.age DESC
+                    ROWS BETWEEN {window} PRECEDING AND 1 PRECEDING
+                )
+            ),
+            baseline AS ({baseline})
+            SELECT power_id, result_folder, testtime, runtime, rolling_median,
+                100.0 * (runtime - base) / nullif(base, 0) AS pct_change,
+                CASE WHEN prev_count > 1
+                    AND prev_square - prev_mean * prev_mean > 0
+                THEN (runtime - prev_mean)
+                    / sqrt(prev_square - prev_mean * prev_mean)
+                END AS zscore
+            FROM stats
+            LEFT JOIN baseline ON 1 = 1
+            WHERE age <= :last
+            ORDER BY age DESC
+            """).columns(
+            power_id=Integer,
+            result_folder=String,
+            testtime=DateTime,
+            runtime=Float,
+            rolling_median=Float,
+            pct_change=Float,
+            zscore=Float,
+        )
+        with self.Session() as session:
+            if baseline_id is not None:
+                found = session.get(PowerTest, baseline_id)
+                if found is None or found.database_id != database_id:
+                    raise ValueError(f"Baseline PowerTest {baseline_id} not found.")
+            return session.execute(stmt, params).all()
+
     def add_test_result(
         self,
         db_type,
@@ -462,10 +962,20 @@ class TestResultManager:
         runtime,
         result_folder,
         db_id,
+        result_data: Optional[bytes] = None,
     ):
+        """Record a query result.
+
+        ``result_data`` is the content of the result object ``result_csv``, the
+        object is stored again if a delete on another host removed it meanwhile.
+        """
         if rowcount is None:
             rowcount = 0
-        try:
+        is_object = result_store.is_object(result_csv)
+
+        def add():
+            if is_object and result_data is not None:
+                result_store.put(result_data)
             with self.Session() as session:
                 new_result = TestResult(
                     db_type=db_type,
@@ -478,10 +988,25 @@ class TestResultManager:
                     database_id=db_id,
                 )
                 session.add(new_result)
+                if is_object:
+                    self._ref_object(session, result_csv)
                 session.commit()
-            logger.info(f"Test result added: {query_name} on {db_type}.")
-        except Exception as e:
-            raise e
+
+        # another runner host may register the same new result object first
+        with_retries(add, retry_on=(OperationalError, IntegrityError))
+        # a delete committed before this reference may remove the file after it
+        if is_object and result_data is not None:
+            result_store.put(result_data)
+        logger.info(f"Test result added: {query_name} on {db_type}.")
+
+    def set_result_validity(self, result_folder: str, query_name: str, valid: bool):
+        """Flag a query result of a Powertest as valid or invalid."""
+        with self.Session() as session:
+            session.query(TestResult).filter(
+                TestResult.result_folder == result_folder,
+                TestResult.query_name == query_name,
+            ).update({TestResult.valid: valid})
+            session.commit()
 
     def get_test_results(self, db_type: Optional[str] = None) -> list[TestResult]:
         with self.Session() as session:
@@ -490,6 +1015,47 @@ class TestResultManager:
                 query = query.filter(TestResult.db_type == db_type)
             return query.all()
 
+    def list_test_results(
+        self,
+        single: bool = False,
+        db_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> list[Row]:
+        """Return summary rows of query results ordered by ID.
+
+        Rows of Powertest query results have the Powertest ID as ``power_id``.
+
+        Args:
+            single: list results of single query runs instead of Powertests.
+            db_type: list results of this database type only.
+            since: list results of queries run at or after this time only.
+            limit: maximum number of rows, default all.
+            offset: number of rows to skip.
+        """
+        columns = [
+            TestResult.id,
+            TestResult.db_type,
+            TestResult.query_name,
+            TestResult.testtime,
+            TestResult.success,
+            TestResult.rowcount,
+            TestResult.runtime,
+        ]
+        with self.Session() as session:
+            if single:
+                query = session.query(*columns).filter(TestResult.result_folder.is_(None))
+            else:
+                query = session.query(PowerTest.id.label("power_id"), *columns).join(
+                    PowerTest, PowerTest.result_folder == TestResult.result_folder
+                )
+            if db_type:
+                query = query.filter(TestResult.db_type == db_type)
+            if since is not None:
+                query = query.filter(TestResult.testtime >= since)
+            return query.order_by(TestResult.id).offset(offset).limit(limit).all()
+
     def get_test_results_from_powertest(
         self,
         test_id: Optional[int] = None,
@@ -522,14 +1088,7 @@ class TestResultManager:
         query_dir = TPCH_Runner.query_dir
         try:
             result_detail = self.get_test_results_from_powertest(test_id=test_id).pop()
-            if result_detail.power_test is not None:
-                result_file = (
-                    Path(RESULT_DIR)
-                    .joinpath(result_detail.result_folder)
-                    .joinpath(result_detail.result_csv)
-                )
-            else:
-                result_file = Path(RESULT_DIR).joinpath(result_detail.result_csv)
+            result_file = result_detail.result_path
             if result_file.exists():
                 result_df = pd.read_csv(result_file)
             else:
@@ -555,12 +1114,430 @@ class TestResultManager:
                         "Delete powertest to delete the entire test set."
                     )
 
-                result_file = Path(RESULT_DIR).joinpath(record.result_csv)
-                if result_file.exists():
-                    result_file.unlink()
+                orphans: list[str] = []
+                if result_store.is_object(record.result_csv):
+                    orphans = self._unref_objects(session, [record.result_csv])
+                else:
+                    result_file = record.result_path
+                    if result_file.exists():
+                        result_file.unlink()
                 deleted_count = query.delete()
                 session.commit()
+
+            for key in orphans:
+                result_store.remove(key)
             logger.info(f"Test result {test_id} deleted.")
             return deleted_count
         except Exception as e:
             raise e
+
+    @staticmethod
+    def _result_file_path(row: dict) -> Optional[Path]:
+        """Return path of a result file relative to the result directory."""
+        if not row.get("result_csv"):
+            return None
+        path = result_store.resolve(row["result_csv"], row.get("result_folder"))
+        return path.relative_to(result_store.root)
+
+    def export_history(
+        self, target: Path, since: Optional[datetime] = None, fmt: str = "parquet"
+    ) -> dict[str, int]:
+        """Export databases, Powertests, test results and their result files.
+
+        Tables are read with one query each and written with DuckDB, Powertests
+        and results are partitioned by database type, e.g.
+        ``<target>/powertests/db_type=pg/data_0.parquet``. Result files are
+        copied into ``<target>/files`` with their paths in the result directory.
+        Database passwords are not exported.
+
+        Args:
+            target: directory to export to, it must not contain an export.
+            since: export tests run at or after this time only.
+            fmt: ``parquet`` or ``csv``.
+
+        Returns:
+            Number of exported rows of each table and of result files.
+        """
+        import duckdb
+
+        if fmt not in HISTORY_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        target = Path(target).expanduser()
+        if target.joinpath("powertests").exists():
+            raise FileExistsError(f"{target} contains an export already.")
+
+        powertests = select(PowerTest.__table__)
+        if since is not None:
+            powertests = powertests.where(PowerTest.testtime >= since)
+        results = select(TestResult.__table__)
+        if since is not None:
+            results = results.where(
+                or_(
+                    TestResult.result_folder.in_(
+                        select(PowerTest.result_folder).where(PowerTest.testtime >= since)
+                    ),
+                    (TestResult.result_folder.is_(None)) & (TestResult.testtime >= since),
+                )
+            )
+        with self.engine.connect() as conn:
+            frames = {
+                "databases": pd.read_sql(
+                    select(Database.__table__).with_only_columns(
+                        *(c for c in Database.__table__.c if c.name != "password")
+                    ),
+                    conn,
+                ),
+                "powertests": pd.read_sql(powertests, conn),
+                "results": pd.read_sql(results, conn),
+            }
+
+        target.mkdir(parents=True, exist_ok=True)
+        counts = {name: len(df) for name, df in frames.items()}
+        con = duckdb.connect()
+        try:
+            for name, df in frames.items():
+                if df.empty:
+                    continue
+                con.register(name, df)
+                path = target.joinpath(name)
+                if name == "databases":
+                    path.mkdir()
+                    path, partition = path.joinpath(f"data_0.{fmt}"), ""
+                else:
+                    partition = ", PARTITION_BY (db_type)"
+                path_sql = str(path).replace("'", "''")
+                con.execute(f"COPY {name} TO '{path_sql}' (FORMAT {fmt}{partition})")
+        finally:
+            con.close()
+
+        files = 0
+        for row in frames["results"].to_dict("records"):
+            rel_path = self._result_file_path(row)
+            if rel_path is None:
+                continue
+            src = result_store.root.joinpath(rel_path)
+            dest = target.joinpath("files", rel_path)
+            if not src.is_file():
+                logger.warning(f"Result file {src} not found, not exported.")
+            elif not dest.exists():
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(src, dest)
+                files += 1
+        counts["files"] = files
+        logger.info(f"Test history exported to {target}: {counts}.")
+        return counts
+
+    @staticmethod
+    def _read_history(con, source: Path, name: str) -> list[dict]:
+        """Read rows of an exported table, an empty table is not exported."""
+        table_dir = source.joinpath(name)
+        for fmt in HISTORY_FORMATS:
+            if not any(table_dir.rglob(f"*.{fmt}")):
+                continue
+            pattern = f"{table_dir}/**/*.{fmt}".replace("'", "''")
+            df = con.execute(
+                f"SELECT * FROM read_{fmt}('{pattern}', hive_partitioning = true)"
+            ).df()
+            return df.astype(object).where(df.notna(), None).to_dict("records")
+        return []
+
+    def import_history(
+        self, source: Path, get_password: Optional[Callable[[dict], str]] = None
+    ) -> dict[str, int]:
+        """Merge an export made by ``export_history`` into the metadata database.
+
+        Databases are matched by alias, or by type, host, port and database name
+        when they have no alias. Powertests whose result folder exists already
+        are skipped with their results, as are individual test results recorded
+        already. Result files are copied into the result directory.
+
+        Args:
+            source: directory of the export.
+            get_password: returns the password of a database new to the metadata
+                database, called with its exported row. Passwords are not
+                exported, so it is required to import new databases.
+
+        Returns:
+            Number of imported rows of each table and of result files.
+        """
+        import duckdb
+
+        source = Path(source).expanduser()
+        if not source.joinpath("databases").is_dir():
+            raise FileNotFoundError(f"No exported history found in {source}.")
+        con = duckdb.connect()
+        try:
+            rows = {
+                name: self._read_history(con, source, name)
+                for name in ("databases", "powertests", "results")
+            }
+        finally:
+            con.close()
+
+        counts = {"databases": 0, "powertests": 0, "results": 0, "files": 0}
+        with self.Session() as session:
+            db_ids = {}
+            for row in rows["databases"]:
+                query = session.query(Database.id)
+                if row["alias"]:
+                    query = query.filter(Database.alias == row["alias"])
+                else:
+                    query = query.filter(
+                        Database.db_type == row["db_type"],
+                        Database.host == row["host"],
+                        Database.port == row["port"],
+                        Database.dbname == row["dbname"],
+                    )
+                db_id = query.scalar()
+                if db_id is None:
+                    if get_password is None:
+                        raise ValueError(
+                            f"Database {row['alias'] or row['host']} is new, "
+                            "its password must be entered to import it."
+                        )
+                    fields = {k: v for k, v in row.items() if k not in ("id", "password")}
+                    db = Database(password=get_password(row), **fields)
+                    session.add(db)
+                    session.flush()
+                    db_id = db.id
+                    counts["databases"] += 1
+                db_ids[row["id"]] = db_id
+
+            folders = {row["result_folder"] for row in rows["powertests"]}
+            existing = set(
+                session.scalars(
+                    select(PowerTest.result_folder).where(
+                        PowerTest.result_folder.in_(folders)
+                    )
+                )
+            )
+            new_tests = [
+                {**row, "database_id": db_ids[row["database_id"]]}
+                for row in rows["powertests"]
+                if row["result_folder"] not in existing
+            ]
+            for row in new_tests:
+                row.pop("id")
+            new_folders = {row["result_folder"] for row in new_tests}
+
+            new_results = []
+            for row in rows["results"]:
+                row = {**row, "database_id": db_ids[row["database_id"]]}
+                row.pop("id")
+                if row["result_folder"] is not None:
+                    if row["result_folder"] not in new_folders:
+                        continue
+                elif (
+                    session.query(TestResult.id)
+                    .filter(
+                        TestResult.result_folder.is_(None),
+                        TestResult.database_id == row["database_id"],
+                        TestResult.query_name == row["query_name"],
+                        TestResult.testtime == row["testtime"],
+                    )
+                    .first()
+                ):
+                    continue
+                new_results.append(row)
+
+            for row in new_results:
+                rel_path = self._result_file_path(row)
+                if rel_path is None:
+                    continue
+                src = source.joinpath("files", rel_path)
+                dest = result_store.root.joinpath(rel_path)
+                if src.is_file() and not dest.exists():
+                    dest.parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copy2(src, dest)
+                    counts["files"] += 1
+
+            if new_tests:
+                session.execute(insert(PowerTest), new_tests)
+            if new_results:
+                session.execute(insert(TestResult), new_results)
+            for row in new_results:
+                if not result_store.is_object(row["result_csv"]):
+                    continue
+                try:
+                    self._ref_object(session, row["result_csv"])
+                except FileNotFoundError:
+                    logger.warning(f"Result file {row['result_csv']} not imported.")
+                    session.flush()
+            session.commit()
+
+        counts["powertests"] = len(new_tests)
+        counts["results"] = len(new_results)
+        logger.info(f"Test history imported from {source}: {counts}.")
+        return counts
+
+
+class LoadManager:
+    def __init__(self, engine: Optional[Engine] = None):
+        self.engine = engine or get_engine()
+        self.Session = sessionmaker(bind=self.engine)
+
+    @staticmethod
+    def _load_tables(loads: list) -> list[LoadTable]:
+        return [
+            LoadTable(
+                phase=load.phase,
+                table_name=load.table,
+                rows=load.rows,
+                bytes=load.bytes,
+                runtime=load.runtime,
+                success=load.error is None,
+                error=load.error,
+            )
+            for load in loads
+        ]
+
+    def add_loadrun(
+        self,
+        db_id: int,
+        db_type: str,
+        loads: list,
+        runtime: float,
+        success: Optional[bool],
+        scale: Optional[str] = None,
+        settings: Optional[str] = None,
+        testtime: Optional[datetime] = None,
+        command: str = "load",
+    ) -> int:
+        """Record a load run and return its ID.
+
+        Args:
+            loads: ``TableLoad`` records of each phase and table.
+            runtime: wall time of the whole run.
+            success: None for a run still going on, see ``add_loadtables``.
+        """
+
+        def add() -> int:
+            with self.Session() as session:
+                load_run = LoadRun(
+                    db_type=db_type,
+                    command=command,
+                    scale=scale,
+                    testtime=testtime or datetime.now(),
+                    success=success,
+                    runtime=runtime,
+                    settings=settings,
+                    database_id=db_id,
+                )
+                load_run.tables = self._load_tables(loads)
+                session.add(load_run)
+                session.commit()
+                return load_run.id  # type: ignore
+
+        load_id = with_retries(add)
+        logger.info(f"Load run {load_id} is recorded.")
+        return load_id
+
+    def add_loadtables(self, load_id: int, loads: list) -> None:
+        """Add ``TableLoad`` records to a load run as its phases finish."""
+
+        def add():
+            with self.Session() as session:
+                for load_table in self._load_tables(loads):
+                    load_table.load_id = load_id
+                    session.add(load_table)
+                session.commit()
+
+        with_retries(add)
+
+    def finish_loadrun(self, load_id: int, success: bool, runtime: float) -> None:
+        """Set the result of a load run, ``runtime`` is added to its runtime so
+        far, a resumed run accumulates the runtime of each attempt.
+        """
+
+        def finish():
+            with self.Session() as session:
+                load_run = session.get(LoadRun, load_id)
+                if load_run is None:
+                    raise ValueError(f"Load run {load_id} not found.")
+                load_run.success = success  # type: ignore
+                load_run.runtime = (load_run.runtime or 0) + runtime  # type: ignore
+                session.commit()
+
+        with_retries(finish)
+
+    def last_loadrun(self, db_id: int, command: str) -> Optional[LoadRun]:
+        """Return the latest load run of a command on a database with its phases."""
+        with self.Session() as session:
+            return (
+                session.query(LoadRun)
+                .options(joinedload(LoadRun.tables))
+                .filter(LoadRun.database_id == db_id, LoadRun.command == command)
+                .order_by(LoadRun.id.desc())
+                .first()
+            )
+
+    def list_loadruns(
+        self,
+        db_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> list[Row]:
+        """Return summary rows of load runs ordered by ID, with the rows and bytes
+        loaded in total.
+        """
+        with self.Session() as session:
+            query = (
+                session.query(
+                    LoadRun.id,
+                    LoadRun.db_type,
+                    LoadRun.command,
+                    LoadRun.testtime,
+                    LoadRun.success,
+                    LoadRun.runtime,
+                    LoadRun.scale,
+                    LoadRun.settings,
+                    func.sum(LoadTable.rows).label("rows"),
+                    func.sum(LoadTable.bytes).label("bytes"),
+                )
+                .outerjoin(
+                    LoadTable,
+                    and_(LoadTable.load_id == LoadRun.id, LoadTable.phase == "load"),
+                )
+                .group_by(
+                    LoadRun.id,
+                    LoadRun.db_type,
+                    LoadRun.command,
+                    LoadRun.testtime,
+                    LoadRun.success,
+                    LoadRun.runtime,
+                    LoadRun.scale,
+                    LoadRun.settings,
+                )
+            )
+            if db_type:
+                query = query.filter(LoadRun.db_type == db_type)
+            if since is not None:
+                query = query.filter(LoadRun.testtime >= since)
+            return query.order_by(LoadRun.id).offset(offset).limit(limit).all()
+
+    def get_loadruns(self, load_ids: list[int]) -> list[LoadRun]:
+        """Return load runs with their phases, in the order of ``load_ids``."""
+        with self.Session() as session:
+            records = {
+                record.id: record
+                for record in session.query(LoadRun)
+                .options(joinedload(LoadRun.tables))
+                .filter(LoadRun.id.in_(load_ids))
+                .all()
+            }
+        missing = [str(load_id) for load_id in load_ids if load_id not in records]
+        if missing:
+            raise ValueError(f"Load run {', '.join(missing)} not found.")
+        return [records[load_id] for load_id in load_ids]
+
+    def delete_loadrun(self, load_id: int) -> int:
+        with self.Session() as session:
+            # not every backend cascades deletes
+            session.query(LoadTable).filter(LoadTable.load_id == load_id).delete(
+                synchronize_session=False
+            )
+            deleted_count = session.query(LoadRun).filter(LoadRun.id == load_id).delete()
+            session.commit()
+        logger.info(f"Load run {load_id} deleted.")
+        return deleted_count
@@ -1,7 +1,6 @@
 # flake8: noqa: F401
 import time
 from collections import namedtuple
-from datetime import datetime
 from functools import wraps
 from pathlib import Path
 from typing import Any, NamedTuple, Optional
@@ -71,6 +70,17 @@ QUERY_ORDER = [  # follows appendix A of the TPCH-specification
 ]
 
 
+# tables referenced by foreign keys of each table in the TPC-H specification
+TABLE_DEPENDENCIES = {
+    "nation": ("region",),
+    "supplier": ("nation",),
+    "customer": ("nation",),
+    "partsupp": ("part", "supplier"),
+    "orders": ("customer",),
+    "lineitem": ("orders", "partsupp"),
+}
+
+
 class InternalQueryArgs(NamedTuple):
     db: str
     no_report: bool
@@ -128,6 +138,7 @@ def post_process(func):
     @wraps(func)
     def wrapper(*args, **kwargs) -> Any:
         from ..meta import TestResultManager
+        from .objstore import result_store
 
         metadb: TestResultManager
         _args: InternalQueryArgs
@@ -141,16 +152,8 @@ def post_process(func):
             csv_file_name: Optional[str] = None
             if not _args.no_report:
                 df = pd.DataFrame(rset, columns=columns)
-                current_timestamp = datetime.now().strftime("%Y-%m-%d-%H%M%S")
-                csv_file_name = "{}_{}_{}.csv".format(
-                    _args.db, f"q{_args.idx}", current_timestamp
-                )
-
-                if _args.result_dir is not None:
-                    csv_file_name = f"{_args.idx}.csv"
-                    df.to_csv(_args.result_dir.joinpath(csv_file_name), index=False)
-                else:
-                    df.to_csv(RESULT_DIR.joinpath(csv_file_name), index=False)
+                data = df.to_csv(index=False).encode()
+                csv_file_name = result_store.put(data)
                 result_folder = str(_args.result_dir.stem) if _args.result_dir else None
                 metadb.add_test_result(
                     db_type=_args.db,
@@ -161,6 +164,7 @@ def post_process(func):
                     runtime=runtime,
                     result_folder=result_folder,
                     db_id=_args.db_id,
+                    result_data=data,
                 )
             return Result(success, rowcount, rset, columns, csv_file_name), runtime, None
         return _results
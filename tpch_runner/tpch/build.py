@@ -0,0 +1,221 @@
+"""Build a test database as a DAG of stages.
+
+Tables are created first, then each table is loaded, gets its deferred primary
+key if the database defers constraints, and is indexed and analyzed. A table
+is loaded after the tables its foreign keys reference, otherwise stages of
+different tables are independent and run concurrently, e.g. small tables are
+indexed and analyzed while lineitem is still loading. Finished stages are passed
+in as ``done`` and skipped, so a build that fails part-way can be resumed.
+"""
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Callable, Iterable, NamedTuple, Optional, Union
+
+from . import all_tables
+from .databases.base import TableLoad, TPCH_Runner
+from .datafiles import data_size, expected_rows
+
+logger = logging.getLogger(__name__)
+
+StageKey = tuple[str, str]
+
+
+class Stage(NamedTuple):
+    """A phase of a table, or of "all" tables, and the stages it waits for."""
+
+    phase: str
+    table: str
+    deps: tuple[StageKey, ...] = ()
+
+    @property
+    def key(self) -> StageKey:
+        return (self.phase, self.table)
+
+
+def build_stages(
+    tables: Iterable[str] = all_tables,
+    foreign_keys: Optional[dict[str, tuple[str, ...]]] = None,
+    index: bool = True,
+    constraints: bool = False,
+) -> list[Stage]:
+    """Return stages to build tables in dependency order.
+
+    Args:
+        tables: tables to load, the first ones are started first.
+        foreign_keys: tables referenced by foreign keys of each table, which are
+            loaded before the table.
+        index: create indexes of each table after it is loaded.
+        constraints: add constraints of each table after it is loaded, before
+            it is indexed.
+    """
+    tables = list(tables)
+    foreign_keys = foreign_keys or {}
+    create = ("create", "all")
+    stages = [Stage(*create)]
+    for table in tables:
+        references = [
+            ("load", ref) for ref in foreign_keys.get(table, ()) if ref in tables
+        ]
+        stages.append(Stage("load", table, (create, *references)))
+        last = ("load", table)
+        if constraints:
+            stages.append(Stage("constraints", table, (last,)))
+            last = ("constraints", table)
+        if index:
+            stages.append(Stage("index", table, (last,)))
+            last = ("index", table)
+        stages.append(Stage("analyze", table, (last,)))
+    return stages
+
+
+def run_stages(
+    stages: list[Stage],
+    run: Callable[[Stage], TableLoad],
+    jobs: int = 1,
+    done: Iterable[StageKey] = (),
+    on_finish: Optional[Callable[[TableLoad], None]] = None,
+) -> list[TableLoad]:
+    """Run stages whose dependencies are finished, ``jobs`` stages at a time.
+
+    Stages in ``done`` are skipped. A failed stage does not stop independent
+    stages, but the stages depending on it are not run. ``on_finish`` is called
+    with the result of each stage as it finishes. Return results of stages run.
+    """
+    finished = set(done)
+    failed: set[StageKey] = set()
+    pending = [stage for stage in stages if stage.key not in finished]
+    results: list[TableLoad] = []
+    running: dict[Future, Stage] = {}
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            for stage in list(pending):
+                blocked_by = failed.intersection(stage.deps)
+                if blocked_by:
+                    pending.remove(stage)
+                    failed.add(stage.key)
+                    logger.warning(
+                        f"Stage {stage.phase} of {stage.table} is skipped, "
+                        f"{', '.join(':'.join(key) for key in blocked_by)} failed."
+                    )
+                elif len(running) < jobs and finished.issuperset(stage.deps):
+                    pending.remove(stage)
+                    running[executor.submit(run, stage)] = stage
+            if not running:
+                break
+            finished_now, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished_now:
+                stage = running.pop(future)
+                result = future.result()
+                results.append(result)
+                if on_finish:
+                    on_finish(result)
+                if result.error is None:
+                    finished.add(stage.key)
+                    logger.info(
+                        f"Stage {stage.phase} of {stage.table} finishes "
+                        f"in {result.runtime}s."
+                    )
+                else:
+                    failed.add(stage.key)
+                    logger.error(
+                        f"Stage {stage.phase} of {stage.table} fails: {result.error}"
+                    )
+    return results
+
+
+class DatabaseBuild:
+    """Stages of building a database of a scale factor from a data folder.
+
+    Each stage runs on a connection of its own. A load stage fails unless the
+    table has the TPC-H row count of the scale factor afterwards. With
+    ``clean``, what a stage may have left from a failed attempt is removed
+    before it runs: tables are dropped before they are created and truncated
+    before they are loaded.
+    """
+
+    def __init__(
+        self,
+        runner: TPCH_Runner,
+        scale: str,
+        data_folder: Union[str, Path],
+        delimiter: str = "|",
+        split: int = 1,
+        index: bool = True,
+        clean: bool = False,
+    ):
+        self.runner = runner
+        self.scale = scale
+        self.data_folder = str(data_folder)
+        self.delimiter = delimiter
+        self.split = split
+        self.index = index
+        self.clean = clean
+
+    def stages(self) -> list[Stage]:
+        tables = self.runner._load_order(list(all_tables), self.data_folder)
+        return build_stages(
+            tables,
+            self.runner.foreign_keys,
+            index=self.index,
+            constraints=self.runner.defers_constraints,
+        )
+
+    def _load(self, runner: TPCH_Runner, table: str) -> int:
+        if self.clean:
+            runner.truncate_table(table)
+        runner.load_single_table(
+            table,
+            data_folder=self.data_folder,
+            delimiter=self.delimiter,
+            split=self.split,
+        )
+        rows = runner.count_rows(table)[table]
+        expected = expected_rows(table, self.scale)
+        if expected is not None and rows != expected:
+            raise ValueError(
+                f"{rows} rows are loaded, {expected} expected at scale {self.scale}."
+            )
+        return rows
+
+    def run_stage(self, stage: Stage) -> TableLoad:
+        """Run a stage and time it, errors are returned in the result."""
+        runner = self.runner.clone()
+        rows: Optional[int] = None
+        size: Optional[int] = None
+        error: Optional[str] = None
+        start = time.perf_counter()
+        try:
+            if stage.phase == "create":
+                if self.clean:
+                    runner.drop_table()
+                runner.create_tables()
+            elif stage.phase == "load":
+                size = data_size(self.data_folder, stage.table)
+                rows = self._load(runner, stage.table)
+            elif stage.phase == "constraints":
+                runner.add_constraints(stage.table)
+            elif stage.phase == "index":
+                runner.create_indexes(stage.table)
+            elif stage.phase == "analyze":
+                runner.analyze(stage.table)
+            else:
+                raise ValueError(f"Unknown build phase {stage.phase}.")
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        finally:
+            runner._conn.close()
+        runtime = round(time.perf_counter() - start, 4)
+        return TableLoad(stage.table, runtime, error, stage.phase, rows, size)
+
+    def run(
+        self,
+        jobs: int = 1,
+        done: Iterable[StageKey] = (),
+        on_finish: Optional[Callable[[TableLoad], None]] = None,
+    ) -> list[TableLoad]:
+        return run_stages(
+            self.stages(), self.run_stage, jobs=jobs, done=done, on_finish=on_finish
+        )
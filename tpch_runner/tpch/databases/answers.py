@@ -0,0 +1,266 @@
+"""TPC-H answer sets: generation, on-disk cache and per-process compiled copies."""
+
+import hashlib
+import logging
+import os
+import pickle
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Union
+
+import pandas as pd
+
+from tpch_runner.config import Config
+
+from .. import ANSWER_DIR, QUERY_ORDER, SCHEMA_BASE, all_tables
+
+ANSWER_CACHE_DIR = Path(Config.app_root).expanduser().joinpath("cache", "answers")
+GENERATED_ANSWER_DIR = Path(Config.app_root).expanduser().joinpath("answers")
+CHECKSUM_SAMPLE_SIZE = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+_answer_sets: dict[Path, dict[str, pd.DataFrame]] = {}
+_lock = threading.Lock()
+
+
+def answer_fingerprint(answer_dir: Path) -> str:
+    """Return a fingerprint of the answer files from their names, sizes and
+    modification times, so the CSV files are not read to check the cache.
+    """
+    digest = hashlib.sha256()
+    for answer_file in sorted(answer_dir.glob("*.csv")):
+        stat = answer_file.stat()
+        digest.update(f"{answer_file.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()
+
+
+def _cache_file(answer_dir: Path) -> Path:
+    dir_key = hashlib.sha256(str(answer_dir.resolve()).encode()).hexdigest()[:16]
+    return ANSWER_CACHE_DIR.joinpath(f"{answer_dir.name}-{dir_key}.pkl")
+
+
+def _compile(answer_dir: Path) -> dict[str, pd.DataFrame]:
+    """Parse all answer files once, with string columns already trimmed.
+
+    Answer files too large to be kept in memory are left out, they are compared
+    in chunks from disk.
+    """
+    answers = {}
+    for answer_file in answer_dir.glob("*.csv"):
+        if answer_file.stat().st_size > Config.compare_memory_limit:
+            continue
+        df = pd.read_csv(answer_file)
+        for column in df.select_dtypes(include=["object", "string"]).columns:
+            df[column] = df[column].str.strip()
+        answers[answer_file.name] = df
+    return answers
+
+
+def _read_cache(cache_file: Path, fingerprint: str) -> Optional[dict[str, pd.DataFrame]]:
+    if not cache_file.is_file():
+        return None
+    try:
+        with open(cache_file, "rb") as f:
+            payload = pickle.load(f)
+    except Exception as e:
+        logger.debug(f"Ignore unreadable answer cache {cache_file}: {e}")
+        return None
+    if payload.get("fingerprint") != fingerprint:
+        return None
+    return payload["answers"]
+
+
+def _write_cache(cache_file: Path, fingerprint: str, answers: dict[str, pd.DataFrame]):
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=cache_file.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(
+                {"fingerprint": fingerprint, "answers": answers},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_name, cache_file)
+    except OSError as e:
+        logger.debug(f"Can't write answer cache {cache_file}: {e}")
+
+
+def load_answers(answer_dir: Path) -> dict[str, pd.DataFrame]:
+    """Return answers of an answer directory keyed by file name, like ``1.csv``.
+
+    Answers are compiled into a pickled cache on first use and the cache is
+    rebuilt when answer files change. Loaded answers are kept for the lifetime
+    of the process, callers must not modify the returned data frames.
+    """
+    answer_dir = Path(answer_dir)
+    with _lock:
+        if answer_dir in _answer_sets:
+            return _answer_sets[answer_dir]
+
+        # the set of compiled answers depends on the memory limit
+        fingerprint = f"{answer_fingerprint(answer_dir)}:{Config.compare_memory_limit}"
+        cache_file = _cache_file(answer_dir)
+        answers = _read_cache(cache_file, fingerprint)
+        if answers is None:
+            logger.debug(f"Compile answers of {answer_dir} into {cache_file}.")
+            answers = _compile(answer_dir)
+            _write_cache(cache_file, fingerprint, answers)
+
+        _answer_sets[answer_dir] = answers
+        return answers
+
+
+def clear_answers():
+    """Forget answers loaded in the current process."""
+    with _lock:
+        _answer_sets.clear()
+
+
+def scale_key(scale: Union[str, int]) -> str:
+    """Return folder name of generated answers of a scale factor, e.g. ``sf10``."""
+    scale = str(scale).lower()
+    return scale if scale.startswith("sf") else f"sf{scale}"
+
+
+def answer_dir_for(scale: str) -> Path:
+    """Return answer directory of a data scale.
+
+    Bundled answers in ``ANSWER_DIR/<scale>`` take precedence, otherwise the
+    latest answers built by ``runner answers build`` for the scale factor are
+    used.
+    """
+    bundled = ANSWER_DIR.joinpath(scale)
+    if bundled.is_dir():
+        return bundled
+    latest = GENERATED_ANSWER_DIR.joinpath(scale_key(scale)).joinpath("latest")
+    if latest.is_file():
+        generated = latest.parent.joinpath(latest.read_text().strip())
+        if generated.is_dir():
+            return generated
+    return bundled
+
+
+def data_checksum(data_folder: Path) -> str:
+    """Return a checksum of TPC-H data files.
+
+    Data files of large scales are hundreds of GB, the checksum covers file
+    names, sizes and the first and last MB of each file.
+    """
+    digest = hashlib.sha256()
+    for table in all_tables:
+        for data_file in sorted(Path(data_folder).glob(f"{table}.*")):
+            size = data_file.stat().st_size
+            digest.update(f"{data_file.name}:{size};".encode())
+            with open(data_file, "rb") as f:
+                digest.update(f.read(CHECKSUM_SAMPLE_SIZE))
+                if size > CHECKSUM_SAMPLE_SIZE:
+                    f.seek(-CHECKSUM_SAMPLE_SIZE, os.SEEK_END)
+                    digest.update(f.read(CHECKSUM_SAMPLE_SIZE))
+    return digest.hexdigest()
+
+
+def _query_file(query: int) -> Path:
+    from .base import TPCH_Runner
+
+    custom_query = SCHEMA_BASE.joinpath("duckdb", "queries", f"q{query}.sql")
+    if custom_query.exists():
+        return custom_query
+    return TPCH_Runner.query_dir.joinpath(f"q{query}.sql")
+
+
+def _run_answer_query(db, query: int, answer_dir: Path):
+    from .base import Connection
+
+    cursor = db.cursor()
+    try:
+        sql_script = Connection.read_sql(str(_query_file(query)))
+        df: Optional[pd.DataFrame] = None
+        for stmt in sql_script.split(";"):
+            if not stmt.strip():
+                continue
+            cursor.execute(stmt)
+            # only the query returns the answer, DDL like Q15 drop view returns a
+            # status row in DuckDB
+            if re.match(r"\s*(select|with)\b", stmt, re.IGNORECASE):
+                df = cursor.df()
+    finally:
+        cursor.close()
+    if df is None:
+        raise RuntimeError(f"Query {query} returns no result set.")
+
+    fd, tmp_name = tempfile.mkstemp(dir=answer_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        df.to_csv(f, index=False)
+    os.replace(tmp_name, answer_dir.joinpath(f"{query}.csv"))
+    logger.info(f"Answer of Q{query} is built, {len(df)} rows.")
+
+
+def build_answers(
+    scale: Union[str, int],
+    data_folder: Union[str, Path],
+    jobs: Optional[int] = None,
+    force: bool = False,
+) -> Path:
+    """Compute reference answers of a scale factor with in-process DuckDB.
+
+    Answers are saved in ``GENERATED_ANSWER_DIR/sf<N>/<data checksum>`` and
+    reused as long as the data files do not change.
+
+    Args:
+        scale: scale factor of the data files.
+        data_folder: folder of generated data files.
+        jobs: number of queries to run concurrently.
+        force: rebuild answers even if they exist.
+    """
+    import duckdb
+
+    from .base import Connection, TPCH_Runner
+
+    data_dir = Path(data_folder).expanduser()
+    if not data_dir.is_dir():
+        raise FileNotFoundError(f"Data directory {data_dir} not found.")
+    queries = sorted(QUERY_ORDER[0])
+    missing = [f"q{q}.sql" for q in queries if not _query_file(q).is_file()]
+    if missing:
+        raise FileNotFoundError(
+            f"Query files {', '.join(missing)} not found in {TPCH_Runner.query_dir}."
+        )
+
+    scale_dir = GENERATED_ANSWER_DIR.joinpath(scale_key(scale))
+    answer_dir = scale_dir.joinpath(data_checksum(data_dir)[:16])
+    built = all(answer_dir.joinpath(f"{q}.csv").is_file() for q in queries)
+    if built and not force:
+        logger.info(f"Answers for {scale_key(scale)} exist in {answer_dir}.")
+    else:
+        answer_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=scale_dir, prefix=".build-") as tmp_dir:
+            db = duckdb.connect(str(Path(tmp_dir).joinpath("answers.duckdb")))
+            try:
+                for stmt in Connection.read_sql(
+                    str(SCHEMA_BASE.joinpath("duckdb", "table_schema.sql"))
+                ).split(";"):
+                    if stmt.strip():
+                        db.execute(stmt)
+                for table in all_tables:
+                    for data_file in TPCH_Runner._get_datafiles(data_dir, table):
+                        delimiter = "|" if ".tbl" in data_file.suffixes else ","
+                        db.execute(
+                            f"copy {table} from '{data_file}' (delimiter '{delimiter}')"
+                        )
+                        logger.info(f"Table {table} is loaded from {data_file}.")
+
+                with ThreadPoolExecutor(max_workers=jobs) as executor:
+                    list(
+                        executor.map(
+                            lambda q: _run_answer_query(db, q, answer_dir), queries
+                        )
+                    )
+            finally:
+                db.close()
+
+    scale_dir.joinpath("latest").write_text(answer_dir.name)
+    return answer_dir
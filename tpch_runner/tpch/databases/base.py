@@ -1,12 +1,16 @@
 import abc
+import copy
 import logging
+import re
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Any, Iterable, Optional
+from typing import Any, Callable, Iterable, NamedTuple, Optional
 
 import sqlglot
 
-from ...meta import TestResultManager, setup_database
+from ...meta import TestResultManager
 from .. import (
     QUERY_ORDER,
     RESULT_DIR,
@@ -18,6 +22,18 @@ from .. import (
     post_process,
     timeit,
 )
+from ..datafiles import DataPiece, data_size, expected_rows, table_files
+from .answers import answer_dir_for
+from .results import (
+    MONEY,
+    STRING,
+    BackgroundValidator,
+    Checksum,
+    ChecksumResult,
+    ResultDiff,
+    answer_checksums,
+    checksum_diff,
+)
 
 POWER = "power"
 THROUGHPUT = "throughput"
@@ -29,6 +45,17 @@ NUM_QUERIES = len(QUERY_ORDER[0])
 logger = logging.getLogger(__name__)
 
 
+class TableLoad(NamedTuple):
+    """Time of a table load, or of another phase over all tables."""
+
+    table: str
+    runtime: float
+    error: Optional[str] = None
+    phase: str = "load"
+    rows: Optional[int] = None
+    bytes: Optional[int] = None
+
+
 class Connection(abc.ABC):
     """Class for DBAPI connections to PostgreSQL database"""
 
@@ -57,6 +84,17 @@ class Connection(abc.ABC):
             self._connection.close()
             self._connection = None
 
+    def clone(self) -> "Connection":
+        """Return a new, not yet opened connection to the same database."""
+        return type(self)(
+            self.host,
+            self.port,
+            self.db_name,
+            self.user,
+            self.password,
+            **getattr(self, "kwargs", {}),
+        )
+
     def __enter__(self):
         """Context manager entry point."""
         self.open()
@@ -115,9 +153,14 @@ class Connection(abc.ABC):
             return self._cursor.fetchall()
         return None
 
-    def query_from_file(self, filepath) -> tuple[int, Optional[Iterable], Optional[list]]:
+    def query_from_file(
+        self, filepath, table: str = "all"
+    ) -> tuple[int, Optional[Iterable], Optional[list]]:
         """Return number of rows affected by last query or -1 if database is
         closed or executing DDL statements.
+
+        Unless ``table`` is "all", only statements on the table are run, like
+        ``CREATE INDEX ... ON <table>`` or ``ANALYZE TABLE <table>``.
         """
         if self._cursor is None:
             self.open()
@@ -134,6 +177,9 @@ class Connection(abc.ABC):
 
         raw_statements = sql_script.split(";")
         statements = [stmt.strip() for stmt in raw_statements if stmt.strip()]
+        if table != "all":
+            on_table = re.compile(rf"\b(?:on|table)\s+`?{table}\b", re.IGNORECASE)
+            statements = [stmt for stmt in statements if on_table.search(stmt)]
 
         # statements = []
         # for stmt in raw_statements:
@@ -156,14 +202,86 @@ class Connection(abc.ABC):
                     self._cursor.execute(stmt)
                 else:
                     self._cursor.execute(stmt)
-                    rset = self._cursor.fetchall()
-                    columns = [desc[0] for desc in self._cursor.description]
-                    rowcount = len(rset)
+                    # statements like ALTER TABLE return no result set
+                    if self._cursor.description:
+                        rset = self._cursor.fetchall()
+                        columns = [desc[0] for desc in self._cursor.description]
+                        rowcount = len(rset)
 
         except Exception as e:
             raise RuntimeError("Statement {} fails, exception: {}".format(stmt, e))
         return rowcount, rset, columns
 
+    def quote_identifier(self, name: str) -> str:
+        return '"{}"'.format(name.replace('"', '""'))
+
+    def text_sql(self, column_sql: str) -> str:
+        """Return SQL of the trimmed text of a column."""
+        return f"trim(cast({column_sql} as varchar))"
+
+    def hash_sql(self, text_sql: str) -> str:
+        """Return SQL of the 32-bit integer hash of a text expression, which is the
+        first 8 hex digits of its MD5 digest.
+        """
+        raise NotImplementedError(
+            f"Result checksums are not supported by {type(self).__name__}."
+        )
+
+    def checksum_sql(self, stmt: str, columns: list[str], rules: list[str]) -> str:
+        """Wrap a query into an aggregate query returning a single checksum row.
+
+        The row has the row count and a sum for each column: of text hashes for
+        string columns, of values rounded to cents for decimal columns and of the
+        values for other columns.
+        """
+        exprs = ["count(*)"]
+        for name, rule in zip(columns, rules):
+            column_sql = f"q.{self.quote_identifier(name)}"
+            if rule == STRING:
+                exprs.append(f"sum({self.hash_sql(self.text_sql(column_sql))})")
+            elif rule == MONEY:
+                exprs.append(f"sum(round(cast({column_sql} as decimal(38, 4)), 2))")
+            else:
+                exprs.append(f"sum({column_sql})")
+        return f"select {', '.join(exprs)} from ({stmt}) q"
+
+    def checksum_from_file(self, filepath, rules: list[str]) -> tuple:
+        """Run the query of a query file as a checksum query and return the
+        checksum row, so only one row is transferred from the database.
+        """
+        if self._cursor is None:
+            self.open()
+        if self._cursor is None:
+            raise RuntimeError("database has been closed")
+
+        sql_script = self.read_sql(filepath)
+        statements = [stmt.strip() for stmt in sql_script.split(";") if stmt.strip()]
+        result_stmt = max(
+            idx
+            for idx, stmt in enumerate(statements)
+            if stmt.lower().startswith(("select", "with"))
+        )
+
+        row: tuple = ()
+        try:
+            for idx, stmt in enumerate(statements):
+                if idx != result_stmt:
+                    self._cursor.execute(stmt)
+                    continue
+                # get names of result columns without running the query
+                self._cursor.execute(f"select * from ({stmt}) q limit 0")
+                columns = [desc[0] for desc in self._cursor.description]
+                self._cursor.fetchall()
+                if len(columns) != len(rules):
+                    raise ValueError(
+                        f"query returns {len(columns)} columns, answer has {len(rules)}"
+                    )
+                self._cursor.execute(self.checksum_sql(stmt, columns, rules))
+                row = self._cursor.fetchall()[0]
+        except Exception as e:
+            raise RuntimeError("Statement {} fails, exception: {}".format(stmt, e))
+        return row
+
     def commit(self) -> bool:
         if self._cursor is None:
             print("cursor not initialized")
@@ -176,23 +294,41 @@ class TPCH_Runner:
     db_type = ""
     query_dir = Path(__file__).parents[1].joinpath("queries")
     schema_dir = SCHEMA_BASE.joinpath("schema").joinpath(db_type)
+    # tables referenced by foreign keys of each table, loaded before the table,
+    # set to TABLE_DEPENDENCIES by databases creating foreign keys before load
+    foreign_keys: dict[str, tuple[str, ...]] = {}
+    # data files are read on the runner host, so they can be named pipes of dbgen
+    streams_dbgen = True
+    # constraints are added by add_constraints after loading instead of at creation
+    defers_constraints = False
+    # the database has a bulk load mode, enabled by setting bulk_load
+    supports_bulk_load = False
 
     def __init__(self, connection: Connection, db_id: int, scale: str = "small"):
         self._conn = connection
-        self.meta = TestResultManager(setup_database())
+        self.meta = TestResultManager()
         self.scale = scale
         self.db_id = db_id
 
     def create_tables(self):
         pass
 
+    def clone(self) -> "TPCH_Runner":
+        """Return a copy of the runner with a connection of its own, which the
+        caller closes.
+        """
+        runner = copy.copy(self)
+        runner._conn = self._conn.clone()
+        return runner
+
     @staticmethod
     def _get_datafile(data_folder: Path, table_name: str):
-        data_files = data_folder.glob(f"{table_name}.*")
-        first_file = next(data_files)
-        if first_file.suffix != ".csv":
-            return table_name + first_file.suffix
-        return table_name + ".csv"
+        return table_files(data_folder, table_name)[0].name
+
+    @staticmethod
+    def _get_datafiles(data_folder: Path, table_name: str) -> list[Path]:
+        """Return the data file or the shard set of a table."""
+        return table_files(data_folder, table_name)
 
     def load_single_table(
         self,
@@ -200,26 +336,130 @@ class TPCH_Runner:
         line_terminator: Optional[str] = None,
         data_folder: str = str(SMALL_DATA_DIR),
         delimiter: str = ",",
+        split: int = 1,
     ):
         pass
 
+    def _load_pieces(
+        self,
+        table: str,
+        pieces: list[DataPiece],
+        load_piece: Callable[[Connection, DataPiece], Any],
+        split: int = 1,
+    ):
+        """Load pieces of a table's data concurrently, each piece on a connection
+        of its own and committed separately.
+
+        Up to ``split`` pieces are loaded at a time, so a table opens at most
+        ``split`` connections however many shards it has.
+        """
+
+        def load(piece: DataPiece):
+            conn = self._conn.clone()
+            try:
+                conn.open()
+                load_piece(conn, piece)
+                conn.commit()
+            finally:
+                conn.close()
+
+        workers = min(len(pieces), split)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(load, pieces))
+        logger.info(f"Table {table} is loaded in {len(pieces)} pieces.")
+
+    def verify_rows(
+        self, scale: Optional[str] = None, counts: Optional[dict[str, int]] = None
+    ) -> list[tuple[str, int, int]]:
+        """Return tables whose row count differs from the TPC-H row count of the
+        scale factor, as (table, rows, expected rows).
+
+        Row counts of all tables are queried unless ``counts`` are given.
+        """
+        scale = scale or self.scale
+        mismatches = []
+        for table, rows in (counts or self.count_rows("all")).items():
+            expected = expected_rows(table, scale)
+            if expected is None:
+                logger.info(f"Row count of {table} at scale {scale} is unknown.")
+            elif rows != expected:
+                mismatches.append((table, rows, expected))
+        return mismatches
+
+    def _load_table(
+        self, table: str, data_folder: str, delimiter: str, split: int = 1
+    ) -> TableLoad:
+        """Load a table on a connection of its own and time it."""
+        loader = self.clone()
+        size = data_size(data_folder, table)
+        start = time.perf_counter()
+        try:
+            loader.load_single_table(
+                table, data_folder=data_folder, delimiter=delimiter, split=split
+            )
+        except Exception as e:
+            runtime = round(time.perf_counter() - start, 4)
+            return TableLoad(table, runtime, str(e), bytes=size)
+        finally:
+            loader._conn.close()
+        return TableLoad(table, round(time.perf_counter() - start, 4), bytes=size)
+
+    def _load_order(self, tables: list[str], data_folder: str) -> list[str]:
+        """Return tables with the largest data files first, so the longest loads
+        do not start last.
+        """
+
+        def size(table: str) -> int:
+            return sum(f.stat().st_size for f in Path(data_folder).glob(f"{table}.*"))
+
+        return sorted(tables, key=size, reverse=True)
+
     @timeit
     def load_data(
         self,
         table: str = "all",
         data_folder: str = str(SMALL_DATA_DIR),
         delimiter: str = ",",
-    ):
+        jobs: int = 1,
+        split: int = 1,
+    ) -> list[TableLoad]:
+        """Load tables, ``jobs`` tables at a time with one connection each.
+
+        A table starts loading after the tables its foreign keys reference,
+        see ``foreign_keys``. Large data files are loaded in up to ``split``
+        byte ranges concurrently by databases supporting it. Return load time
+        of each table.
+        """
         if table != "all" and table not in all_tables:
             raise ValueError(f"Invalid table name {table}.")
-        elif table != "all":
-            self.load_single_table(table, data_folder=data_folder, delimiter=delimiter)
-        else:
-            for tbl in all_tables:
-                print("table:", table)
-                self.load_single_table(tbl, data_folder=data_folder, delimiter=delimiter)
-            print()
-            logger.info("All tables finish loading.")
+        tables = all_tables if table == "all" else [table]
+        pending = self._load_order(tables, data_folder)
+        loads: list[TableLoad] = []
+        running: dict[Future, str] = {}
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            while pending or running:
+                loaded = {load.table for load in loads}
+                for tbl in list(pending):
+                    if len(running) >= jobs:
+                        break
+                    waits_for = set(self.foreign_keys.get(tbl, ())) & set(tables)
+                    if waits_for <= loaded:
+                        pending.remove(tbl)
+                        future = executor.submit(
+                            self._load_table, tbl, data_folder, delimiter, split
+                        )
+                        running[future] = tbl
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    running.pop(future)
+                    load = future.result()
+                    loads.append(load)
+                    if load.error:
+                        logger.error(f"Table {load.table} fails to load: {load.error}")
+                    else:
+                        logger.info(f"Table {load.table} is loaded in {load.runtime}s.")
+        logger.info("All tables finish loading.")
+        return loads
 
     def truncate_table(self, table: str = "all"):
         try:
@@ -250,6 +490,13 @@ class TPCH_Runner:
             return
         logger.info(f"Table {table} are dropped.")
 
+    def _query_file(self, query_index: int) -> str:
+        """Return the query file of a query, custom queries of the database first."""
+        custom_query_folder = self.schema_dir.joinpath("queries")
+        if custom_query_folder.joinpath(f"q{query_index}.sql").exists():
+            return f"{custom_query_folder}/q{query_index}.sql"
+        return f"{self.query_dir}/q{query_index}.sql"
+
     @post_process
     @timeit
     def run_query(
@@ -277,11 +524,7 @@ class TPCH_Runner:
         )
         try:
             with self._conn as conn:
-                custom_query_folder = self.schema_dir.joinpath("queries")
-                if not custom_query_folder.joinpath(f"q{query_index}.sql").exists():
-                    query_file = f"{self.query_dir}/q{query_index}.sql"
-                else:
-                    query_file = f"{custom_query_folder}/q{query_index}.sql"
+                query_file = self._query_file(query_index)
                 rowcount, rset, columns = conn.query_from_file(query_file)
                 print(f"\nQ{query_index} succeeds, return {rowcount} rows.")
             result = Result(
@@ -296,30 +539,77 @@ class TPCH_Runner:
             print(f"Query execution fails, exception: {e}", file=sys.stderr)
         return Result(False, -1, None, None, None), 0, _internal_args
 
-    def power_test(self, no_report: bool = False):
-        """Run TPC-H power test."""
+    def _record_validations(
+        self, outcomes: list, result_folder: str, no_report: bool
+    ) -> list[int]:
+        """Log and save outcomes of background validations, return failed queries."""
+        failed = []
+        for query, outcome in outcomes:
+            valid = isinstance(outcome, ResultDiff) and outcome.ok
+            if valid:
+                logger.info(f"Compare {query}.csv: Good.")
+            else:
+                failed.append(query)
+                reason = outcome.summary() if isinstance(outcome, ResultDiff) else outcome
+                logger.error(
+                    f"Query {query} result is not matched against answer: {reason}"
+                )
+            if not no_report:
+                self.meta.set_result_validity(result_folder, f"q{query}", valid)
+        return failed
+
+    def power_test(
+        self, no_report: bool = False, validate: bool = False, fail_fast: bool = False
+    ):
+        """Run TPC-H power test.
+
+        Args:
+            no_report: do not save test results.
+            validate: validate query results against answers while the test runs.
+            fail_fast: abort the test as soon as a query result is found wrong,
+                implies validate.
+        """
         results = {}
         total_time = 0
         success = True
+        validator = BackgroundValidator(self.scale) if validate or fail_fast else None
+        failed_queries: list[int] = []
 
         test_time, result_folder = self.meta.add_powertest(
             db_id=self.db_id, db_type=self.db_type, scale=self.scale, no_report=no_report
         )
         result_dir = RESULT_DIR.joinpath(result_folder)
-        logger.info(f"Test result will be saved in: {result_dir}")
-        result_dir.mkdir(exist_ok=True)
+        logger.info(f"Test results will be saved as test: {result_folder}")
         print()
         logger.info(f"Power test start at {test_time.strftime('%Y-%m-%d %H:%M:%S')}")
 
         result: Result
         for _query_idx in QUERY_ORDER[0]:
             result, runtime, _ = self.run_query(_query_idx, result_dir, no_report)
-            (query_success, rowcount, rset, _, _) = result
+            query_success, rowcount, rset, columns, _ = result
             results[_query_idx] = {"rows": rowcount, "result": rset, "time": runtime}
             total_time += runtime
             if query_success is False:
                 success = False
 
+            if validator is None:
+                continue
+            if query_success:
+                validator.submit(_query_idx, rset, columns)
+            failed_queries += self._record_validations(
+                validator.poll(), result_folder, no_report
+            )
+            if fail_fast and validator.failed.is_set():
+                logger.error("Wrong query result found, Powertest is aborted.")
+                break
+
+        if validator is not None:
+            failed_queries += self._record_validations(
+                validator.close(), result_folder, no_report
+            )
+            if failed_queries:
+                success = False
+
         if not no_report:
             self.meta.update_powertest(
                 result_folder=str(result_dir.stem), success=success, runtime=total_time
@@ -333,10 +623,71 @@ class TPCH_Runner:
         )
         return results
 
-    def after_load(self, reindex: bool = False):
+    def checksum_test(self, queries: Optional[list[int]] = None) -> list[ChecksumResult]:
+        """Validate query results by checksums computed in the database.
+
+        Each query is wrapped as an aggregate checksum query, only one row per
+        query is transferred and compared with the checksum of its answer.
+
+        Args:
+            queries: queries to validate, default all queries in Powertest order.
+        """
+        answers = answer_checksums(answer_dir_for(self.scale))
+        self._conn.hash_sql("''")  # fail early if the database is not supported
+
+        results = []
+        for query_index in queries or QUERY_ORDER[0]:
+            answer = answers[query_index]
+            start_time = time.time()
+            reason: Optional[str]
+            try:
+                with self._conn as conn:
+                    row = conn.checksum_from_file(
+                        self._query_file(query_index), answer.rules
+                    )
+                reason = checksum_diff(Checksum.from_row(row, answer.rules), answer)
+            except Exception as e:
+                reason = str(e)
+            runtime = round(time.time() - start_time, 4)
+            results.append(ChecksumResult(query_index, reason is None, reason, runtime))
+            if reason is None:
+                logger.info(f"Q{query_index} checksum matches answer.")
+            else:
+                logger.error(f"Q{query_index} checksum does not match answer: {reason}")
+        return results
+
+    def add_constraints(self, table: str = "all"):
         pass
 
-    def before_load(self, reindex: bool = False):
+    def create_indexes(self, table: str = "all"):
+        pass
+
+    def analyze(self, table: str = "all"):
+        pass
+
+    def run_phase(
+        self, phase: str, func: Callable[[str], Any], table: str = "all"
+    ) -> TableLoad:
+        """Run a phase over a table or all tables and time it, errors are raised."""
+        start = time.perf_counter()
+        func(table)
+        runtime = round(time.perf_counter() - start, 4)
+        logger.info(f"Phase {phase} of {table} tables finishes in {runtime}s.")
+        return TableLoad(table, runtime, phase=phase)
+
+    def after_load(self, reindex: bool = False, table: str = "all") -> list[TableLoad]:
+        """Add deferred constraints, create indexes if ``reindex`` and analyze a
+        table or all tables after data loading, return time of each phase.
+        """
+        phases = []
+        if self.defers_constraints:
+            phases.append(self.run_phase("constraints", self.add_constraints, table))
+        if reindex:
+            phases.append(self.run_phase("index", self.create_indexes, table))
+        phases.append(self.run_phase("analyze", self.analyze, table))
+        return phases
+
+    def before_load(self, reindex: bool = False, table: str = "all"):
         pass
 
     def count_rows(self, table_name: str):
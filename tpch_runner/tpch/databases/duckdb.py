@@ -1,12 +1,15 @@
 """Module for MySQL database TPC-H benchmark runner."""
 
 import logging
-import sys
+import re
+import time
 from pathlib import Path
 
 import duckdb
 
+from ...config import Config
 from .. import SCHEMA_BASE, SMALL_DATA_DIR, all_tables, timeit
+from ..datafiles import data_size
 from . import base
 
 SCHEMA_DIR = SCHEMA_BASE.joinpath("schema/duckdb")
@@ -25,16 +28,40 @@ class DuckLDB(base.Connection):
         super().__init__(None, None, None, None, None)
         self.kwargs = kwargs
         self.db_file = db_file
-        self._connection = duckdb.connect(db_file)
+        self._connection = self._connect()
+
+    def _connect(self) -> duckdb.DuckDBPyConnection:
+        """Connect and apply ``Config.duckdb_threads`` and
+        ``Config.duckdb_memory_limit`` if they are set.
+        """
+        connection = duckdb.connect(self.db_file)
+        if Config.duckdb_threads:
+            connection.execute(f"set threads = {int(Config.duckdb_threads)}")
+        if Config.duckdb_memory_limit:
+            connection.execute(f"set memory_limit = '{Config.duckdb_memory_limit}'")
+        return connection
 
     def open(self):
         """Overload base connection open() with MySQL driver."""
         if self._connection is None:
-            self._connection = duckdb.connect(self.db_file)
+            self._connection = self._connect()
         if self._cursor is None:
             self._cursor = self._connection.cursor()
         return self._connection
 
+    def clone(self) -> "DuckLDB":
+        """Return a new connection to the same database file, connections of a
+        process share one database instance.
+        """
+        return type(self)(**self.kwargs)
+
+    def hash_sql(self, text_sql: str) -> str:
+        return f"('0x' || substr(md5({text_sql}), 1, 8))::bigint"
+
+
+def _sql_list(files: list[Path]) -> str:
+    return "[" + ", ".join(f"'{f}'" for f in files) + "]"
+
 
 class Duckdb_TPCH(base.TPCH_Runner):
     db_type = "duckdb"
@@ -56,37 +83,105 @@ class Duckdb_TPCH(base.TPCH_Runner):
             conn.commit()
             print("TPC-H tables are created.")
 
+    @staticmethod
+    def _parquet_files(data_folder: str, table: str) -> list[Path]:
+        """Return Parquet files of a table, a folder like ``lineitem/`` of Parquet
+        files, or ``lineitem.parquet`` and ``lineitem.<N>.parquet`` files.
+        """
+        folder = Path(data_folder)
+        if folder.joinpath(table).is_dir():
+            return sorted(folder.joinpath(table).glob("*.parquet"))
+        return sorted(
+            f
+            for f in folder.glob(f"{table}.*parquet")
+            if re.fullmatch(rf"{table}(\.\d+)?\.parquet", f.name)
+        )
+
+    @staticmethod
+    def _sources(data_folder: str, table: str) -> list[list[Path]]:
+        """Return groups of data files of a table which are read in one go. Named
+        pipes of a shard set are read one by one, as dbgen writes them at the same
+        time. DuckDB decompresses ``.gz`` and ``.zst`` data files itself.
+        """
+        files = Duckdb_TPCH._get_datafiles(Path(data_folder), table)
+        if files[0].is_fifo():
+            return [[f] for f in files]
+        return [files]
+
+    def _column_types(self, conn: DuckLDB, table: str) -> str:
+        conn.query(
+            "select column_name, data_type from information_schema.columns "
+            f"where table_name = '{table}' order by ordinal_position"
+        )
+        columns = conn.fetch() or []
+        return "{" + ", ".join(f"'{name}': '{type_}'" for name, type_ in columns) + "}"
+
+    def _ingest(self, conn: DuckLDB, table: str, data_folder: str, delimiter: str):
+        """Insert data of a table from Parquet files if the data folder has any,
+        from its data files otherwise.
+
+        Data files are read by ``read_csv`` in parallel with the column types of
+        the table, so nothing is sniffed. Lines ending with the delimiter, like
+        in raw dbgen output, are read as they are.
+        """
+        parquet_files = self._parquet_files(data_folder, table)
+        if parquet_files:
+            conn.query(
+                f"insert into {table} by name "
+                f"select * from read_parquet({_sql_list(parquet_files)})"
+            )
+            return
+        columns = self._column_types(conn, table)
+        for files in self._sources(data_folder, table):
+            conn.query(
+                f"insert into {table} select * from read_csv({_sql_list(files)}, "
+                f"delim = '{delimiter}', header = false, columns = {columns}, "
+                "auto_detect = false, parallel = true)"
+            )
+
     @timeit
     def load_single_table(
         self,
         table: str,
         delimiter: str = ",",
         data_folder: str = str(SMALL_DATA_DIR),
+        split: int = 1,
     ):
-        """Load test data into TPC-H tables."""
-        data_file = Path(data_folder).joinpath(
-            self._get_datafile(Path(data_folder), table)
-        )
-        load_command = (
-            "copy {} from '{}' with (delimiter '{}', auto_detect=false)".format(
-                table, data_file, delimiter
-            )
-        )
-        try:
-            with self._conn as conn:
-                conn.query(load_command)
-            print(table)
-        except Exception as e:
-            print(f"Load data fails, exception: {e}", file=sys.stderr)
+        """Load test data into TPC-H tables.
+
+        DuckDB reads a data file with all threads already, ``split`` is not used.
+        """
+        with self._conn as conn:
+            self._ingest(conn, table, data_folder, delimiter)
+        print(table)
 
     @timeit
-    def load_data(self, data_folder: str = str(SMALL_DATA_DIR), delimiter=","):
+    def load_data(
+        self,
+        table: str = "all",
+        data_folder: str = str(SMALL_DATA_DIR),
+        delimiter: str = ",",
+        jobs: int = 1,
+        split: int = 1,
+    ) -> list[base.TableLoad]:
+        """Load tables one by one, DuckDB reads each table with all threads so
+        ``jobs`` and ``split`` are not used. Return load time of each table, a
+        table failing to load does not stop the others.
+        """
+        if table != "all" and table not in all_tables:
+            raise ValueError(f"Invalid table name {table}.")
+        loads = []
         with self._conn as conn:
-            for table in all_tables:
-                print("table:", table)
-                data_file = Path(data_folder).joinpath(
-                    self._get_datafile(Path(data_folder), table)
-                )
-                conn.query(
-                    f"copy {table} from '{str(data_file)}' delimiter '{delimiter}'"
-                )
+            for tbl in all_tables if table == "all" else [table]:
+                print("table:", tbl)
+                size = data_size(data_folder, tbl)
+                error = None
+                start = time.perf_counter()
+                try:
+                    self._ingest(conn, tbl, data_folder, delimiter)
+                except Exception as e:
+                    error = str(e)
+                    logger.error(f"Table {tbl} fails to load: {error}")
+                runtime = round(time.perf_counter() - start, 4)
+                loads.append(base.TableLoad(tbl, runtime, error, bytes=size))
+        return loads
@@ -1,13 +1,24 @@
 """Module for MySQL database TPC-H benchmark runner."""
 
 import logging
+import os
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
 import pymysql
 
-from .. import SCHEMA_BASE, SMALL_DATA_DIR, timeit
+from ...config import Config
+from .. import SCHEMA_BASE, SMALL_DATA_DIR, all_tables, timeit
+from ..datafiles import (
+    DataPiece,
+    compression_of,
+    has_trailing_delimiter,
+    plan_pieces,
+    range_fifo,
+)
 from . import base
 
 logger = logging.getLogger(__name__)
@@ -19,6 +30,8 @@ class MySQLDB(base.Connection):
     def __init__(self, host, port, db_name, user, password, **kwargs):
         super().__init__(host, port, db_name, user, password)
         self.kwargs = kwargs
+        # session variables set whenever the connection is opened
+        self.session: dict[str, Any] = {}
 
     def open(self):
         """Overload base connection open() with MySQL driver."""
@@ -33,8 +46,31 @@ class MySQLDB(base.Connection):
                 **self.kwargs,
             )
             self._cursor = self._connection.cursor()
+            self._set_session()
         return self._connection
 
+    def _set_session(self):
+        for name, value in self.session.items():
+            try:
+                self._cursor.execute(f"set session {name} = {value}")  # type: ignore
+            except pymysql.MySQLError as e:
+                logger.warning(f"Session variable {name} is not set: {e}")
+
+    def clone(self) -> "MySQLDB":
+        """Return a new connection with the same session variables."""
+        conn = super().clone()
+        conn.session = dict(self.session)  # type: ignore
+        return conn  # type: ignore
+
+    def quote_identifier(self, name: str) -> str:
+        return "`{}`".format(name.replace("`", "``"))
+
+    def text_sql(self, column_sql: str) -> str:
+        return f"trim(cast({column_sql} as char))"
+
+    def hash_sql(self, text_sql: str) -> str:
+        return f"cast(conv(substr(md5({text_sql}), 1, 8), 16, 10) as unsigned)"
+
     def _index_exists(self) -> Optional[bool]:
         """Return True if there are any IDX indexes exist, return None if no
         database connection.
@@ -47,13 +83,27 @@ class MySQLDB(base.Connection):
         idx_indexes = """
             SELECT distinct(INDEX_NAME)
             FROM INFORMATION_SCHEMA.STATISTICS
-            WHERE TABLE_SCHEMA = 'tpch' AND INDEX_NAME LIKE 'IDX%';
+            WHERE TABLE_SCHEMA = DATABASE() AND INDEX_NAME LIKE 'IDX%';
         """
         rowcount = self._cursor.execute(idx_indexes)
         logger.debug(f"existing IDX indexes: {rowcount}.\n")
         return rowcount > 0
 
 
+def index_definitions(sql_file: str) -> dict[str, list[tuple[str, str]]]:
+    """Return names and columns of the indexes a ``CREATE INDEX`` script creates,
+    by table.
+    """
+    indexes: dict[str, list[tuple[str, str]]] = {}
+    for name, table, columns in re.findall(
+        r"create\s+index\s+(\w+)\s+on\s+`?(\w+)`?\s*\(([^)]*)\)",
+        base.Connection.read_sql(sql_file),
+        flags=re.IGNORECASE,
+    ):
+        indexes.setdefault(table.lower(), []).append((name, columns.strip()))
+    return indexes
+
+
 class MySQL_TPCH(base.TPCH_Runner):
     db_type = "mysql"
     schema_dir = SCHEMA_BASE.joinpath("mysql")
@@ -82,81 +132,124 @@ class MySQL_TPCH(base.TPCH_Runner):
         line_terminator: Optional[str] = None,
         delimiter: str = ",",
         data_folder: str = str(SMALL_DATA_DIR),
+        split: int = 1,
     ):
-        """Load test data into TPC-H tables."""
-        data_file = Path(data_folder).joinpath(
-            self._get_datafile(Path(data_folder), table)
-        )
-        load_command = f"""
-            load data local infile '{data_file}' into table {table}
-            fields terminated by '{delimiter}'
+        """Load test data into TPC-H tables.
+
+        Shards of a shard set are loaded ``split`` at a time, a large single data
+        file is loaded in up to ``split`` byte ranges concurrently, each range is
+        read by ``LOAD DATA`` from a named pipe. Compressed data files are
+        decompressed into a named pipe too. Lines ending with the delimiter, like
+        in raw dbgen output, are loaded with the delimiter as part of the line
+        terminator, or stripped while relayed if the data file is a named pipe.
         """
-        if line_terminator:
-            load_command = load_command + f" lines terminated by '{line_terminator}'"
-        try:
-            with self._conn as conn:
-                rowcount = conn.query(load_command)
-                conn.commit()
-            print(f"{table}: {rowcount} rows")
-        except Exception as e:
-            print(f"Load data fails, exception: {e}", file=sys.stderr)
 
-    def before_load(self, reindex: bool = False):
+        def load_command(infile, terminator: Optional[str]) -> str:
+            command = f"""
+                load data local infile '{infile}' into table {table}
+                fields terminated by '{delimiter}'
+            """
+            if terminator:
+                command = command + f" lines terminated by '{terminator}'"
+            return command
+
+        def load_piece(conn: MySQLDB, piece: DataPiece) -> int:
+            trailing = has_trailing_delimiter(piece.path, delimiter)
+            terminator = line_terminator or (f"{delimiter}\\n" if trailing else None)
+            if (
+                piece.byte_range is None
+                and trailing is not None
+                and not compression_of(piece.path)
+            ):
+                return conn.query(load_command(piece.path, terminator))
+            with range_fifo(
+                piece.path,
+                piece.byte_range,
+                strip_delimiter=delimiter if trailing is None else None,
+            ) as fifo:
+                return conn.query(load_command(fifo, terminator))
+
+        files = self._get_datafiles(Path(data_folder), table)
+        pieces = plan_pieces(files, split)
+        if len(pieces) > 1:
+            self._load_pieces(table, pieces, load_piece, split)
+            return
         with self._conn as conn:
-            try:
-                conn.query("set autocommit = 0;")
-                conn.query("set unique_checks = 0;")
-                conn.query("set foreign_key_checks = 0;")
-                conn.query("set sql_log_bin = 0;")
-                if reindex:
-                    self.drop_indexes()
-            except Exception as e:
-                logger.error("You don't have permission to run priliged commands.")
-                logger.error(f"Exception: {e}")
-                return
+            rowcount = load_piece(conn, pieces[0])
+            conn.commit()
+        print(f"{table}: {rowcount} rows")
 
-    @timeit
-    def after_load(self, reindex: bool = False):
-        """Create indexes and analyze, optimize tables after data loading.
+    def before_load(self, reindex: bool = False, table: str = "all"):
+        """Set ``Config.mysql_load_session`` on the connections loading data,
+        each worker connection is opened with it, and drop IDX indexes if
+        ``reindex``.
+        """
+        self._conn.session = dict(Config.mysql_load_session)
+        if reindex:
+            self.drop_indexes(table)
 
-        Parameters:
-            bypass: skip create idx indexes and continue operations even if
-            found IDX indexes exist.
+    def after_load(
+        self, reindex: bool = False, table: str = "all"
+    ) -> list[base.TableLoad]:
+        """Restore session settings, create indexes if ``reindex`` and analyze,
+        optimize tables after data loading.
         """
-        with self._conn as conn:
-            try:
-                conn.query("set autocommit = 1;")
-                conn.query("set unique_checks = 1;")
-                conn.query("set foreign_key_checks = 1;")
-                conn.query("set sql_log_bin = 1;")
-            except Exception as e:
-                logger.error("You don't have permission to run priliged commands.")
-                logger.error(f"Exception: {e}")
-                return
-
-            if reindex:
-                idx_check_result = conn._index_exists()
-                if idx_check_result is False:
-                    print(
-                        "There are IDX indexes exist, remove them first.", file=sys.stderr
-                    )
-                    self.drop_indexes()
-                logger.info("Create indexes")
-                conn.query_from_file(f"{self.schema_dir}/mysql_index.sql")
-                conn.commit()
+        self._conn.session = {}
+        return super().after_load(reindex, table)
 
-            logger.info("Analyze database")
-            conn.query_from_file(f"{self.schema_dir}/after-load.sql")
+    def _add_indexes(self, table: str, indexes: list[tuple[str, str]]):
+        """Build all IDX indexes of a table in one ``ALTER TABLE``, so the table
+        is rebuilt once instead of once per index.
+        """
+        conn = self._conn.clone()
+        try:
+            conn.open()
+            conn.query(
+                f"alter table {table} "
+                + ", ".join(f"add index {name} ({columns})" for name, columns in indexes)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        logger.info(f"Indexes of {table} are created.")
+
+    def create_indexes(self, table: str = "all"):
+        """Create IDX indexes of a table or all tables, existing ones are dropped
+        first. Tables are indexed concurrently, each on a connection of its own.
+        """
+        if table == "all":
+            with self._conn as conn:
+                idx_exists = conn._index_exists()
+            if idx_exists:
+                print("There are IDX indexes exist, remove them first.", file=sys.stderr)
+                self.drop_indexes()
+        else:
+            self.drop_indexes(table)
+        indexes = index_definitions(f"{self.schema_dir}/mysql_index.sql")
+        tables = [tbl for tbl in all_tables if tbl in indexes and table in ("all", tbl)]
+        if not tables:
+            return
+        logger.info(f"Create indexes of {table} tables")
+        workers = min(len(tables), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda tbl: self._add_indexes(tbl, indexes[tbl]), tables))
+
+    def analyze(self, table: str = "all"):
+        with self._conn as conn:
+            logger.info(f"Analyze {table} tables")
+            conn.query_from_file(f"{self.schema_dir}/after-load.sql", table)
 
     @timeit
-    def drop_indexes(self):
-        """Drop all IDX (non-primary key) indexes."""
+    def drop_indexes(self, table: str = "all"):
+        """Drop IDX (non-primary key) indexes of a table or all tables."""
         drop_commands = """
             SELECT distinct(CONCAT('DROP INDEX ', INDEX_NAME, ' ON ', TABLE_NAME, ';'))
             FROM INFORMATION_SCHEMA.STATISTICS
-            WHERE TABLE_SCHEMA = 'tpch'
-              AND INDEX_NAME LIKE 'IDX%';
+            WHERE TABLE_SCHEMA = DATABASE()
+              AND INDEX_NAME LIKE 'IDX%'
         """
+        if table != "all":
+            drop_commands += f" AND TABLE_NAME = '{table}'"
         try:
             print("\nCheck if there is any indexes exist.")
             with self._conn as conn:
@@ -1,12 +1,15 @@
 """Module for PostgreSQL database TPC-H benchmark runner."""
 
 import logging
-import sys
+import re
 from pathlib import Path
+from typing import Optional
 
 import psycopg2
 
+from ...config import Config
 from .. import SCHEMA_BASE, SMALL_DATA_DIR, all_tables, timeit
+from ..datafiles import STREAM_BLOCK_SIZE, ByteRange, open_range, plan_pieces
 from . import base
 
 logger = logging.getLogger(__name__)
@@ -33,19 +36,37 @@ class PGDB(base.Connection):
             self._cursor = self._connection.cursor()
         return self._connection
 
-    def copyFrom(self, filepath, separator, table) -> int:
-        """Return number of rows successfully copied into the target table."""
+    def hash_sql(self, text_sql: str) -> str:
+        return f"('x' || substr(md5({text_sql}), 1, 8))::bit(32)::bigint"
+
+    def copyFrom(
+        self,
+        filepath,
+        separator,
+        table,
+        byte_range: Optional[ByteRange] = None,
+        freeze: bool = False,
+    ) -> int:
+        """Return number of rows successfully copied into the target table.
+
+        Only the lines in ``byte_range`` are copied if it is given. A separator
+        ending each line, like in raw dbgen output, is stripped while copying.
+        With ``freeze``, rows are written frozen, the table must be created or
+        truncated in the current transaction.
+        """
         if self._cursor is None:
             self.open()
         if self._cursor is None:
             logger.error("database has been closed")
             return -1
 
-        logger.info(f"Load table {table} from {filepath}.")
-        with open(filepath, "r") as in_file:
+        logger.info(f"Load table {table} from {filepath}, range {byte_range}.")
+        with open_range(filepath, byte_range, strip_delimiter=separator) as in_file:
             self._cursor.copy_expert(
-                f"COPY {table} FROM STDIN WITH (format CSV, delimiter ',',  QUOTE '\"')",  # noqa
+                f"COPY {table} FROM STDIN WITH (format CSV, delimiter '{separator}', "
+                f"QUOTE '\"'{', FREEZE true' if freeze else ''})",
                 in_file,
+                size=STREAM_BLOCK_SIZE,
             )
         return self._cursor.rowcount
 
@@ -53,67 +74,135 @@ class PGDB(base.Connection):
 class PG_TPCH(base.TPCH_Runner):
     db_type = "pg"
     schema_dir = SCHEMA_BASE.joinpath("pg")
+    supports_bulk_load = True
 
     def __init__(self, connection: PGDB, db_id: int, scale: str = "small"):
         super().__init__(connection, db_id, scale),
         self._conn = connection
         self.db_id = db_id
+        self.bulk_load = Config.pg_bulk_load
+
+    @property
+    def defers_constraints(self) -> bool:  # type: ignore[override]
+        return self.bulk_load
+
+    @staticmethod
+    def _primary_key(conn: PGDB, table: str) -> Optional[str]:
+        conn.query(
+            "select conname from pg_constraint "
+            f"where conrelid = '{table}'::regclass and contype = 'p'"
+        )
+        rows = conn.fetch()
+        return rows[0][0] if rows else None
+
+    @staticmethod
+    def _tune_session(conn: PGDB):
+        conn.query(f"set maintenance_work_mem = '{Config.pg_maintenance_work_mem}'")
 
     @timeit
     def create_tables(self):
         """Create TPC-H tables.
 
+        In bulk load mode, tables are created unlogged and their primary keys
+        are added by ``add_constraints`` after loading.
+
         Note: this method requires an active DB connection.
         """
         with self._conn as conn:
             print("Create tables")
-            conn.query_from_file(f"{self.schema_dir}/table_schema.sql")
-            print("Add primary keys")
-            conn.query_from_file(f"{self.schema_dir}/pg_constraints.sql")
+            if self.bulk_load:
+                sql_script = conn.read_sql(f"{self.schema_dir}/table_schema.sql")
+                for stmt in sql_script.split(";"):
+                    if stmt.strip():
+                        conn.query(
+                            re.sub(
+                                r"^\s*create\s+table\b",
+                                "CREATE UNLOGGED TABLE",
+                                stmt,
+                                flags=re.IGNORECASE,
+                            )
+                        )
+            else:
+                conn.query_from_file(f"{self.schema_dir}/table_schema.sql")
+                print("Add primary keys")
+                conn.query_from_file(f"{self.schema_dir}/pg_constraints.sql")
             conn.commit()
         print("TPC-H tables are created.")
 
+    def before_load(self, reindex: bool = False, table: str = "all"):
+        """In bulk load mode, empty tables, drop their primary keys and make
+        them unlogged, so tables are reloaded as fast as new ones are loaded.
+        """
+        if not self.bulk_load:
+            return
+        with self._conn as conn:
+            for tbl in all_tables if table == "all" else [table]:
+                conn.query(f"truncate {tbl}")
+                primary_key = self._primary_key(conn, tbl)
+                if primary_key:
+                    conn.query(f"alter table {tbl} drop constraint {primary_key}")
+                conn.query(f"alter table {tbl} set unlogged")
+            conn.commit()
+
     @timeit
     def load_single_table(
         self,
         table: str,
         data_folder: str = str(SMALL_DATA_DIR),
         delimiter: str = ",",
+        split: int = 1,
     ):
-        """Load test data into TPC-H tables."""
-        data_file = Path(data_folder).joinpath(
-            self._get_datafile(Path(data_folder), table)
-        )
-        try:
-            with self._conn as conn:
-                conn.copyFrom(data_file, delimiter, table)
-                conn.commit()
-        except Exception as e:
-            print(f"Load data fails, exception: {e}", file=sys.stderr)
+        """Load test data into TPC-H tables.
 
-    @timeit
-    def load_data(
-        self,
-        table: str = "all",
-        data_folder: str = str(SMALL_DATA_DIR),
-        delimiter: str = ",",
-    ):
-        if table != "all" and table not in all_tables:
-            raise ValueError(f"Invalid table name {table}.")
-        elif table != "all":
-            self.load_single_table(table, data_folder=data_folder, delimiter=delimiter)
-        else:
-            for tbl in all_tables:
-                self.load_single_table(tbl, data_folder=data_folder, delimiter=delimiter)
-            print("All tables finish loading.")
+        Shards of a shard set are copied ``split`` at a time, a large single data
+        file is copied in up to ``split`` byte ranges concurrently. In bulk load mode
+        the table is emptied first, a data file loaded in one piece is copied
+        with FREEZE in the transaction truncating the table.
+        """
+        files = self._get_datafiles(Path(data_folder), table)
+        pieces = plan_pieces(files, split)
+        if len(pieces) > 1:
+            if self.bulk_load:
+                with self._conn as conn:
+                    conn.query(f"truncate {table}")
+                    conn.commit()
+            self._load_pieces(
+                table,
+                pieces,
+                lambda conn, piece: conn.copyFrom(
+                    piece.path, delimiter, table, byte_range=piece.byte_range
+                ),
+                split,
+            )
+            return
+        with self._conn as conn:
+            if self.bulk_load:
+                conn.query(f"truncate {table}")
+            conn.copyFrom(files[0], delimiter, table, freeze=self.bulk_load)
+            conn.commit()
 
-    @timeit
-    def after_load(self, reindex: bool = False):
+    def add_constraints(self, table: str = "all"):
+        """Add primary keys deferred by bulk loading and make tables logged."""
+        if not self.bulk_load:
+            return
         with self._conn as conn:
-            if reindex:
-                print("Create indexes.")
-                conn.query_from_file(f"{self.schema_dir}/pg_index.sql")
-                conn.commit()
+            self._tune_session(conn)
+            for tbl in all_tables if table == "all" else [table]:
+                if self._primary_key(conn, tbl) is None:
+                    logger.info(f"Add primary key of {tbl}.")
+                    conn.query_from_file(f"{self.schema_dir}/pg_constraints.sql", tbl)
+                conn.query(f"alter table {tbl} set logged")
+            conn.commit()
 
-            print("\nAnalyze database")
-            conn.query("analyze")
+    def create_indexes(self, table: str = "all"):
+        with self._conn as conn:
+            self._tune_session(conn)
+            logger.info(f"Create indexes of {table} tables.")
+            conn.query_from_file(f"{self.schema_dir}/pg_index.sql", table)
+            conn.commit()
+
+    def analyze(self, table: str = "all"):
+        with self._conn as conn:
+            logger.info(f"Analyze {table} tables.")
+            conn.query("analyze" if table == "all" else f"analyze {table}")
+            conn.commit()
@@ -1,13 +1,15 @@
 """Module for RapidsDB database TPC-H benchmark runner."""
 
 import logging
-import sys
+import re
 from pathlib import Path
 from typing import Iterable, Optional, Union
 
 from pyrdpdb import pyrdp  # type: ignore
 
-from .. import SCHEMA_BASE, SMALL_DATA_DIR, timeit
+from ...config import Config
+from .. import SCHEMA_BASE, SMALL_DATA_DIR, all_tables, timeit
+from ..datafiles import DataPiece
 from . import base
 from .parser import add_schema_to_table_names
 
@@ -82,9 +84,7 @@ class RapidsDB(base.Connection):
         logger.info("IMPEX connector CSV is created.")
         return True
 
-    def query_from_file(
-        self, filepath, file_suffix: Optional[str] = None
-    ) -> tuple[int, Optional[Iterable], Optional[list]]:
+    def query_from_file(self, filepath) -> tuple[int, Optional[Iterable], Optional[list]]:
         """Return number of rows affected by last query or -1 if database is
         closed or executing DDL statements.
         """
@@ -101,9 +101,6 @@ class RapidsDB(base.Connection):
         if filepath:
             sql_script = self.read_sql(filepath)
 
-        if Path(filepath).name == "load.sql" and file_suffix:
-            sql_script = sql_script.replace(".tbl", file_suffix)
-
         statements = add_schema_to_table_names(sql_script, self.db_name)
 
         statements = statements.split(";")
@@ -129,9 +126,34 @@ class RapidsDB(base.Connection):
         return rowcount, rset, columns
 
 
+def table_columns(schema_file: str) -> dict[str, list[tuple[str, str]]]:
+    """Return names and types of the columns of the tables a ``CREATE TABLE``
+    script creates, by table.
+    """
+    tables: dict[str, list[tuple[str, str]]] = {}
+    for stmt in base.Connection.read_sql(schema_file).split(";"):
+        match = re.match(r"\s*create\s+table\s+(\w+)\s*\(", stmt, flags=re.IGNORECASE)
+        if match is None:
+            continue
+        depth, body = 1, []
+        for char in stmt[match.end() :]:
+            depth += {"(": 1, ")": -1}.get(char, 0)
+            if depth == 0:
+                break
+            body.append(char)
+        # commas inside types like decimal(15,2) do not separate columns
+        columns = re.split(r",(?![^(]*\))", "".join(body))
+        tables[match.group(1).lower()] = [
+            (column.split()[0], column.split()[1]) for column in columns if column.strip()
+        ]
+    return tables
+
+
 class RDP_TPCH(base.TPCH_Runner):
     db_type = "rapidsdb"
     schema_dir = SCHEMA_BASE.joinpath("rapidsdb")
+    # data files are read by the IMPEX connector on cluster nodes
+    streams_dbgen = False
 
     def __init__(self, connection: RapidsDB, db_id: int, scale: str = "small"):
         super().__init__(connection, db_id, scale),
@@ -149,39 +171,73 @@ class RDP_TPCH(base.TPCH_Runner):
             conn.commit()
             print("TPC-H tables are created.")
 
+    @staticmethod
+    def _load_sql(
+        table: str, columns: list[tuple[str, str]], file_name: str, node: str
+    ) -> str:
+        """Return the statement inserting a data file read by the IMPEX connector
+        on a cluster node into a table.
+        """
+        names = ", ".join(name for name, _ in columns)
+        types = ", ".join(f"{name} {type_}" for name, type_ in columns)
+        return (
+            f"insert into {table} select {names} "
+            f"from (csv::'node://{node}/{file_name}') as s({types})"
+        )
+
+    @timeit
     def load_single_table(
         self,
         table: str,
         line_terminator: Optional[str] = None,
         data_folder: str = str(SMALL_DATA_DIR),
         delimiter: str = ",",
+        split: int = 1,
     ):
-        raise NotImplementedError("RapidsDB does not support single table loading.")
+        """Load test data into a TPC-H table by the IMPEX connector.
 
-    @timeit
-    def load_data(
-        self,
-        delimiter: str = ",",
-        data_folder: str = str(SMALL_DATA_DIR),
-    ):
-        """Load test data into TPC-H tables."""
+        Each data file of a shard set is loaded by a statement of its own, shards
+        are loaded ``split`` at a time and assigned to the nodes of
+        ``Config.rapidsdb_nodes`` round robin, so they are read by all nodes. The
+        round starts at a node of its own for each table, so tables loaded from
+        one data file are read by all nodes too.
+        """
         dpath = Path(data_folder)
-        delimiter = delimiter
-        # data_files = list(dpath.glob(f"{table}.*"))
-
-        try:
+        with self._conn as conn:
+            conn._ensure_impex_connector(dpath, delimiter)
+        columns = table_columns(f"{self.schema_dir}/table_schema.sql")[table]
+        files = self._get_datafiles(dpath, table)
+        nodes = Config.rapidsdb_nodes
+        first = all_tables.index(table)
+        node_of = {f: nodes[(first + idx) % len(nodes)] for idx, f in enumerate(files)}
+
+        def load_piece(conn: RapidsDB, piece: DataPiece) -> int:
+            stmt = self._load_sql(table, columns, piece.path.name, node_of[piece.path])
+            return conn.query(add_schema_to_table_names(stmt, conn.db_name))
+
+        pieces = [DataPiece(f) for f in files]
+        if len(pieces) > 1:
+            self._load_pieces(table, pieces, load_piece, split)
+        else:
             with self._conn as conn:
-                conn._ensure_impex_connector(dpath, delimiter)
-                data_files = dpath.glob("*")
-                file_suffix = None
-                if len([f for f in data_files if f.suffix == ".tbl"]) == 0:
-                    any_file = next(dpath.glob("*"))
-                    file_suffix = any_file.suffix
-
-                conn.query_from_file(
-                    f"{self.schema_dir}/load.sql", file_suffix=file_suffix
-                )
+                load_piece(conn, pieces[0])
                 conn.commit()
-            logger.info("TPC-H all tables are loaded.")
-        except Exception as e:
-            print(f"Load data fails, exception: {e}", file=sys.stderr)
+        print(table)
+
+    def load_data(
+        self,
+        table: str = "all",
+        data_folder: str = str(SMALL_DATA_DIR),
+        delimiter: str = ",",
+        jobs: int = 1,
+        split: int = 1,
+    ) -> tuple[list[base.TableLoad], float]:
+        """Load tables, ``jobs`` tables at a time, the IMPEX connector of the data
+        folder is created first. Return load time of each table and the total,
+        timed by ``TPCH_Runner.load_data``.
+        """
+        with self._conn as conn:
+            conn._ensure_impex_connector(Path(data_folder), delimiter)
+        return super().load_data(
+            table, data_folder=data_folder, delimiter=delimiter, jobs=jobs, split=split
+        )
@@ -1,12 +1,313 @@
+import hashlib
+import logging
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import zip_longest
 from pathlib import Path
-from typing import Optional
+from typing import Any, NamedTuple, Optional, Union
 
 import numpy as np
 import pandas as pd
 
 from tpch_runner.config import Config
 
-from .. import ANSWER_DIR, RESULT_DIR
+from .. import QUERY_ORDER, RESULT_DIR
+from .answers import answer_dir_for, load_answers
+
+logger = logging.getLogger(__name__)
+
+ALL_QUERIES = sorted(QUERY_ORDER[0])
+
+# Column comparison rules, see TPC-H specification 2.1.3.5.
+EXACT = "exact"  # integer counts and keys must match exactly
+MONEY = "money"  # decimals must be within 1 penny when rounded to cents
+RATIO = "ratio"  # averages and ratios must be within 1%
+STRING = "string"  # strings must match after trimming
+
+RATIO_COLUMNS = ("avg", "mkt_share", "promo_revenue", "ratio")
+# text columns of TPC-H answers whose values may look like numbers, e.g. Q22
+# cntrycode "13" or phone numbers of the small data set
+TEXT_COLUMNS = ("cntrycode", "phone")
+
+
+class ColumnDiff(NamedTuple):
+    column: str
+    rule: str
+    mismatches: int
+    # (row number, result value, answer value) of the first mismatches
+    examples: list[tuple[int, Any, Any]]
+
+
+class ResultDiff(NamedTuple):
+    ok: bool
+    reason: Optional[str]  # None, "columns", "rowcount" or "values"
+    result_rows: int
+    answer_rows: int
+    columns: list[ColumnDiff]
+
+    def summary(self) -> str:
+        if self.ok:
+            return "result matches answer"
+        if self.reason == "columns":
+            return "number of columns differs from answer"
+        if self.reason == "rowcount":
+            return "rowcount {} differs from answer rowcount {}".format(
+                self.result_rows, self.answer_rows
+            )
+        details = []
+        for col in self.columns:
+            row, res_value, ans_value = col.examples[0]
+            details.append(
+                "{} ({}): {} rows differ, first at row {}: {!r} != {!r}".format(
+                    col.column, col.rule, col.mismatches, row, res_value, ans_value
+                )
+            )
+        return "; ".join(details)
+
+
+def column_rule(name: str, column: pd.Series) -> str:
+    """Return the comparison rule of an answer column."""
+    if any(pattern in name.lower() for pattern in TEXT_COLUMNS):
+        return STRING
+    if pd.api.types.is_integer_dtype(column) or pd.api.types.is_bool_dtype(column):
+        return EXACT
+    if pd.api.types.is_numeric_dtype(column):
+        if any(pattern in name.lower() for pattern in RATIO_COLUMNS):
+            return RATIO
+        return MONEY
+    return STRING
+
+
+def _as_float(column: pd.Series) -> np.ndarray:
+    return pd.to_numeric(column, errors="coerce").to_numpy(dtype=float)
+
+
+def _as_text(column: pd.Series) -> pd.Series:
+    return (
+        column.astype("string")
+        .str.strip()
+        .str.replace(r" 00:00:00$", "", regex=True)
+        .fillna("")
+    )
+
+
+def _mismatch_mask(rule: str, result: pd.Series, answer: pd.Series) -> np.ndarray:
+    """Return a boolean array flagging the rows that break the column rule."""
+    if rule == STRING:
+        return (_as_text(result) != _as_text(answer)).to_numpy(dtype=bool)
+
+    res, ans = _as_float(result), _as_float(answer)
+    both_null = np.isnan(res) & np.isnan(ans)
+    with np.errstate(invalid="ignore"):
+        if rule == EXACT:
+            ok = res == ans
+        else:
+            ok = np.abs(np.round(res, 2) - np.round(ans, 2)) <= 0.01 + Config.precision
+            if rule == RATIO:
+                ok |= np.abs(res - ans) <= 0.01 * np.abs(ans)
+    return ~(ok | both_null)
+
+
+def compare_frames(
+    result: pd.DataFrame, answer: pd.DataFrame, sample_size: int = 5
+) -> ResultDiff:
+    """Compare a result set with its answer, column by column and row by row.
+
+    Columns are matched by position because column names in the result set vary
+    between databases, the rule of each column follows the answer column.
+    """
+    if len(result.columns) != len(answer.columns):
+        return ResultDiff(False, "columns", len(result), len(answer), [])
+    if len(result) != len(answer):
+        return ResultDiff(False, "rowcount", len(result), len(answer), [])
+
+    column_diffs = []
+    for pos, name in enumerate(answer.columns):
+        res_col, ans_col = result.iloc[:, pos], answer.iloc[:, pos]
+        rule = column_rule(str(name), ans_col)
+        mask = _mismatch_mask(rule, res_col, ans_col)
+        mismatches = int(mask.sum())
+        if mismatches:
+            examples = [
+                (int(row), res_col.iat[row], ans_col.iat[row])
+                for row in np.flatnonzero(mask)[:sample_size]
+            ]
+            column_diffs.append(ColumnDiff(str(name), rule, mismatches, examples))
+
+    return ResultDiff(
+        not column_diffs,
+        "values" if column_diffs else None,
+        len(result),
+        len(answer),
+        column_diffs,
+    )
+
+
+def _count_rows(csv_file: Path, chunk_rows: int) -> int:
+    with pd.read_csv(csv_file, usecols=[0], chunksize=chunk_rows) as reader:
+        return sum(len(chunk) for chunk in reader)
+
+
+def compare_files(
+    result_file: Path,
+    answer_file: Path,
+    chunk_rows: Optional[int] = None,
+    sample_size: int = 5,
+) -> ResultDiff:
+    """Compare a result file with its answer file in chunks of rows.
+
+    Both files are read in step, so memory use is bounded by the chunk size and
+    result files larger than memory can be validated. Rows and columns are
+    matched by position with the same rules as ``compare_frames``.
+    """
+    chunk_rows = chunk_rows or Config.compare_chunk_rows
+    answer_columns = [str(c) for c in pd.read_csv(answer_file, nrows=0).columns]
+    if len(pd.read_csv(result_file, nrows=0).columns) != len(answer_columns):
+        return ResultDiff(
+            False,
+            "columns",
+            _count_rows(result_file, chunk_rows),
+            _count_rows(answer_file, chunk_rows),
+            [],
+        )
+
+    column_diffs: dict[str, ColumnDiff] = {}
+    result_rows = answer_rows = 0
+    rowcount_differs = False
+    with pd.read_csv(result_file, chunksize=chunk_rows) as result_reader, pd.read_csv(
+        answer_file, chunksize=chunk_rows
+    ) as answer_reader:
+        for result, answer in zip_longest(result_reader, answer_reader):
+            offset = result_rows
+            result_rows += 0 if result is None else len(result)
+            answer_rows += 0 if answer is None else len(answer)
+            if (
+                rowcount_differs
+                or result is None
+                or answer is None
+                or len(result) != len(answer)
+            ):
+                rowcount_differs = True
+                continue
+
+            for col in compare_frames(result, answer, sample_size).columns:
+                examples = [(row + offset, res, ans) for row, res, ans in col.examples]
+                seen = column_diffs.get(col.column)
+                if seen:
+                    col = seen._replace(
+                        mismatches=seen.mismatches + col.mismatches,
+                        examples=(seen.examples + examples)[:sample_size],
+                    )
+                else:
+                    col = col._replace(examples=examples)
+                column_diffs[col.column] = col
+
+    if rowcount_differs:
+        return ResultDiff(False, "rowcount", result_rows, answer_rows, [])
+    diffs = [column_diffs[name] for name in answer_columns if name in column_diffs]
+    return ResultDiff(
+        not diffs, "values" if diffs else None, result_rows, answer_rows, diffs
+    )
+
+
+def is_large_file(*files: Path) -> bool:
+    """Return True if any file is too large to be compared in memory."""
+    return any(Path(f).stat().st_size > Config.compare_memory_limit for f in files)
+
+
+def compare_result_files(file1: Path, file2: Path) -> ResultDiff:
+    """Compare two result files, in chunks if either of them is large."""
+    if is_large_file(file1, file2):
+        logger.debug(f"Compare {file1} and {file2} in chunks.")
+        return compare_files(file1, file2)
+    return compare_frames(pd.read_csv(file1), pd.read_csv(file2))
+
+
+class Checksum(NamedTuple):
+    """Aggregate checksum of a result set, see ``Connection.checksum_sql``."""
+
+    rows: int
+    rules: list[str]
+    # per column: sum of values, of values rounded to cents or of text hashes
+    sums: list[float]
+
+    @classmethod
+    def from_row(cls, row: tuple, rules: list[str]) -> "Checksum":
+        """Build a checksum from the single row returned by a checksum query."""
+        sums = [
+            float(value) if value is not None else 0.0
+            for value in row[1:]  # sum() of no rows is NULL
+        ]
+        return cls(int(row[0]), list(rules), sums)
+
+
+def text_hash(text: str) -> int:
+    """Return the 32-bit hash of a text value, same as ``Connection.hash_sql``."""
+    return int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+
+
+def _column_sum(rule: str, column: pd.Series) -> float:
+    column = column.dropna()
+    if rule == STRING:
+        return float(sum(text_hash(text) for text in _as_text(column)))
+    values = _as_float(column)
+    if rule == MONEY:
+        values = np.round(values, 2)
+    return float(np.nansum(values))
+
+
+def frame_checksum(df: pd.DataFrame, rules: Optional[list[str]] = None) -> Checksum:
+    """Return the checksum of a result set, rules default to the column types."""
+    if rules is None:
+        rules = [column_rule(str(name), df[name]) for name in df.columns]
+    sums = [_column_sum(rule, df.iloc[:, pos]) for pos, rule in enumerate(rules)]
+    return Checksum(len(df), rules, sums)
+
+
+def checksum_diff(result: Checksum, answer: Checksum) -> Optional[str]:
+    """Return why a result checksum does not match its answer, None if it does."""
+    if len(result.sums) != len(answer.sums):
+        return "number of columns differs from answer"
+    if result.rows != answer.rows:
+        return f"rowcount {result.rows} differs from answer rowcount {answer.rows}"
+    for pos, (rule, res, ans) in enumerate(zip(answer.rules, result.sums, answer.sums)):
+        # each row may be off by the tolerance of the column rule
+        if rule in (EXACT, STRING):
+            ok = res == ans
+        else:
+            ok = abs(res - ans) <= 0.01 * answer.rows + Config.precision
+            if rule == RATIO:
+                ok = ok or abs(res - ans) <= 0.01 * abs(ans)
+        if not ok:
+            return f"column {pos + 1} ({rule}) checksum {res!r} != {ans!r}"
+    return None
+
+
+_answer_checksums: dict[Path, dict[int, Checksum]] = {}
+
+
+def answer_checksums(answer_dir: Path) -> dict[int, Checksum]:
+    """Return checksums of the answers of an answer directory keyed by query."""
+    if not answer_dir.is_dir():
+        raise FileNotFoundError(f"Answer folder not exists: {answer_dir}")
+    if answer_dir not in _answer_checksums:
+        answers = load_answers(answer_dir)
+        checksums = {}
+        for query in ALL_QUERIES:
+            answer = answers.get(f"{query}.csv")
+            if answer is None:
+                answer = pd.read_csv(answer_dir.joinpath(f"{query}.csv"))
+            checksums[query] = frame_checksum(answer)
+        _answer_checksums[answer_dir] = checksums
+    return _answer_checksums[answer_dir]
+
+
+class ChecksumResult(NamedTuple):
+    query: int
+    ok: bool
+    reason: Optional[str]
+    runtime: float
 
 
 class Result:
@@ -17,9 +318,11 @@ class Result:
         db_type: Optional[str] = None,
         test_time: Optional[str] = None,
         result_dir: Optional[str] = None,
+        result_files: Optional[dict[str, Path]] = None,
     ):
         self.result_dir: Path
-        self.answer_dir: Path = Path(ANSWER_DIR).joinpath(scale)
+        self.result_files: dict[str, Path] = result_files or {}
+        self.answer_dir: Path = answer_dir_for(scale)
         self.db_type = db_type
         self.scale = scale
 
@@ -33,101 +336,195 @@ class Result:
         else:
             self.result_dir = RESULT_DIR
 
-    def compare_single_query(
-        self, csv_file: str, answer_file: Optional[str] = None
-    ) -> bool:
+    def compare_against_answer(self, file1: str) -> bool:
         """Compare the result file with the answer file and return True if they are
         identical.
 
         Args:
-            csv_file: Name of the result file.
-            answer_file: Name of the answer file.
+            file1: Name of the result file.
         """
-        file1_path = Path(RESULT_DIR).joinpath(csv_file)
-        if answer_file:
-            answer_file_path = Path(answer_file)
-        else:
-
-            _, idx1, _ = file1_path.stem.split("_")
-            answer_file_path = (
-                Path(ANSWER_DIR).joinpath(self.scale).joinpath(f"{idx1[1:]}.csv")
-            )
-
-        if not file1_path.is_file() or not answer_file_path.is_file():
-            raise FileNotFoundError(
-                "Result file may not exist in {}, files: {}, {}".format(
-                    self.result_dir, csv_file, answer_file
-                )
-            )
+        diff = self.diff_against_answer(file1)
+        if not diff.ok:
+            logger.info(f"{file1}: {diff.summary()}")
+        return diff.ok
 
-        return self._equals(file1_path, answer_file_path)
-
-    def compare_against_answer(self, file1: str) -> bool:
-        """Compare the result file with the answer file and return True if they are
-        identical.
+    def diff_against_answer(self, file1: str) -> ResultDiff:
+        """Compare the result file with the answer file and return the differences.
 
         Args:
             file1: Name of the result file.
         """
-        file1_path = self.result_dir.joinpath(file1)
-        answer_file = self.answer_dir.joinpath(file1)
+        file1_path = self.result_files.get(file1, self.result_dir.joinpath(file1))
 
         if not Path(self.answer_dir).exists():
             raise FileNotFoundError(f"Answer folder not exists: {self.answer_dir}")
 
-        if not file1_path.is_file() or not answer_file.is_file():
+        answer_path = self.answer_dir.joinpath(file1)
+        if not file1_path.is_file() or not answer_path.is_file():
             raise FileNotFoundError(
                 "Result file may not exist in {}, files: {}, {}".format(
-                    self.result_dir, file1, answer_file
+                    self.result_dir, file1, answer_path
                 )
             )
 
-        return self._equals(file1_path, answer_file)
+        answer = load_answers(self.answer_dir).get(file1)
+        if answer is None or is_large_file(file1_path):
+            return compare_result_files(file1_path, answer_path)
+        return compare_frames(pd.read_csv(file1_path), answer)
 
-    def _equals(self, file1: Path, file2: Path) -> bool:
-        """Compare two result files and return True if they are identical.
+    def read_result(self, filename: str) -> pd.DataFrame:
+        file_path = self.result_files.get(filename, self.result_dir.joinpath(filename))
+        if not file_path.is_file():
+            raise FileNotFoundError(f"File {filename} not found in {self.result_dir}.")
 
-        Args:
-            file1: Name of the first result file.
-            file2: Name of the answer file.
-        """
-        df_file1 = pd.read_csv(file1)
-        df_file2 = pd.read_csv(file2)
-        if not df_file1.columns.equals(df_file2.columns):
-            if self.db_type == "mysql":
-                df_file2.columns = df_file1.columns
+        return pd.read_csv(file_path)
+
+
+class ValidationReport(NamedTuple):
+    test_id: int
+    result_folder: str
+    passed: list[int]
+    failed: list[int]
+    errors: dict[int, str]  # query -> error message
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed and not self.errors
+
+
+def validate_query(result: Result, query: int) -> bool:
+    """Validate the result of one query, run in validation worker processes."""
+    return result.compare_against_answer(f"{query}.csv")
+
+
+def run_validations(
+    tests: list[tuple[int, str, Result]],
+    jobs: Optional[int] = None,
+    raise_errors: bool = False,
+) -> list[ValidationReport]:
+    """Validate all queries of one or more Powertests and return one report per test.
+
+    Args:
+        tests: (test ID, result folder, Result) of the Powertests to validate.
+        jobs: number of worker processes, run in current process if it is 1,
+            default is number of CPUs.
+        raise_errors: re-raise the first validation error instead of reporting it.
+    """
+    tasks = [(idx, query) for idx in range(len(tests)) for query in ALL_QUERIES]
+    outcomes: dict[tuple[int, int], Union[bool, Exception]] = {}
+
+    # load answers before the workers are forked so they share them
+    for answer_dir in {result.answer_dir for _, _, result in tests}:
+        if answer_dir.is_dir():
+            load_answers(answer_dir)
+
+    if jobs == 1:
+        for idx, query in tasks:
+            try:
+                outcomes[(idx, query)] = validate_query(tests[idx][2], query)
+            except Exception as e:
+                if raise_errors:
+                    raise
+                outcomes[(idx, query)] = e
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {
+                executor.submit(validate_query, tests[idx][2], query): (idx, query)
+                for idx, query in tasks
+            }
+            for future in as_completed(futures):
+                try:
+                    outcomes[futures[future]] = future.result()
+                except Exception as e:
+                    if raise_errors:
+                        for pending in futures:
+                            pending.cancel()
+                        raise
+                    outcomes[futures[future]] = e
+
+    reports = []
+    for idx, (test_id, result_folder, _) in enumerate(tests):
+        report = ValidationReport(test_id, result_folder, [], [], {})
+        for query in ALL_QUERIES:
+            outcome = outcomes[(idx, query)]
+            if isinstance(outcome, Exception):
+                report.errors[query] = str(outcome)
+                logger.error(f"Query {query} of {result_folder} not validated: {outcome}")
+            elif outcome:
+                report.passed.append(query)
+                logger.info(f"Compare {query}.csv: Good.")
             else:
-                df_file1.columns = df_file2.columns
+                report.failed.append(query)
+                logger.error(
+                    f"Query {query} result is not matched against answer. Test failed."
+                )
+        reports.append(report)
+    return reports
 
-        if len(df_file1) != len(df_file2):
-            return False
 
-        numeric_columns = df_file1.select_dtypes(include=[np.number]).columns
-        numeric_comparison = np.isclose(
-            df_file1[numeric_columns], df_file2[numeric_columns], atol=Config.precision
-        )
+class BackgroundValidator:
+    """Validate query results against answers in a background thread.
 
-        non_numeric_columns = df_file1.select_dtypes(exclude=[np.number]).columns
-        stripped_df_file1 = df_file1[non_numeric_columns].map(
-            lambda x: x.strip() if isinstance(x, str) else x
-        )
-        stripped_df_file2 = df_file2[non_numeric_columns].map(
-            lambda x: x.strip() if isinstance(x, str) else x
-        )
-        non_numeric_comparison = stripped_df_file1.equals(stripped_df_file2)
+    Results are handed over in memory as soon as a query finishes, so they are
+    validated while later queries of the test run.
+    """
 
-        if numeric_comparison.all() and non_numeric_comparison:
-            return True
-        print("result from file1:")
-        print(df_file1)
-        print("-" * 60)
-        print("result from file2:")
-        print(df_file2)
-        return False
+    def __init__(self, scale: str):
+        self.answer_dir = answer_dir_for(scale)
+        missing = [
+            f"{q}.csv"
+            for q in ALL_QUERIES
+            if not self.answer_dir.joinpath(f"{q}.csv").is_file()
+        ]
+        if missing:
+            raise FileNotFoundError(
+                f"Answers {', '.join(missing)} not found in {self.answer_dir}."
+            )
+        self.answers = load_answers(self.answer_dir)
+        self.failed = threading.Event()
+        self._pending: queue.Queue = queue.Queue()
+        self._done: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="validator", daemon=True)
+        self._thread.start()
 
-    def read_result(self, filename: str) -> pd.DataFrame:
-        file_path = self.result_dir.joinpath(filename)
-        if not file_path.is_file():
-            raise FileNotFoundError(f"File {filename} not found in {self.result_dir}.")
+    def submit(self, query: int, rset: Any, columns: Optional[list]):
+        """Queue the result set of a query for validation."""
+        self._pending.put((query, rset, columns))
 
-        return pd.read_csv(file_path)
+    def _validate(self, query: int, rset: Any, columns: Optional[list]) -> ResultDiff:
+        answer = self.answers.get(f"{query}.csv")
+        if answer is None:
+            answer = pd.read_csv(self.answer_dir.joinpath(f"{query}.csv"))
+        return compare_frames(pd.DataFrame(rset, columns=columns), answer)
+
+    def _check(self, query: int, rset: Any, columns: Optional[list]):
+        outcome: Union[ResultDiff, Exception]
+        try:
+            outcome = self._validate(query, rset, columns)
+        except Exception as e:
+            outcome = e
+        if isinstance(outcome, Exception) or not outcome.ok:
+            self.failed.set()
+        self._done.put((query, outcome))
+
+    def _run(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                break
+            self._check(*item)
+
+    def poll(self) -> list[tuple[int, Union[ResultDiff, Exception]]]:
+        """Return (query, diff or error) of validations finished since last poll."""
+        outcomes = []
+        while True:
+            try:
+                outcomes.append(self._done.get_nowait())
+            except queue.Empty:
+                return outcomes
+
+    def close(self) -> list[tuple[int, Union[ResultDiff, Exception]]]:
+        """Wait for queued validations and return their outcomes."""
+        self._pending.put(None)
+        self._thread.join()
+        return self.poll()
@@ -0,0 +1,398 @@
+"""Read TPC-H data files for loading: shard sets, line-aligned byte ranges,
+compressed files and named pipes.
+"""
+
+import errno
+import io
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional, Union
+
+import numpy as np
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+ByteRange = tuple[int, int]
+# block size of data streamed from data files to loaders
+STREAM_BLOCK_SIZE = 1024 * 1024
+# decompressors of compressed data files by suffix, the first one found is used,
+# DuckDB reads both formats natively
+DECOMPRESSORS = {
+    ".gz": (["pigz", "-dc"], ["gzip", "-dc"]),
+    ".zst": (["zstd", "-dc"],),
+}
+COMPRESSED_SUFFIX = r"(\.(gz|zst))?"
+
+# rows per scale factor, lineitem rows are not proportional to the scale factor
+ROWS_PER_SF = {
+    "supplier": 10_000,
+    "customer": 150_000,
+    "part": 200_000,
+    "partsupp": 800_000,
+    "orders": 1_500_000,
+}
+FIXED_ROWS = {"region": 5, "nation": 25}
+LINEITEM_ROWS = {
+    1: 6_001_215,
+    10: 59_986_052,
+    30: 179_998_372,
+    100: 600_037_902,
+    300: 1_799_989_091,
+    1000: 5_999_989_709,
+    3000: 18_000_048_306,
+    10000: 59_999_994_267,
+}
+
+
+class DataPiece(NamedTuple):
+    """A data file, or a byte range of it, loaded by one loader."""
+
+    path: Path
+    byte_range: Optional[ByteRange] = None
+
+
+def table_files(data_folder: Union[str, Path], table: str) -> list[Path]:
+    """Return data files of a table, like ``lineitem.tbl`` or the shard set
+    ``lineitem.tbl.1`` ... ``lineitem.tbl.N`` made by ``dbgen -C N``. Data files
+    can be compressed, like ``lineitem.tbl.zst``, or named pipes written by dbgen.
+    """
+    files = [
+        f for f in Path(data_folder).glob(f"{table}.*") if f.is_file() or f.is_fifo()
+    ]
+    shard_numbers = {}
+    for f in files:
+        match = re.fullmatch(rf"{table}\.\w+\.(\d+){COMPRESSED_SUFFIX}", f.name)
+        if match:
+            shard_numbers[f] = int(match.group(1))
+    if shard_numbers:
+        return sorted(shard_numbers, key=lambda f: shard_numbers[f])
+    whole = sorted(
+        f for f in files if re.fullmatch(rf"{table}\.\w+{COMPRESSED_SUFFIX}", f.name)
+    )
+    if not whole:
+        raise FileNotFoundError(f"No data file of table {table} in {data_folder}.")
+    return whole[:1]
+
+
+def data_size(data_folder: Union[str, Path], table: str) -> Optional[int]:
+    """Return size in bytes of the data files of a table as stored, None if
+    they are named pipes or missing.
+    """
+    try:
+        files = table_files(data_folder, table)
+    except FileNotFoundError:
+        return None
+    if any(f.is_fifo() for f in files):
+        return None
+    return sum(f.stat().st_size for f in files)
+
+
+def expected_rows(table: str, scale: Union[str, float, None]) -> Optional[int]:
+    """Return number of rows of a table at a scale factor, None if unknown."""
+    if table in FIXED_ROWS:
+        return FIXED_ROWS[table]
+    try:
+        sf = float(str(scale).lower().removeprefix("sf"))
+    except ValueError:
+        return None
+    if table == "lineitem":
+        return LINEITEM_ROWS.get(int(sf)) if sf.is_integer() else None
+    return int(ROWS_PER_SF[table] * sf)
+
+
+def scale_of_folder(data_folder: Union[str, Path]) -> Optional[str]:
+    """Return scale factor of a data folder named like ``sf100``."""
+    match = re.fullmatch(r"sf(\d+(\.\d+)?)", Path(data_folder).name.lower())
+    return match.group(1) if match else None
+
+
+def split_ranges(path: Union[str, Path], parts: int) -> list[ByteRange]:
+    """Split a file into at most ``parts`` byte ranges ending at line ends.
+
+    The file is not rewritten, range boundaries are found by seeking to evenly
+    spaced offsets and reading to the end of the line there.
+    """
+    size = Path(path).stat().st_size
+    if parts <= 1 or size == 0:
+        return [(0, size)]
+
+    offsets = [0]
+    with open(path, "rb") as f:
+        for i in range(1, parts):
+            f.seek(max(size * i // parts - 1, offsets[-1]))
+            f.readline()
+            boundary = f.tell()
+            if boundary >= size:
+                break
+            if boundary > offsets[-1]:
+                offsets.append(boundary)
+    offsets.append(size)
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def plan_ranges(path: Union[str, Path], split: int) -> list[ByteRange]:
+    """Return byte ranges to load a data file in, files smaller than
+    ``Config.load_split_min_size`` are loaded in one piece.
+    """
+    if Path(path).stat().st_size < Config.load_split_min_size:
+        split = 1
+    return split_ranges(path, split)
+
+
+def plan_pieces(files: list[Path], split: int) -> list[DataPiece]:
+    """Return pieces to load data files in, one per shard of a shard set or up
+    to ``split`` byte ranges of a single large uncompressed file.
+    """
+    if len(files) > 1 or compression_of(files[0]):
+        return [DataPiece(f) for f in files]
+    ranges = plan_ranges(files[0], split)
+    if len(ranges) == 1:
+        return [DataPiece(files[0])]
+    return [DataPiece(files[0], byte_range) for byte_range in ranges]
+
+
+class FileRange(io.RawIOBase):
+    """Read-only file object over a byte range of a file."""
+
+    def __init__(self, path: Union[str, Path], start: int, end: int):
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        count = self._file.readinto(memoryview(buffer)[:size])
+        self._remaining -= count
+        return count
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def compression_of(path: Union[str, Path]) -> Optional[str]:
+    """Return the compression suffix of a data file, None if not compressed."""
+    suffix = Path(path).suffix
+    return suffix if suffix in DECOMPRESSORS else None
+
+
+class DecompressedFile(io.RawIOBase):
+    """Read-only file object over the output of a decompressor process, which
+    decompresses a data file in parallel with the loader reading it.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        suffix = compression_of(path)
+        commands = DECOMPRESSORS[suffix] if suffix else ()
+        command = next((c for c in commands if shutil.which(c[0])), None)
+        if command is None:
+            raise FileNotFoundError(
+                f"{' or '.join(c[0] for c in commands)} is required to read {path}."
+            )
+        self._command = [*command, str(path)]
+        self._process = subprocess.Popen(
+            self._command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=STREAM_BLOCK_SIZE,
+        )
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        count = self._process.stdout.readinto(buffer)  # type: ignore
+        self._eof = not count
+        return count
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        self._process.stdout.close()  # type: ignore
+        if not self._eof:
+            # closed before the end, like after peeking the first line
+            self._process.kill()
+        stderr = self._process.stderr.read()  # type: ignore
+        self._process.stderr.close()  # type: ignore
+        if self._process.wait() != 0 and self._eof:
+            raise OSError(f"{' '.join(self._command)} fails: {stderr.decode().strip()}")
+
+
+def has_trailing_delimiter(path: Union[str, Path], delimiter: str) -> Optional[bool]:
+    """Return True if lines of a data file end with the column delimiter, like
+    ``0|AFRICA|comment|`` of raw dbgen output, None for a named pipe which can't
+    be peeked.
+    """
+    if Path(path).is_fifo():
+        return None
+    with open_range(path) as f:
+        line = f.readline()
+    return line.rstrip(b"\n").endswith(delimiter.encode())
+
+
+def _strip_line_ends(data: bytes, delimiter: bytes) -> bytes:
+    """Drop the delimiter before each line feed of a block of data."""
+    if len(delimiter) != 1:
+        return data.replace(delimiter + b"\n", b"\n")
+    # numpy drops all of them in one pass, bytes.replace copies line by line
+    array = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(array[1:] == ord("\n"))
+    return np.delete(array, ends[array[ends] == delimiter[0]]).tobytes()
+
+
+class TrailingDelimiterReader(io.RawIOBase):
+    """Read-only file object over a binary data file which drops the column
+    delimiter ending each line, in blocks of ``STREAM_BLOCK_SIZE`` bytes.
+
+    Whether lines end with the delimiter is decided by the first line, data
+    files without trailing delimiters are passed through as they are. Reading
+    a whole block returns it without copying.
+    """
+
+    def __init__(self, raw, delimiter: str):
+        self._raw = raw
+        self._delimiter = delimiter.encode()
+        self._strip: Optional[bool] = None
+        self._carry = b""
+        self._block = b""
+        self._pos = 0
+        self._eof = False
+
+    def readable(self) -> bool:
+        return True
+
+    def _fill(self) -> bool:
+        while self._pos >= len(self._block) and not self._eof:
+            chunk = self._raw.read(STREAM_BLOCK_SIZE)
+            self._eof = not chunk
+            data, self._carry = self._carry + chunk, b""
+            if self._strip is None:
+                newline = data.find(b"\n")
+                if newline < 0 and not self._eof:
+                    self._carry = data
+                    continue
+                first_line = data if newline < 0 else data[:newline]
+                self._strip = first_line.endswith(self._delimiter)
+            if self._strip:
+                if data.endswith(self._delimiter):
+                    if not self._eof:
+                        # the delimiter may end a line continued in the next block
+                        self._carry = self._delimiter
+                    data = data[: -len(self._delimiter)]
+                data = _strip_line_ends(data, self._delimiter)
+            self._block, self._pos = data, 0
+        return self._pos < len(self._block)
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        if size is None or size < 0:
+            return self.readall()
+        if not self._fill():
+            return b""
+        if self._pos == 0 and size >= len(self._block):
+            self._pos = len(self._block)
+            return self._block
+        data = self._block[self._pos : self._pos + size]
+        self._pos += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def close(self):
+        self._raw.close()
+        super().close()
+
+
+def open_range(
+    path: Union[str, Path],
+    byte_range: Optional[ByteRange] = None,
+    strip_delimiter: Optional[str] = None,
+):
+    """Open a data file, or a byte range of it, for buffered binary reading.
+
+    Compressed data files are decompressed by a separate process while read,
+    they can't be read in byte ranges. Trailing ``strip_delimiter`` of lines is
+    dropped while reading if given.
+    """
+    if compression_of(path):
+        if byte_range is not None:
+            raise ValueError(f"Can't read compressed {path} in byte ranges.")
+        f = io.BufferedReader(DecompressedFile(path), STREAM_BLOCK_SIZE)
+    elif byte_range is None:
+        f = open(path, "rb")
+    else:
+        f = io.BufferedReader(FileRange(path, *byte_range))
+    if strip_delimiter is None:
+        return f
+    return TrailingDelimiterReader(f, strip_delimiter)
+
+
+@contextmanager
+def range_fifo(
+    path: Union[str, Path],
+    byte_range: Optional[ByteRange] = None,
+    strip_delimiter: Optional[str] = None,
+) -> Iterator[Path]:
+    """Expose a data file, or a byte range of it, as a named pipe, for loaders
+    that only read from file names like MySQL ``LOAD DATA``. Raise the error of
+    reading the data file, if any, once the loader is done.
+    """
+    tmp_dir = tempfile.mkdtemp(prefix="tpch-range-")
+    fifo = Path(tmp_dir).joinpath(Path(path).name)
+    os.mkfifo(fifo)
+
+    stop = threading.Event()
+    errors: list[Exception] = []
+
+    def feed():
+        # poll for a reader, so the writer can be stopped if none comes
+        while not stop.is_set():
+            try:
+                fd = os.open(fifo, os.O_WRONLY | os.O_NONBLOCK)
+                break
+            except OSError as e:
+                if e.errno != errno.ENXIO:
+                    raise
+                time.sleep(0.01)
+        else:
+            return
+        os.set_blocking(fd, True)
+        try:
+            with open(fd, "wb") as out, open_range(
+                path, byte_range, strip_delimiter
+            ) as src:
+                shutil.copyfileobj(src, out, STREAM_BLOCK_SIZE)
+        except BrokenPipeError:
+            logger.debug(f"Reader of {fifo} stops reading.")
+        except Exception as e:
+            errors.append(e)
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    try:
+        yield fifo
+    finally:
+        stop.set()
+        writer.join()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    if errors:
+        raise errors[0]
@@ -1,11 +1,25 @@
 #!/usr/bin/env python
+import logging
+import os
+import shutil
 import subprocess
 import sys
+import tempfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional, Union
 
 from tpch_runner.config import Config
 
+from . import all_tables
+
+logger = logging.getLogger(__name__)
+
+DBGEN_DIR = Path(__file__).parent
+# seconds to wait for dbgen to exit after its output is read
+DBGEN_EXIT_TIMEOUT = 5
+
 ENV_VARS = {
     "DSS_PATH": "data",
     "DSS_CONFIG": "tool",
@@ -19,10 +33,12 @@ TABLE_MAP = {
     "nation": "n",
     "lineitem": "L",
     "orders": "O",
-    "parts": "P",
-    "parsupp": "S",
-    "suppliers": "s",
+    "part": "P",
+    "partsupp": "S",
+    "supplier": "s",
 }
+# tables dbgen generates in one piece whatever the number of chunks
+UNCHUNKED_TABLES = ("region", "nation")
 
 
 def data_gen_batch(
@@ -37,9 +53,10 @@ def data_gen_batch(
     data_dir.mkdir(exist_ok=True)
     env_vars["DSS_PATH"] = str(data_dir)
 
-    table_key = TABLE_MAP.get(table)
-    command = f"./tool/dbgen -T {table_key} -f -s {sf}"
-    cwd = Path(__file__).parent.as_posix()
+    command = f"./tool/dbgen -f -s {sf}"
+    if table != "all":
+        command += f" -T {TABLE_MAP[table]}"
+    cwd = DBGEN_DIR.as_posix()
     result = subprocess.run(
         command,
         env=env_vars,
@@ -53,6 +70,101 @@ def data_gen_batch(
     return False, result.stderr
 
 
+def dbgen_command(
+    table: str, sf: Union[int, str], chunks: int = 1, step: Optional[int] = None
+) -> list[str]:
+    command = ["./tool/dbgen", "-T", TABLE_MAP[table], "-f", "-s", str(sf)]
+    if step is not None:
+        command += ["-C", str(chunks), "-S", str(step)]
+    return command
+
+
+def _release_pipe(fifo: Path):
+    """Let loaders waiting for a writer of a named pipe see the end of file,
+    and loaders coming later a missing file, once its dbgen process exits.
+    """
+    try:
+        fd = os.open(fifo, os.O_RDWR | os.O_NONBLOCK)
+    except FileNotFoundError:
+        return
+    fifo.unlink(missing_ok=True)
+    os.close(fd)
+
+
+@contextmanager
+def dbgen_pipes(
+    sf: Union[int, str],
+    tables: Optional[list[str]] = None,
+    chunks: int = 1,
+    env_vars: Optional[dict] = None,
+) -> Iterator[Path]:
+    """Run dbgen into named pipes of a temporary folder and yield the folder,
+    so loaders read generated data without staging it on disk.
+
+    The folder holds ``<table>.tbl``, or the shard set ``<table>.tbl.1`` ...
+    ``<table>.tbl.N`` when ``chunks`` is N, each written by its own dbgen process
+    once a loader opens it. Raise RuntimeError if any dbgen process fails or its
+    output is not read to the end.
+    """
+    tmp_dir = Path(tempfile.mkdtemp(prefix="tpch-dbgen-"))
+    env = dict(env_vars or ENV_VARS, DSS_PATH=str(tmp_dir))
+    processes: list[tuple[str, subprocess.Popen]] = []
+    watchers: list[threading.Thread] = []
+    errors: dict[str, str] = {}
+
+    def watch(name: str, process: subprocess.Popen):
+        _, stderr = process.communicate()
+        if process.returncode != 0:
+            errors.setdefault(
+                name, (stderr or "").strip() or f"exit code {process.returncode}"
+            )
+        _release_pipe(tmp_dir.joinpath(name))
+
+    try:
+        for table in tables or all_tables:
+            if chunks == 1 or table in UNCHUNKED_TABLES:
+                steps: list[Optional[int]] = [None]
+            else:
+                steps = list(range(1, chunks + 1))
+            for step in steps:
+                name = f"{table}.tbl" if step is None else f"{table}.tbl.{step}"
+                os.mkfifo(tmp_dir.joinpath(name))
+                process = subprocess.Popen(
+                    dbgen_command(table, sf, chunks, step),
+                    env=env,
+                    cwd=DBGEN_DIR,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                )
+                processes.append((name, process))
+                watchers.append(threading.Thread(target=watch, args=(name, process)))
+                watchers[-1].start()
+                logger.debug(f"dbgen {process.pid} writes {name}.")
+
+        yield tmp_dir
+
+        for name, process in processes:
+            try:
+                process.wait(timeout=DBGEN_EXIT_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                errors[name] = "output is not read to the end"
+    finally:
+        for _, process in processes:
+            if process.poll() is None:
+                process.kill()
+        for watcher in watchers:
+            watcher.join()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if errors:
+        raise RuntimeError(
+            "dbgen fails, "
+            + "; ".join(f"{name}: {error}" for name, error in sorted(errors.items()))
+        )
+
+
 def main(args):
     action = args[1]
     try:
@@ -65,9 +177,8 @@ def main(args):
                         ", ".join(TABLE_MAP.keys())
                     )
                 )
-            table_key = TABLE_MAP.get(table)
             scale_factor = args[3] if len(args) == 4 else 1
-            data_gen_batch(table_key, scale_factor)
+            data_gen_batch(table, scale_factor)
         else:
             print("run qgen")
     except Exception as e:
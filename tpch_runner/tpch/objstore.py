@@ -0,0 +1,110 @@
+"""Content-addressed store for query result files."""
+
+import hashlib
+import logging
+import os
+import tempfile
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from . import RESULT_DIR
+
+OBJECT_PREFIX = "objects"
+# file in the store root naming the store, see ResultStore.store_id
+STORE_ID_FILE = ".store_id"
+
+logger = logging.getLogger(__name__)
+
+
+class ResultStore:
+    """Keep each distinct result file once under ``RESULT_DIR/objects``.
+
+    Objects are addressed by the SHA-256 digest of their content, a result key
+    looks like ``objects/ab/ab12...ef.csv`` and is relative to the store root so
+    it can be saved as ``TestResult.result_csv`` directly.
+    """
+
+    def __init__(self, root: Path = RESULT_DIR):
+        self.root = Path(root)
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def make_key(digest: str, suffix: str = ".csv") -> str:
+        return f"{OBJECT_PREFIX}/{digest[:2]}/{digest}{suffix}"
+
+    @staticmethod
+    def is_object(result_csv: Optional[str]) -> bool:
+        """Return True if a result_csv value points into the object store."""
+        return bool(result_csv) and str(result_csv).startswith(f"{OBJECT_PREFIX}/")
+
+    def store_id(self) -> str:
+        """Return the ID of the store, created on first use. Runner hosts sharing
+        a store, e.g. on a network file system, see the same ID.
+        """
+        id_file = self.root.joinpath(STORE_ID_FILE)
+        if not id_file.is_file():
+            self.root.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+            with os.fdopen(fd, "w") as tmp_file:
+                tmp_file.write(uuid.uuid4().hex)
+            try:
+                # keep the ID of a host creating it at the same time
+                os.link(tmp_name, id_file)
+            except FileExistsError:
+                pass
+            finally:
+                os.unlink(tmp_name)
+        return id_file.read_text().strip()
+
+    def path(self, key: str) -> Path:
+        return self.root.joinpath(key)
+
+    def put(self, data: bytes, suffix: str = ".csv") -> str:
+        """Store data if not stored yet and return its object key."""
+        key = self.make_key(self.digest(data), suffix)
+        obj_path = self.path(key)
+        if obj_path.exists():
+            logger.debug(f"Result object {key} exists, reuse it.")
+            return key
+
+        obj_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=obj_path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_name, obj_path)
+        except Exception:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        return key
+
+    def remove(self, key: str) -> bool:
+        """Remove an object file, return False if it does not exist."""
+        obj_path = self.path(key)
+        if not obj_path.is_file():
+            return False
+        obj_path.unlink()
+        try:
+            obj_path.parent.rmdir()
+        except OSError:
+            pass
+        return True
+
+    def resolve(self, result_csv: str, result_folder: Optional[str] = None) -> Path:
+        """Return the absolute path of a result file.
+
+        Results saved before the object store was introduced live in
+        ``RESULT_DIR/<result_folder>/<n>.csv`` or ``RESULT_DIR/<file>.csv``.
+        """
+        if self.is_object(result_csv):
+            return self.path(result_csv)
+        if result_folder:
+            return self.root.joinpath(result_folder).joinpath(result_csv)
+        return self.root.joinpath(result_csv)
+
+
+result_store = ResultStore()